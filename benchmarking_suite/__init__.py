@@ -7,8 +7,11 @@ traditional SQL queries. It provides tools for benchmarking and generating perfo
 Key Components:
 - benchmark_cqc.py: Performance tests for CQC queries.
 - benchmark_sql.py: Comparison tests with traditional SQL queries.
+- scalability.py: Latency and memory sweep across data scale factors.
+- history.py: Benchmark history in SQLite and regression checks between commits.
+- fingerprint.py: Order-insensitive result fingerprints to cross-check CQC results against SQLite.
+- workload.py: Seeded random query workloads for stress testing.
+- ablation.py: Benchmarks under optimizer configurations (single, leave-one-out or all subsets).
+- datagen.py: Seeded, vectorized dataset generators with scale factors and chunked output.
 - reports/: Directory for storing performance analysis outputs.
-
-This is a placeholder file to establish the directory structure. Actual implementation files will be
-added as development progresses.
 """
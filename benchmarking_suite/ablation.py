@@ -0,0 +1,144 @@
+import argparse
+import itertools
+import os
+import sys
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import OPTIMIZATIONS, SimpleCQ
+from benchmarking_suite.benchmark_cqc import benchmark_cq
+from benchmarking_suite.helpers import save_results
+
+MODES = ("single", "leave-one-out", "full")
+
+
+def configurations(mode: str = "leave-one-out", optimizations=OPTIMIZATIONS) -> dict:
+    """
+    Named optimizer configurations to benchmark. Every mode includes "none"
+    (the reference for speedups) and "all".
+
+    - single: each optimization on its own
+    - leave-one-out: everything except one optimization
+    - full: every subset (2^n configurations)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown ablation mode: {mode}. Expected one of {', '.join(MODES)}")
+    configs = {"none": frozenset(), "all": frozenset(optimizations)}
+    if mode == "single":
+        configs.update({f"+{name}": frozenset([name]) for name in optimizations})
+    elif mode == "leave-one-out":
+        configs.update({f"-{name}": frozenset(optimizations) - {name} for name in optimizations})
+    else:
+        for size in range(1, len(optimizations)):
+            for subset in itertools.combinations(optimizations, size):
+                configs["+".join(subset)] = frozenset(subset)
+    return configs
+
+
+def run_ablation(tables: dict, queries: list, mode: str = "leave-one-out", warmup: int = 1,
+                 repetitions: int = 3) -> list:
+    """
+    Benchmarks every (query_id, parsed query) pair under every configuration
+    of `mode`. Results whose fingerprint differs from the "none" run are
+    flagged with 'result_changed', since an optimization must never change
+    the answer.
+    """
+    engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+    configs = configurations(mode)
+    results = []
+    # Query-major order, so every configuration of a query runs in similar
+    # cache and allocator conditions
+    for query_id, parsed in queries:
+        print(f"\n--- Query: {query_id} ---")
+        reference = None
+        for config, enabled in configs.items():
+            engine.optimizations = enabled
+            result = benchmark_cq(tables, parsed, warmup=warmup, repetitions=repetitions,
+                                  measure_memory=False, engine=engine)
+            result["query_id"] = query_id
+            result["config"] = config
+            result["optimizations"] = sorted(enabled)
+            if config == "none":
+                reference = result.get("result_fingerprint")
+            result["result_changed"] = not result["error"] and result.get("result_fingerprint") != reference
+            results.append(result)
+            flag = "  RESULT CHANGED" if result["result_changed"] else ""
+            print(f"{config:>24}: {result['execution_time_seconds']:.4f}s{flag}")
+    engine.optimizations = OPTIMIZATIONS
+    return results
+
+
+def speedup_matrix(results: list, reference: str = "none") -> pd.DataFrame:
+    """Per query (rows) and configuration (columns): time under `reference` / time under the configuration."""
+    df = pd.DataFrame([r for r in results if not r.get("error")])
+    times = df.pivot_table(index="query_id", columns="config", values="execution_time_seconds", aggfunc="median")
+    configs = [c for c in dict.fromkeys(df["config"]) if c in times.columns]
+    return times[configs].rdiv(times[reference], axis=0)
+
+
+def contributions(results: list) -> pd.Series:
+    """
+    Leave-one-out contribution of each optimization: the median over queries
+    of time without it / time with everything on. Below 1 means switching it
+    off made queries faster, i.e. the optimization does not pay off.
+    """
+    matrix = speedup_matrix(results, reference="all")
+    removed = [c for c in matrix.columns if c.startswith("-")]
+    # matrix holds t(all) / t(config); invert for t(-x) / t(all)
+    return (1 / matrix[removed]).median().rename(lambda c: c[1:]).sort_values(ascending=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SimpleCQ under optimizer ablations.")
+    parser.add_argument("--data-dir", help="Directory of CSV tables (default: <project>/data), used with TEST_QUERIES")
+    parser.add_argument("--healthcare-rows", type=int,
+                        help="Use the generated healthcare dataset with this many rows and the sweep queries")
+    parser.add_argument("--workload", type=int, default=0, help="Add this many random workload queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=MODES, default="leave-one-out")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--output", help="Write raw results to this .json or .csv file")
+    parser.add_argument("--plot", help="Save the speedup heatmap to this image file")
+    args = parser.parse_args(argv)
+
+    if args.healthcare_rows:
+        from benchmarking_suite.scalability import SWEEP_QUERIES, generate_healthcare_tables
+        tables = generate_healthcare_tables(args.healthcare_rows, args.seed)
+        queries = [(qid, parse_query_from_string(text)) for qid, text in SWEEP_QUERIES]
+    else:
+        from benchmarking_suite.run_benchmarks import TEST_QUERIES, load_tables_from_dir
+        tables = load_tables_from_dir(args.data_dir or os.path.join(PROJECT_ROOT, "data"))
+        if not tables:
+            return 1
+        queries = [(qid, parse_query_from_string(text)) for qid, name, text in TEST_QUERIES
+                   if all(t in tables for t in parse_query_from_string(text)["join_order"])]
+    if args.workload:
+        from benchmarking_suite.workload import Catalog, WorkloadGenerator
+        generator = WorkloadGenerator(Catalog.from_tables(tables, seed=args.seed), seed=args.seed)
+        queries += [(q["query_id"], q["parsed"]) for q in generator.generate(args.workload)]
+
+    results = run_ablation(tables, queries, args.mode, args.warmup, args.repetitions)
+    if args.output:
+        save_results(results, args.output)
+
+    matrix = speedup_matrix(results)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("\nSpeedup over no optimizations:")
+        print(matrix.round(2).to_string())
+        if args.mode == "leave-one-out":
+            print("\nMedian slowdown when each optimization is switched off:")
+            print(contributions(results).round(3).to_string())
+    if args.plot:
+        from benchmarking_suite.visualize import plot_speedup_matrix
+        fig = plot_speedup_matrix(matrix)
+        if fig:
+            fig.savefig(args.plot)
+    return 1 if any(r["result_changed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,60 +1,112 @@
 import time
 import tracemalloc
-from core_engine.simple_cqc import SimpleCQ
+from core_engine.simple_cqc import MemoryBudgetExceeded, SimpleCQ, query_kwargs
+from core_engine.tracing import NULL_TRACER, RecordingTracer
+from benchmarking_suite.fingerprint import result_fingerprint
+from benchmarking_suite.helpers import peak_rss_bytes, summarize_timings
 
-def benchmark_cq(tables: dict, query_parts: dict):
+
+def memory_budget_error(engine: SimpleCQ, query_parts: dict, memory_budget: int = None):
+    """
+    Why a query's estimated peak memory is over `memory_budget` (bytes), or
+    None when it fits or there is no budget. Benchmarks skip such queries on
+    both engines, since SQLite would materialize the same result. Timed runs
+    do not set the engine's budget, so live accounting does not distort them.
+    """
+    if memory_budget is None:
+        return None
+    try:
+        engine.check_memory(engine.plan_query(**query_kwargs(query_parts)), memory_budget)
+    except MemoryBudgetExceeded as e:
+        return str(e)
+    return None
+
+
+def benchmark_cq(tables: dict, query_parts: dict, warmup: int = 1, repetitions: int = 5,
+                 measure_memory: bool = True, engine: SimpleCQ = None):
     """
     Benchmark SimpleCQ engine with proper error handling and memory management.
+
+    Runs the full parsed query (select, aggregates, DISTINCT, ORDER BY, LIMIT, ...)
+    `warmup` times untimed (at least once), then `repetitions` timed runs.
+    Memory is measured in a separate run with tracemalloc, so it does not distort
+    the timings. Per-operator timings come from the warmup run via a
+    RecordingTracer and are reported as 'operator_timings'.
+
+    'execution_time_seconds' is the median of the timed runs; min, p95 and
+    stddev are reported alongside it. Pass a prepared `engine` to skip
+    preparing `tables` again. 'result_fingerprint' is an order-insensitive
+    hash of the result for cross-checking against SQLite.
     """
+    tracer = RecordingTracer()
     try:
         # Prepare tables with prefixed columns
-        prepared_tables = SimpleCQ.prepare_tables(tables)
-        engine = SimpleCQ(prepared_tables)
-        
-        # Start memory and time tracking
-        tracemalloc.start()
-        start_time = time.perf_counter()
-        
-        # Execute query
-        df_result = engine.run_query(
-            query_parts["join_order"],
-            query_parts["join_conditions"],
-            query_parts["compare_conditions"]
-        )
-        
-        # Stop timing and memory tracking
-        end_time = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        
-        # Calculate metrics
-        #result_rows = df_result.shape[0] if df_result is not None else 0
-        result_cols = df_result.shape[1] if df_result is not None else 0
-        
+        if engine is None:
+            engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+        kwargs = query_kwargs(query_parts)
+
+        # Warmup runs, the first one traced per operator
+        original_tracer = engine.tracer
+        engine.tracer = tracer
+        try:
+            df_result = engine.run_query(**kwargs)
+            engine.tracer = NULL_TRACER
+            for _ in range(warmup - 1):
+                engine.run_query(**kwargs)
+        finally:
+            engine.tracer = original_tracer
+
+        # Timed runs
+        samples = []
+        for _ in range(repetitions):
+            start_time = time.perf_counter()
+            df_result = engine.run_query(**kwargs)
+            samples.append(time.perf_counter() - start_time)
+
+        # Separate memory run
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                engine.run_query(**kwargs)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        stats = summarize_timings(samples)
         return {
             'query_expr': "SimpleCQ Query",
-            'execution_time_seconds': end_time - start_time,
+            'execution_time_seconds': stats['median'],
+            'time_min_seconds': stats['min'],
+            'time_median_seconds': stats['median'],
+            'time_p95_seconds': stats['p95'],
+            'time_stddev_seconds': stats['stddev'],
+            'time_samples_seconds': samples,
+            'repetitions': repetitions,
             'memory_peak_bytes': peak,
-            #'result_rows': result_rows,
-            'result_columns': result_cols,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'result_rows': df_result.shape[0] if df_result is not None else 0,
+            'result_columns': df_result.shape[1] if df_result is not None else 0,
+            'result_fingerprint': result_fingerprint(df_result, query_parts.get('join_order') or ()).digest,
+            'operator_timings': tracer.stage_timings(),
             'error': None
         }
-        
+
     except Exception as e:
         # Ensure tracemalloc is stopped even on error
-        try:
+        if tracemalloc.is_tracing():
             tracemalloc.stop()
-        except:
-            pass
-            
+
         print(f"Error during SimpleCQ query: {str(e)}")
         import traceback
         traceback.print_exc()
-        
+
         return {
             'query_expr': "SimpleCQ Query",
             'execution_time_seconds': 0,
             'memory_peak_bytes': 0,
+            'result_rows': 0,
             'result_columns': 0,
+            'operator_timings': tracer.stage_timings(),
             'error': str(e)
         }
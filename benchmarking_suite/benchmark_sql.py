@@ -1,65 +1,266 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
 import time
 import tracemalloc
-import sqlite3
+from collections import OrderedDict
 import pandas as pd
+from core_engine.expressions import ColumnRef, Comparison, conjuncts, to_cnf
+from benchmarking_suite.fingerprint import datetime_text, result_fingerprint
+from benchmarking_suite.helpers import peak_rss_bytes, summarize_timings
+
+# Tuning applied to every baseline connection.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": -256 * 1024,     # negative = KiB, i.e. 256 MiB
+    "mmap_size": 1024 * 1024 * 1024,
+}
+DEFAULT_DB_DIR = os.path.join(tempfile.gettempdir(), "cqc_accelerator_sqlite")
+# Bumped whenever the way tables are stored changes, so stale files are not reused.
+_STORAGE_FORMAT = 2
+
+_INDEXABLE_OPS = {"=", "==", "<", "<=", ">", ">=", "IN"}
+_baselines = {}
+_fingerprints = OrderedDict()
+_lock = threading.Lock()
+
 
-def benchmark_sql(tables: dict, sql_query: str):
+def _sanitize(col: str) -> str:
+    return col.strip('"\'').replace(' ', '_')
+
+
+def dataset_fingerprint(tables: dict) -> str:
     """
-    Benchmark SQLite with proper error handling and connection management.
+    Content hash of a set of tables (names, columns and row hashes), used to
+    key the on-disk baseline database. Recent results are memoized per frame.
     """
-    conn = None
-    try:
-        # Create in-memory SQLite database
-        conn = sqlite3.connect(":memory:")
-        
-        # Load tables into SQLite with sanitized column names
-        for tname, df in tables.items():
+    key = tuple((name, id(df)) for name, df in sorted(tables.items()))
+    with _lock:
+        if key in _fingerprints:
+            return _fingerprints[key][1]
+    digest = hashlib.sha1()
+    for name, df in sorted(tables.items()):
+        digest.update(name.encode())
+        digest.update(repr(list(df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    version = digest.hexdigest()[:16]
+    with _lock:
+        # Keep the frames referenced so their ids stay unique while memoized
+        _fingerprints[key] = (tuple(tables.values()), version)
+        while len(_fingerprints) > 4:
+            _fingerprints.popitem(last=False)
+    return version
+
+
+def index_columns(query_parts: dict) -> set:
+    """(table, column) pairs worth indexing: join keys and filter columns."""
+    columns = set()
+    for t1, c1, t2, c2 in query_parts.get("join_conditions") or []:
+        columns.add((t1, _sanitize(c1)))
+        columns.add((t2, _sanitize(c2)))
+    where = query_parts.get("where")
+    predicates = conjuncts(to_cnf(where)) if where is not None else []
+    for pred in predicates:
+        if isinstance(pred, Comparison) and pred.table and pred.op.upper() in _INDEXABLE_OPS:
+            columns.add((pred.table, _sanitize(pred.column)))
+            if isinstance(pred.value, ColumnRef) and pred.value.table:
+                columns.add((pred.value.table, _sanitize(pred.value.column)))
+    for t, c, op, val, logic in query_parts.get("compare_conditions") or []:
+        if t and op.upper() in _INDEXABLE_OPS:
+            columns.add((t, _sanitize(c)))
+    return columns
+
+
+class SQLiteBaseline:
+    """
+    A properly configured SQLite database to benchmark SimpleCQ against.
+
+    Tables are loaded once into an on-disk file named after the dataset
+    version (a content hash by default) and reused by later runs and processes.
+    One connection with tuning PRAGMAs is kept open, indexes on join and filter
+    columns are created on demand, and load, index build and query times are
+    reported separately.
+    """
+    def __init__(self, tables: dict, db_dir: str = None, dataset_version: str = None):
+        self.tables = tables
+        self.dataset_version = dataset_version or dataset_fingerprint(tables)
+        self.db_dir = db_dir or DEFAULT_DB_DIR
+        self.path = os.path.join(self.db_dir, f"baseline_v{_STORAGE_FORMAT}_{self.dataset_version}.sqlite")
+        self.load_seconds = 0.0
+        self.index_seconds = 0.0
+        self.conn = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is not None:
+            return self.conn
+        os.makedirs(self.db_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        self.conn = conn
+        if not self._is_loaded():
+            self._load()
+        return conn
+
+    def _is_loaded(self) -> bool:
+        row = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = '_baseline_meta'").fetchone()
+        if not row:
+            return False
+        loaded = {r[0] for r in self.conn.execute("SELECT table_name FROM _baseline_meta")}
+        return set(self.tables) <= loaded
+
+    def _load(self):
+        start = time.perf_counter()
+        conn = self.conn
+        conn.execute("CREATE TABLE IF NOT EXISTS _baseline_meta (table_name TEXT PRIMARY KEY, rows INTEGER)")
+        for tname, df in self.tables.items():
             df_copy = df.copy()
             # Sanitize column names to match what SimpleCQ expects
-            df_copy.columns = [col.replace(' ', '_') for col in df_copy.columns]
-            df_copy.to_sql(tname, conn, index=False, if_exists='replace')
-        
-        # Start benchmarking
-        tracemalloc.start()
-        start_time = time.perf_counter()
-        
-        # Execute query
-        df_result = pd.read_sql_query(sql_query, conn)
-        
-        # Stop benchmarking
-        end_time = time.perf_counter()
-        current, peak = tracemalloc.get_traced_memory()
-        tracemalloc.stop()
-        
+            df_copy.columns = [_sanitize(col) for col in df_copy.columns]
+            # Store dates as 'YYYY-MM-DD' text so they compare equal to date literals
+            for col in df_copy.columns[[pd.api.types.is_datetime64_any_dtype(t) for t in df_copy.dtypes]]:
+                df_copy[col] = datetime_text(df_copy[col])
+            df_copy.to_sql(tname, conn, index=False, if_exists='replace', chunksize=50000)
+            conn.execute("INSERT OR REPLACE INTO _baseline_meta VALUES (?, ?)", (tname, len(df)))
+        conn.commit()
+        self.load_seconds = time.perf_counter() - start
+
+    def ensure_indexes(self, query_parts: dict) -> float:
+        """Creates missing indexes for a query; returns the seconds spent building them."""
+        conn = self.connect()
+        start = time.perf_counter()
+        created = False
+        for table, col in sorted(index_columns(query_parts)):
+            if table not in self.tables:
+                continue
+            name = f"idx_{table}_{col}"
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+                continue
+            conn.execute(f'CREATE INDEX "{name}" ON "{table}" ("{col}")')
+            created = True
+        if created:
+            conn.execute("ANALYZE")
+            conn.commit()
+        elapsed = time.perf_counter() - start
+        self.index_seconds += elapsed
+        return elapsed
+
+    def execute(self, sql_query: str, fetch: str = "cursor"):
+        """
+        Runs a query. fetch="cursor" returns (rows, column names) straight from
+        the cursor; fetch="pandas" returns a DataFrame via pd.read_sql_query.
+        """
+        conn = self.connect()
+        with self._lock:
+            if fetch == "pandas":
+                return pd.read_sql_query(sql_query, conn)
+            cursor = conn.execute(sql_query)
+            rows = cursor.fetchall()
+            return rows, [d[0] for d in cursor.description or []]
+
+    def benchmark(self, sql_query: str, query_parts: dict = None, warmup: int = 1, repetitions: int = 5,
+                  measure_memory: bool = True, fetch: str = "cursor") -> dict:
+        self.connect()
+        index_seconds = self.ensure_indexes(query_parts) if query_parts else 0.0
+
+        # Warmup
+        for _ in range(max(warmup, 1)):
+            result = self.execute(sql_query, fetch)
+
+        # Timed runs
+        samples = []
+        for _ in range(repetitions):
+            start_time = time.perf_counter()
+            result = self.execute(sql_query, fetch)
+            samples.append(time.perf_counter() - start_time)
+
+        # Separate memory run
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                self.execute(sql_query, fetch)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        if fetch != "pandas":
+            result = pd.DataFrame.from_records(result[0], columns=result[1], coerce_float=True)
+        n_rows, n_cols = result.shape
+        stats = summarize_timings(samples)
         return {
             "query_expr": "SQLite Query",
-            "execution_time_seconds": end_time - start_time,
+            "execution_time_seconds": stats["median"],
+            "time_min_seconds": stats["min"],
+            "time_median_seconds": stats["median"],
+            "time_p95_seconds": stats["p95"],
+            "time_stddev_seconds": stats["stddev"],
+            "time_samples_seconds": samples,
+            "repetitions": repetitions,
+            "load_time_seconds": self.load_seconds,
+            "index_time_seconds": index_seconds,
+            "fetch": fetch,
             "memory_peak_bytes": peak,
-            #"result_rows": len(df_result),
-            "result_columns": len(df_result.columns),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "result_rows": n_rows,
+            "result_columns": n_cols,
+            "result_fingerprint": result_fingerprint(result).digest,
             "error": None
         }
-        
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def get_baseline(tables: dict, db_dir: str = None, dataset_version: str = None) -> SQLiteBaseline:
+    """Returns the shared SQLiteBaseline (and its open connection) for a dataset."""
+    version = dataset_version or dataset_fingerprint(tables)
+    key = (db_dir or DEFAULT_DB_DIR, version)
+    with _lock:
+        if key not in _baselines:
+            _baselines[key] = SQLiteBaseline(tables, db_dir, version)
+        return _baselines[key]
+
+
+def benchmark_sql(tables: dict, sql_query: str, warmup: int = 1, repetitions: int = 5,
+                  measure_memory: bool = True, query_parts: dict = None, fetch: str = "cursor",
+                  db_dir: str = None, dataset_version: str = None):
+    """
+    Benchmark SQLite with proper error handling and connection management.
+    Uses the same warmup / repetition / separate memory run protocol as
+    benchmark_cq, so the two result dicts are directly comparable.
+
+    The database is a persistent, indexed SQLiteBaseline shared across calls;
+    pass the parsed `query_parts` so join and filter columns get indexed, and a
+    `dataset_version` to skip content-hashing the tables.
+    """
+    try:
+        baseline = get_baseline(tables, db_dir, dataset_version)
+        return baseline.benchmark(sql_query, query_parts, warmup, repetitions, measure_memory, fetch)
+
     except Exception as e:
         # Ensure cleanup on error
-        try:
+        if tracemalloc.is_tracing():
             tracemalloc.stop()
-        except:
-            pass
-            
+
         print(f"Error executing SQLite query: {sql_query}")
         print(f"Error details: {str(e)}")
         import traceback
         traceback.print_exc()
-        
+
         return {
             "query_expr": "SQLite Query",
             "execution_time_seconds": 0,
             "memory_peak_bytes": 0,
-            #"result_rows": 0,
+            "result_rows": 0,
             "result_columns": 0,
             "error": str(e)
         }
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
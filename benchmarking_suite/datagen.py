@@ -0,0 +1,294 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Rows are generated in fixed blocks, each with its own seeded generator, so a
+# table's contents depend only on (schema, table, seed, scale factor) and not
+# on the chunk size, the output format or the number of worker processes.
+BLOCK_ROWS = 1 << 16
+DEFAULT_CHUNK_ROWS = 1_000_000
+FORMATS = ("csv", "parquet")
+
+_FIRST_NAMES = np.array(['Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Sophia', 'Jackson', 'Isabella', 'Lucas', 'Mia'])
+_LAST_NAMES = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez'])
+_CONDITIONS = np.array(['Hypertension', 'Diabetes', 'Asthma', 'Arthritis', 'Migraine', 'Allergy', 'None'])
+_MEDICATIONS = np.array(['Lisinopril', 'Metformin', 'Albuterol', 'Ibuprofen', 'Sumatriptan', 'Cetirizine', 'Amoxicillin'])
+_SPECIALTIES = np.array(['Cardiology', 'Endocrinology', 'Pulmonology', 'Rheumatology', 'Neurology', 'General Practice'])
+_VISIT_REASONS = np.array(['Checkup', 'Follow-up', 'Emergency', 'Consultation'])
+
+
+def zipf_keys(rng, n_keys: int, size: int, skew: float = 0.0) -> np.ndarray:
+    """
+    `size` foreign keys in 1..n_keys. skew=0 is uniform; skew=s > 0 draws key
+    ranks from a bounded Zipf(s) distribution (inverse CDF of its continuous
+    approximation, so memory stays O(size) for any n_keys). Ranks are then
+    scattered over the key space so the hot keys are not simply the smallest ids.
+    """
+    if skew <= 0:
+        return rng.integers(1, n_keys + 1, size)
+    u = rng.random(size)
+    if abs(skew - 1.0) < 1e-9:
+        ranks = np.exp(u * np.log(n_keys + 1))
+    else:
+        a = 1.0 - skew
+        ranks = ((float(n_keys + 1) ** a - 1.0) * u + 1.0) ** (1.0 / a)
+    ranks = np.clip(np.floor(ranks).astype(np.int64), 1, n_keys)
+    # Multiplying by a prime coprime to n_keys is a bijection on 0..n_keys-1
+    step = 1_000_003 if n_keys % 1_000_003 else 999_983
+    return (ranks - 1) * step % n_keys + 1
+
+
+def _numbered(prefix: str, ids, width: int = 0) -> pd.Series:
+    digits = pd.Series(ids).astype(str)
+    return prefix + (digits.str.zfill(width) if width else digits)
+
+
+def _days(rng, start: str, span: int, size: int) -> np.ndarray:
+    return np.datetime64(start) + rng.integers(0, span, size).astype('timedelta64[D]')
+
+
+# ---------- healthcare (data/generate_patients.py) ----------
+
+def _patients(rng, ids, sizes, skew):
+    n = len(ids)
+    return pd.DataFrame({
+        'patient_id': ids,
+        'first_name': rng.choice(_FIRST_NAMES, n),
+        'last_name': rng.choice(_LAST_NAMES, n),
+        'date_of_birth': _days(rng, '1950-01-01', 25551, n),
+        'primary_condition': rng.choice(_CONDITIONS, n),
+    })
+
+
+def _appointments(rng, ids, sizes, skew):
+    n = len(ids)
+    return pd.DataFrame({
+        'appointment_id': ids,
+        'patient_id': zipf_keys(rng, sizes['patients'], n, skew),
+        'appointment_date': _days(rng, '2023-01-01', 731, n),
+        'doctor_specialty': rng.choice(_SPECIALTIES, n),
+        'visit_reason': rng.choice(_VISIT_REASONS, n),
+    })
+
+
+def _prescriptions(rng, ids, sizes, skew):
+    n = len(ids)
+    return pd.DataFrame({
+        'prescription_id': ids,
+        'appointment_id': zipf_keys(rng, sizes['appointments'], n, skew),
+        'medication_name': rng.choice(_MEDICATIONS, n),
+        'dosage': pd.Series(rng.integers(5, 101, n)).astype(str) + ' mg',
+        'duration_days': rng.integers(7, 90, n),
+    })
+
+
+# ---------- commerce (data/generate.py) ----------
+
+def _organizations(rng, ids, sizes, skew):
+    n, half = len(ids), sizes['organizations'] // 2
+    return pd.DataFrame({
+        'Org Index': ids,
+        'Organization Id': _numbered('ORG', ids, 6),
+        'Name': _numbered('Org', ids),
+        'Website': _numbered('https://org', ids) + '.com',
+        'Country': np.where(ids <= half, 'Canada', 'USA'),
+        'Description': np.full(n, 'Description'),
+        'Founded': 2010 + ids % 15,
+        'Industry': np.where(ids <= half, 'Technology', 'Healthcare'),
+        'Number of employees': rng.integers(50, 10001, n),
+    })
+
+
+def _phones(rng, n):
+    return (pd.Series(rng.integers(100, 1000, n)).astype(str) + '-'
+            + pd.Series(rng.integers(100, 1000, n)).astype(str) + '-'
+            + pd.Series(rng.integers(1000, 10000, n)).astype(str))
+
+
+def _customers(rng, ids, sizes, skew):
+    n, total = len(ids), sizes['customers']
+    return pd.DataFrame({
+        'Cust Index': ids,
+        'Customer Id': _numbered('CID', ids, 6),
+        'First Name': _numbered('Name', ids),
+        'Last Name': rng.choice(np.array(['Smith', 'Johnson', 'Lee', 'Patel', 'Garcia']), n),
+        'Company': _numbered('Org', zipf_keys(rng, sizes['organizations'], n, skew)),
+        'City': np.where(ids <= total // 2, 'Toronto', 'New York'),
+        'Country': np.where(ids <= total * 6 // 10, 'Canada', 'USA'),
+        'Phone 1': _phones(rng, n),
+        'Phone 2': _phones(rng, n),
+        'Email': _numbered('name', ids) + '@example.com',
+        'Subscription Date': np.full(n, '2023-01-01'),
+        'Website': np.full(n, 'http://example.com'),
+    })
+
+
+def _products(rng, ids, sizes, skew):
+    n, half = len(ids), sizes['products'] // 2
+    kind = np.where(ids % 2 == 0, 'Smart device ', 'Basic device ')
+    return pd.DataFrame({
+        'Prod Index': ids,
+        'Internal ID': _numbered('INT', ids, 6),
+        'Name': _numbered('Product', ids),
+        'Description': kind + pd.Series(ids).astype(str),
+        'Brand': np.where(ids <= half, 'BrandA', 'BrandB'),
+        'Category': np.where(ids <= half, 'Electronics', 'Clothing'),
+        'Price': np.round(rng.uniform(20, 1000, n), 2),
+        'Currency': np.full(n, 'USD'),
+        'Stock': rng.integers(0, 101, n),
+        'EAN': _numbered('EAN', ids, 13),
+        'Color': rng.choice(np.array(['Black', 'White', 'Blue', 'Red']), n),
+        'Size': rng.choice(np.array(['S', 'M', 'L', 'XL']), n),
+        'Availability': np.full(n, 'In Stock'),
+        'Customer Id': _numbered('CID', zipf_keys(rng, sizes['customers'], n, skew), 6),
+    })
+
+
+def _transactions(rng, ids, sizes, skew):
+    n = len(ids)
+    minutes = (ids - 1).astype('timedelta64[m]')
+    return pd.DataFrame({
+        'Transaction Id': _numbered('TX', ids, 7),
+        'Customer Id': _numbered('CID', zipf_keys(rng, sizes['customers'], n, skew), 6),
+        'Product Id': _numbered('INT', zipf_keys(rng, sizes['products'], n, skew), 6),
+        'Purchase Date': pd.Series(np.datetime64('2023-01-01T00:00') + minutes).dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'Quantity': rng.integers(1, 6, n),
+        'Total Price': np.round(rng.uniform(20, 1500, n), 2),
+    })
+
+
+# schema -> table -> (rows at scale factor 1, block generator). Parent tables
+# come before the tables referencing them.
+SCHEMAS = {
+    "healthcare": {
+        "patients": (1_000_000, _patients),
+        "appointments": (1_000_000, _appointments),
+        "prescriptions": (1_000_000, _prescriptions),
+    },
+    "commerce": {
+        "organizations": (100_000, _organizations),
+        "customers": (10_000, _customers),
+        "products": (100_000, _products),
+        "transactions": (200_000, _transactions),
+    },
+}
+
+
+def table_sizes(schema: str, scale_factor: float = 1.0) -> dict:
+    """Row count of every table of `schema` at `scale_factor`."""
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unknown schema: {schema}. Expected one of {', '.join(SCHEMAS)}")
+    return {table: max(1, int(round(base * scale_factor))) for table, (base, _) in SCHEMAS[schema].items()}
+
+
+def generate_chunks(schema: str, table: str, scale_factor: float = 1.0, seed: int = 42,
+                    skew: float = 0.0, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yields `table` as DataFrames of about `chunk_rows` rows (rounded up to whole blocks)."""
+    sizes = table_sizes(schema, scale_factor)
+    if table not in sizes:
+        raise ValueError(f"Unknown table for schema {schema}: {table}")
+    table_index = list(sizes).index(table)
+    make = SCHEMAS[schema][table][1]
+    rows = sizes[table]
+    blocks_per_chunk = max(1, -(-chunk_rows // BLOCK_ROWS))
+    for chunk_start in range(0, rows, blocks_per_chunk * BLOCK_ROWS):
+        parts = []
+        for start in range(chunk_start, min(rows, chunk_start + blocks_per_chunk * BLOCK_ROWS), BLOCK_ROWS):
+            rng = np.random.default_rng([seed, table_index, start // BLOCK_ROWS])
+            ids = np.arange(start + 1, min(rows, start + BLOCK_ROWS) + 1)
+            parts.append(make(rng, ids, sizes, skew))
+        yield pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def generate_tables(schema: str = "healthcare", scale_factor: float = 1.0, seed: int = 42,
+                    skew: float = 0.0) -> dict:
+    """Every table of `schema` as in-memory DataFrames."""
+    return {table: pd.concat(generate_chunks(schema, table, scale_factor, seed, skew), ignore_index=True)
+            for table in table_sizes(schema, scale_factor)}
+
+
+def write_table(out_dir: str, schema: str, table: str, scale_factor: float = 1.0, seed: int = 42,
+                skew: float = 0.0, formats=("csv",), chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Streams one table chunk by chunk into <out_dir>/<table>.csv and/or
+    <table>.parquet, holding at most one chunk in memory. Returns
+    {'table', 'rows', 'seconds', <format>: path}.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown output format: {', '.join(sorted(unknown))}")
+    if "parquet" in formats:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {fmt: os.path.join(out_dir, f"{table}.{fmt}") for fmt in formats}
+    started = time.perf_counter()
+    rows = 0
+    writer = None
+    try:
+        for i, chunk in enumerate(generate_chunks(schema, table, scale_factor, seed, skew, chunk_rows)):
+            if "csv" in paths:
+                chunk.to_csv(paths["csv"], mode="w" if i == 0 else "a", header=i == 0, index=False,
+                             date_format="%Y-%m-%d")
+            if "parquet" in paths:
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(paths["parquet"], batch.schema)
+                writer.write_table(batch)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"table": table, "rows": rows, "seconds": time.perf_counter() - started, **paths}
+
+
+def write_dataset(out_dir: str, schema: str = "healthcare", scale_factor: float = 1.0, seed: int = 42,
+                  skew: float = 0.0, formats=("csv",), chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                  workers: int = 1) -> list:
+    """
+    Writes every table of `schema`, in `workers` processes when > 1. Tables are
+    seeded independently, so the output is identical for any worker count.
+    """
+    jobs = [(out_dir, schema, table, scale_factor, seed, skew, tuple(formats), chunk_rows)
+            for table in table_sizes(schema, scale_factor)]
+    if workers <= 1:
+        return [write_table(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(write_table, *zip(*jobs)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate seeded benchmark datasets at a scale factor.")
+    parser.add_argument("schema", choices=sorted(SCHEMAS))
+    parser.add_argument("--scale-factor", type=float, default=1.0,
+                        help="Multiplier on the base table sizes (healthcare: 1M rows per table)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=0.0,
+                        help="Zipf exponent for foreign keys (0 = uniform, ~1 = heavily skewed)")
+    parser.add_argument("--out-dir", default=os.path.join(PROJECT_ROOT, "data"))
+    parser.add_argument("--format", dest="formats", nargs="+", choices=FORMATS, default=["csv"])
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="Generate tables in parallel processes")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    for written in write_dataset(args.out_dir, args.schema, args.scale_factor, args.seed, args.skew,
+                                 args.formats, args.chunk_rows, args.workers):
+        files = ", ".join(written[fmt] for fmt in args.formats)
+        print(f"{written['table']:>15}: {written['rows']:,} rows in {written['seconds']:.1f}s -> {files}")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import hashlib
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Floats are rounded to this many decimals so AVG/SUM results computed in a
+# different order by SQLite and pandas still hash equal.
+FLOAT_DECIMALS = 6
+_NULL = "\x00NULL"
+
+ResultFingerprint = namedtuple("ResultFingerprint", ["rows", "columns", "digest"])
+
+
+def normalize_column_name(name, tables=()) -> str:
+    """
+    Engine-neutral column name: lower-cased, spaces as underscores, without the
+    '<table>_' prefix SimpleCQ adds to every column.
+    """
+    name = str(name).strip('"\'').replace(" ", "_").lower()
+    for table in tables:
+        prefix = f"{table.lower()}_"
+        if name.startswith(prefix) and len(name) > len(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def datetime_text(col: pd.Series) -> pd.Series:
+    """
+    Datetimes as the text SQLite stores them as: 'YYYY-MM-DD' when every value
+    is at midnight, 'YYYY-MM-DD HH:MM:SS' otherwise. Nulls stay null.
+    """
+    values = col.dropna()
+    date_only = bool((values == values.dt.normalize()).all())
+    return col.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S").where(col.notna(), None)
+
+
+def normalize_result(df: pd.DataFrame, tables=()) -> pd.DataFrame:
+    """
+    Rewrites a result frame into a canonical form that SimpleCQ and SQLite
+    outputs agree on: normalized column names in sorted order, numbers and
+    booleans as rounded float64 (nulls as NaN), datetimes as SQLite-style
+    text, everything else as strings with a single null sentinel.
+    """
+    names = [normalize_column_name(c, tables) for c in df.columns]
+    # Stable sort keeps duplicate names in select order
+    order = sorted(range(len(names)), key=lambda i: names[i])
+    columns = {}
+    for position, i in enumerate(order):
+        col = df.iloc[:, i]
+        if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+            # Adding 0.0 turns -0.0 into 0.0 so both hash equal
+            col = col.astype("float64").round(FLOAT_DECIMALS) + 0.0
+        elif pd.api.types.is_datetime64_any_dtype(col):
+            col = datetime_text(col).astype(object).where(col.notna(), _NULL)
+        else:
+            col = col.astype(object).where(col.notna(), _NULL).astype(str)
+        columns[f"{position}:{names[i]}"] = col.to_numpy()
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+def row_hashes(df: pd.DataFrame, tables=()) -> np.ndarray:
+    """uint64 hash per row of the normalized result."""
+    return pd.util.hash_pandas_object(normalize_result(df, tables), index=False).to_numpy()
+
+
+def result_fingerprint(df: pd.DataFrame, tables=()) -> ResultFingerprint:
+    """
+    Order-insensitive fingerprint of a query result. Row hashes are combined
+    with a wrapping uint64 sum (and a sum of their squares), which is
+    commutative and counts duplicate rows, so no sort is needed. The digest
+    also covers the row count and normalized column names.
+    """
+    if df is None:
+        return ResultFingerprint(0, (), "")
+    hashes = row_hashes(df, tables)
+    with np.errstate(over="ignore"):
+        total = int(hashes.sum(dtype=np.uint64)) if hashes.size else 0
+        squares = int((hashes * hashes).sum(dtype=np.uint64)) if hashes.size else 0
+    columns = tuple(sorted(normalize_column_name(c, tables) for c in df.columns))
+    digest = hashlib.sha1(f"{len(df)}|{columns}|{total}|{squares}".encode()).hexdigest()[:24]
+    return ResultFingerprint(len(df), columns, digest)
+
+
+def diff_results(left: pd.DataFrame, right: pd.DataFrame, left_tables=(), right_tables=(),
+                 sample: int = 5, seed: int = 0) -> dict:
+    """
+    Multiset difference of two results by row hash. Returns the number of rows
+    found only on each side and up to `sample` example rows of each (taken
+    from the original frames, so they are easy to read).
+    """
+    left_hashes = pd.Series(row_hashes(left, left_tables))
+    right_hashes = pd.Series(row_hashes(right, right_tables))
+    # Number each duplicate so multisets compare row by row
+    left_keys = pd.MultiIndex.from_arrays([left_hashes, left_hashes.groupby(left_hashes).cumcount()])
+    right_keys = pd.MultiIndex.from_arrays([right_hashes, right_hashes.groupby(right_hashes).cumcount()])
+    only_left = ~left_keys.isin(right_keys)
+    only_right = ~right_keys.isin(left_keys)
+
+    def _sample(df, mask):
+        rows = df[np.asarray(mask)]
+        return rows.sample(min(sample, len(rows)), random_state=seed) if len(rows) > sample else rows
+
+    return {
+        "match": not only_left.any() and not only_right.any(),
+        "only_in_left": int(only_left.sum()),
+        "only_in_right": int(only_right.sum()),
+        "left_sample": _sample(left, only_left),
+        "right_sample": _sample(right, only_right),
+    }
+
+
+def format_diff(diff: dict, left_name: str = "SimpleCQ", right_name: str = "SQLite") -> str:
+    if diff["match"]:
+        return "Results match."
+    lines = [f"Result mismatch: {diff['only_in_left']} row(s) only in {left_name}, "
+             f"{diff['only_in_right']} row(s) only in {right_name}."]
+    for name, rows in ((left_name, diff["left_sample"]), (right_name, diff["right_sample"])):
+        if len(rows):
+            lines.append(f"Sample rows only in {name}:")
+            lines.append(rows.to_string(index=False))
+    return "\n".join(lines)
+
+
+def verify_results(cq_result: dict, sql_result: dict, engine, baseline, query_parts: dict, sql_query: str,
+                   sample: int = 5):
+    """
+    Cross-checks a benchmark_cq result against the matching benchmark_sql
+    result by fingerprint and sets 'result_match' on both. Only on a mismatch
+    are the queries re-run to build a sampled row diff, which is returned
+    (None when the results match or either run failed).
+    """
+    if cq_result.get("error") or sql_result.get("error"):
+        return None
+    match = cq_result.get("result_fingerprint") == sql_result.get("result_fingerprint")
+    cq_result["result_match"] = sql_result["result_match"] = match
+    if match:
+        return None
+    return diff_results(engine.run_parsed(query_parts), baseline.execute(sql_query, "pandas"),
+                        query_parts.get("join_order") or (), sample=sample)
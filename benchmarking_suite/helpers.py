@@ -1,4 +1,82 @@
+import csv
+import json
+import os
 import re
+import sys
+import numpy as np
+import pandas as pd
+from core_engine.expressions import to_sql
+
+
+def summarize_timings(samples: list) -> dict:
+    """
+    Summary statistics (seconds) over repeated timing samples: min, median,
+    p95, mean and sample standard deviation.
+    """
+    arr = np.asarray(samples, dtype=float)
+    if arr.size == 0:
+        return {"min": None, "median": None, "p95": None, "mean": None, "stddev": None}
+    return {
+        "min": float(arr.min()),
+        "median": float(np.median(arr)),
+        "p95": float(np.percentile(arr, 95)),
+        "mean": float(arr.mean()),
+        "stddev": float(arr.std(ddof=1)) if arr.size > 1 else 0.0,
+    }
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process in bytes, or None where the
+    resource module is unavailable (Windows). This is a process-wide high-water
+    mark, so it only ever grows between calls.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def load_tables_from_dir(data_directory: str) -> dict:
+    """
+    Helper function to load all CSV and Parquet files from a directory. When a
+    table exists in both formats the Parquet file is used.
+    """
+    tables = {}
+    if not os.path.isdir(data_directory):
+        print(f"Error: Data directory not found at '{data_directory}'")
+        return None
+
+    for filename in sorted(os.listdir(data_directory)):
+        table_name, ext = os.path.splitext(filename)
+        file_path = os.path.join(data_directory, filename)
+        if ext == ".csv" and table_name.lower() not in tables:
+            tables[table_name.lower()] = pd.read_csv(file_path)
+        elif ext == ".parquet":
+            tables[table_name.lower()] = pd.read_parquet(file_path)
+    return tables
+
+
+def save_results(results: list, path: str):
+    """
+    Writes a list of benchmark result dicts as JSON (.json) or CSV (any other
+    extension). Nested values such as operator timings are JSON-encoded in CSV.
+    """
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        return
+    fieldnames = []
+    for row in results:
+        fieldnames.extend(k for k in row if k not in fieldnames)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in results:
+            writer.writerow({k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in row.items()})
 
 def generate_sql_equivalent_query(query_parts: dict, select_cols: list = None) -> str:
     """
@@ -32,19 +110,22 @@ def generate_sql_equivalent_query(query_parts: dict, select_cols: list = None) -
     from_table = query_parts['join_order'][0]
     sql += f" FROM {from_table}"
 
-    # JOIN clauses
-    if len(query_parts['join_order']) > 1 and query_parts.get("join_conditions"):
-        processed_joins = set()
-        for t1, c1, t2, c2 in query_parts["join_conditions"]:
-            join_key = tuple(sorted([t1, t2]))
-            if join_key not in processed_joins:
+    # JOIN clauses: each table joins on its conditions with earlier tables
+    joined = {from_table}
+    for table in query_parts['join_order'][1:]:
+        on = []
+        for t1, c1, t2, c2 in query_parts.get("join_conditions") or []:
+            if (t1 == table and t2 in joined) or (t2 == table and t1 in joined):
                 c1_sanitized = c1.strip('"\'').replace(' ', '_')
                 c2_sanitized = c2.strip('"\'').replace(' ', '_')
-                sql += f" JOIN {t2} ON {t1}.{c1_sanitized} = {t2}.{c2_sanitized}"
-                processed_joins.add(join_key)
+                on.append(f"{t1}.{c1_sanitized} = {t2}.{c2_sanitized}")
+        sql += f" JOIN {table} ON {' AND '.join(on)}" if on else f" CROSS JOIN {table}"
+        joined.add(table)
 
     # WHERE clause
-    if query_parts.get("compare_conditions"):
+    if query_parts.get("where") is not None:
+        sql += f" WHERE {to_sql(query_parts['where'])}"
+    elif query_parts.get("compare_conditions"):
         where_clauses = []
         for t, c, op, val, logic in query_parts["compare_conditions"]:
             c_sanitized = c.strip('"\'').replace(' ', '_')
@@ -74,7 +155,9 @@ def generate_sql_equivalent_query(query_parts: dict, select_cols: list = None) -
         sql += " GROUP BY " + ", ".join(gb_cols)
 
     # HAVING
-    if query_parts.get("having_conditions"):
+    if query_parts.get("having") is not None:
+        sql += f" HAVING {to_sql(query_parts['having'])}"
+    elif query_parts.get("having_conditions"):
         having_clauses = []
         for func, t, c, op, val, logic in query_parts["having_conditions"]:
             if func == "VALUE":
@@ -102,5 +185,4 @@ def generate_sql_equivalent_query(query_parts: dict, select_cols: list = None) -
     if query_parts.get("offset") is not None:
         sql += f" OFFSET {query_parts['offset']}"
 
-    print(f"Debug: Generated SQL query: {sql}")
     return sql.strip()
\ No newline at end of file
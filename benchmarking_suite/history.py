@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+DEFAULT_HISTORY_PATH = os.path.join(PROJECT_ROOT, "benchmark_history.sqlite")
+# Relative slowdown / memory growth that counts as a regression.
+DEFAULT_TIME_THRESHOLD = 0.10
+DEFAULT_MEMORY_THRESHOLD = 0.10
+DEFAULT_ALPHA = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at REAL NOT NULL,
+    git_commit TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    dataset_version TEXT NOT NULL,
+    query_id TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    time_median_seconds REAL,
+    time_samples TEXT,
+    memory_peak_bytes INTEGER,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_key ON runs (machine, dataset_version, query_id, engine, git_commit);
+"""
+
+
+def git_commit(cwd: str = PROJECT_ROOT) -> str:
+    """Current commit hash, suffixed with '-dirty' for uncommitted changes."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short=12", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def machine_fingerprint() -> str:
+    """
+    Short hash of the hardware and runtime a benchmark ran on, so only runs
+    from comparable machines are compared.
+    """
+    parts = [platform.system(), platform.machine(), platform.processor(), str(os.cpu_count()),
+             platform.python_version(), pd.__version__, np.__version__]
+    try:
+        parts.append(str(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")))
+    except (AttributeError, ValueError, OSError):
+        pass
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+
+class BenchmarkHistory:
+    """
+    Benchmark results stored in a local SQLite file, one row per (run, query,
+    engine), keyed by git commit, machine fingerprint, dataset version and
+    query id. Raw timing samples are kept so runs can be compared statistically.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_HISTORY_PATH
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(_SCHEMA)
+
+    def record(self, results: list, dataset_version: str, commit: str = None, machine: str = None) -> int:
+        """Stores successful benchmark result dicts; returns how many were written."""
+        commit = commit or git_commit()
+        machine = machine or machine_fingerprint()
+        now = time.time()
+        rows = [
+            (now, commit, machine, dataset_version, r.get("query_id", ""), r["query_expr"],
+             r.get("execution_time_seconds"), json.dumps(r.get("time_samples_seconds") or []),
+             r.get("memory_peak_bytes"), json.dumps(r, default=str))
+            for r in results if not r.get("error")
+        ]
+        self.conn.executemany(
+            "INSERT INTO runs (recorded_at, git_commit, machine, dataset_version, query_id, engine, "
+            "time_median_seconds, time_samples, memory_peak_bytes, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        self.conn.commit()
+        return len(rows)
+
+    def load(self, **filters) -> pd.DataFrame:
+        """
+        Recorded runs as a DataFrame, optionally filtered on any of git_commit,
+        machine, dataset_version, query_id or engine.
+        """
+        allowed = {"git_commit", "machine", "dataset_version", "query_id", "engine"}
+        unknown = set(filters) - allowed
+        if unknown:
+            raise ValueError(f"Unknown history filter(s): {', '.join(sorted(unknown))}")
+        clauses = [f"{key} = ?" for key, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        sql = "SELECT * FROM runs" + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY recorded_at"
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        df["time_samples"] = df["time_samples"].map(json.loads)
+        df["recorded_at"] = pd.to_datetime(df["recorded_at"], unit="s")
+        return df
+
+    def latest_commit(self, exclude: str = None, machine: str = None):
+        """Most recently recorded commit (other than `exclude`) on a machine."""
+        sql = "SELECT git_commit FROM runs WHERE (? IS NULL OR machine = ?) AND (? IS NULL OR git_commit != ?) " \
+              "ORDER BY recorded_at DESC LIMIT 1"
+        row = self.conn.execute(sql, (machine, machine, exclude, exclude)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+def permutation_pvalue(baseline, current, n_permutations: int = 2000, seed: int = 0) -> float:
+    """
+    One-sided permutation test p-value for "current is slower than baseline",
+    using the rank sum of the current samples (a Mann-Whitney U test). Makes no
+    distributional assumption, which suits the small, skewed sample sets
+    benchmarks produce.
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    current = np.asarray(current, dtype=float)
+    if baseline.size == 0 or current.size == 0:
+        return float("nan")
+    pooled = np.concatenate([baseline, current])
+    ranks = pd.Series(pooled).rank().to_numpy()
+    observed = ranks[baseline.size:].sum()
+    rng = np.random.default_rng(seed)
+    # Each row is one random relabelling of the pooled samples
+    perms = np.argsort(rng.random((n_permutations, pooled.size)), axis=1)
+    rank_sums = ranks[perms[:, baseline.size:]].sum(axis=1)
+    return float((np.sum(rank_sums >= observed) + 1) / (n_permutations + 1))
+
+
+def compare_runs(baseline: pd.DataFrame, current: pd.DataFrame, time_threshold: float = DEFAULT_TIME_THRESHOLD,
+                 memory_threshold: float = DEFAULT_MEMORY_THRESHOLD, alpha: float = DEFAULT_ALPHA) -> list:
+    """
+    Compares two sets of history rows per (dataset, query, engine). A latency
+    regression needs both a median slowdown beyond `time_threshold` and a
+    significant permutation test; memory is deterministic enough to compare
+    the medians against `memory_threshold` directly.
+    """
+    keys = ["dataset_version", "query_id", "engine"]
+    report = []
+    base_groups = {key: group for key, group in baseline.groupby(keys)}
+    for key, cur in current.groupby(keys):
+        base = base_groups.get(key)
+        if base is None:
+            continue
+        base_samples = [s for samples in base["time_samples"] for s in samples] or list(base["time_median_seconds"])
+        cur_samples = [s for samples in cur["time_samples"] for s in samples] or list(cur["time_median_seconds"])
+        base_time, cur_time = float(np.median(base_samples)), float(np.median(cur_samples))
+        base_mem = base["memory_peak_bytes"].dropna().median()
+        cur_mem = cur["memory_peak_bytes"].dropna().median()
+        time_change = cur_time / base_time - 1 if base_time else 0.0
+        mem_change = cur_mem / base_mem - 1 if base_mem and pd.notna(cur_mem) else 0.0
+        p_value = permutation_pvalue(base_samples, cur_samples)
+        report.append({
+            "dataset_version": key[0],
+            "query_id": key[1],
+            "engine": key[2],
+            "baseline_time_seconds": base_time,
+            "current_time_seconds": cur_time,
+            "time_change": time_change,
+            "p_value": p_value,
+            "baseline_memory_bytes": base_mem,
+            "current_memory_bytes": cur_mem,
+            "memory_change": mem_change,
+            "time_regression": bool(time_change > time_threshold and p_value < alpha),
+            "memory_regression": bool(mem_change > memory_threshold),
+        })
+    return report
+
+
+def format_report(report: list) -> str:
+    lines = []
+    for row in report:
+        flags = [name for name, hit in (("TIME", row["time_regression"]), ("MEMORY", row["memory_regression"])) if hit]
+        lines.append(f"{row['query_id']:>24} {row['engine']:>15}: time {row['time_change']:+.1%} "
+                     f"(p={row['p_value']:.3f}), memory {row['memory_change']:+.1%}"
+                     + (f"  REGRESSION: {', '.join(flags)}" if flags else ""))
+    return "\n".join(lines) if lines else "No overlapping queries to compare."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark history and regression checks.")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_PATH, help="History database file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Store a results file written by run_benchmarks --output")
+    record.add_argument("results", help=".json results file")
+    record.add_argument("--dataset-version", required=True)
+    record.add_argument("--commit", help="Defaults to the current git commit")
+
+    compare = sub.add_parser("compare", help="Compare two commits; exits 1 on regressions")
+    compare.add_argument("--baseline", help="Baseline commit (default: latest other recorded commit)")
+    compare.add_argument("--current", help="Current commit (default: the current git commit)")
+    compare.add_argument("--machine", default=None, help="Machine fingerprint (default: this machine)")
+    compare.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD)
+    compare.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD)
+    compare.add_argument("--alpha", type=float, default=DEFAULT_ALPHA)
+
+    trend = sub.add_parser("trend", help="Plot latency and memory over recorded runs")
+    trend.add_argument("--query-id")
+    trend.add_argument("--output", required=True, help="Image file to write")
+
+    args = parser.parse_args(argv)
+    history = BenchmarkHistory(args.db)
+    try:
+        if args.command == "record":
+            with open(args.results) as f:
+                count = history.record(json.load(f), args.dataset_version, args.commit)
+            print(f"Recorded {count} results in {args.db}")
+            return 0
+
+        if args.command == "compare":
+            machine = args.machine or machine_fingerprint()
+            current_commit = args.current or git_commit()
+            baseline_commit = args.baseline or history.latest_commit(exclude=current_commit, machine=machine)
+            if baseline_commit is None:
+                print("No baseline run recorded to compare against.")
+                return 0
+            report = compare_runs(history.load(git_commit=baseline_commit, machine=machine),
+                                  history.load(git_commit=current_commit, machine=machine),
+                                  args.time_threshold, args.memory_threshold, args.alpha)
+            print(f"Comparing {current_commit} against {baseline_commit}:")
+            print(format_report(report))
+            return 1 if any(r["time_regression"] or r["memory_regression"] for r in report) else 0
+
+        from benchmarking_suite.visualize import plot_benchmark_trend
+        fig = plot_benchmark_trend(history.load(query_id=args.query_id))
+        if fig:
+            fig.savefig(args.output)
+        return 0
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
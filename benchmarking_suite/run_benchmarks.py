@@ -1,96 +1,129 @@
-
+import argparse
 import os
 import sys
-import pandas as pd
 
 # Add project root to path to allow imports from other packages
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
 # These imports will now work correctly
-from benchmarking_suite.benchmark_cqc import benchmark_cqc
-from benchmarking_suite.benchmark_sql import benchmark_sql
-from benchmarking_suite.helpers import generate_sql_equivalent_query
-from benchmarking_suite.visualize import plot_benchmark_results
+from core_engine.parser import parse_query_from_string
+from core_engine.plan import parse_bytes
+from core_engine.simple_cqc import SimpleCQ, default_memory_budget
+from benchmarking_suite.benchmark_cqc import benchmark_cq, memory_budget_error
+from benchmarking_suite.benchmark_sql import benchmark_sql, dataset_fingerprint, get_baseline
+from benchmarking_suite.fingerprint import format_diff, verify_results
+from benchmarking_suite.helpers import generate_sql_equivalent_query, load_tables_from_dir, save_results
+from benchmarking_suite.history import BenchmarkHistory
 
-def load_tables_from_dir(data_directory: str) -> dict:
-    """
-    Helper function to load all CSV files from a directory.
-    """
-    tables = {}
-    if not os.path.isdir(data_directory):
-        print(f"Error: Data directory not found at '{data_directory}'")
-        return None
-        
-    for filename in os.listdir(data_directory):
-        if filename.endswith(".csv"):
-            table_name = filename.split(".")[0].lower()
-            file_path = os.path.join(data_directory, filename)
-            tables[table_name] = pd.read_csv(file_path)
-    return tables
+# Test queries: (query id, description, query text)
+TEST_QUERIES = [
+    (
+        "canadian_customers",
+        "Find Canadian Customers & their Company Industry",
+        """SELECT customers.First_Name, organizations.Industry
+FROM customers
+JOIN organizations ON customers.Company = organizations.Name
+WHERE customers.Country = 'Canada'""",
+    ),
+    (
+        "large_it_companies",
+        "Find Large IT Companies & their Customers",
+        """SELECT customers.First_Name, organizations.Name
+FROM customers
+JOIN organizations ON customers.Company = organizations.Name
+WHERE organizations.Industry = 'IT' AND organizations.Number_of_employees > 5000""",
+    ),
+]
 
-def run_full_benchmark():
+def run_full_benchmark(data_dir: str = None, warmup: int = 1, repetitions: int = 5,
+                       output: str = None, plot: bool = True, history: str = None,
+                       memory_budget: int = None) -> list:
     """
-    Defines test queries, runs CQC and SQL benchmarks, and plots the results.
+    Runs every test query on SimpleCQ and SQLite, optionally writes the results
+    as JSON/CSV to `output`, records them in the BenchmarkHistory database at
+    `history`, and plots them. Queries whose estimated peak memory exceeds
+    `memory_budget` (bytes) are skipped. Returns the list of result dicts.
     """
     # 1. Load Data
-    # Assumes a 'data' folder in the project root
-    data_dir = os.path.join(PROJECT_ROOT, "data")
+    # Defaults to the 'data' folder in the project root
+    data_dir = data_dir or os.path.join(PROJECT_ROOT, "data")
     tables = load_tables_from_dir(data_dir)
     if not tables:
         print("Please create a 'data' directory in your project root and add your CSV files.")
-        return
+        return []
     print(f"Successfully loaded tables: {list(tables.keys())}")
-
-    # 2. Define Test Queries
-    test_queries = [
-        {
-            "name": "Find Canadian Customers & their Company Industry",
-            "cqc_query": {
-                "join_order": ["customers", "organizations"],
-                "join_conditions": [("customers", "Company", "organizations", "Name")],
-                "compare_conditions": [("customers", "Country", "=", "Canada", "AND")]
-            },
-            "select_cols": ["customers.Name", "organizations.Industry"]
-        },
-        {
-            "name": "Find Large IT Companies & their Customers",
-            "cqc_query": {
-                "join_order": ["customers", "organizations"],
-                "join_conditions": [("customers", "Company", "organizations", "Name")],
-                "compare_conditions": [
-                    ("organizations", "Industry", "=", "IT", "AND"),
-                    ("organizations", "Number of employees", ">", 5000, "AND")
-                ]
-            },
-            "select_cols": ["customers.First Name", "organizations.Name"]
-        }
-    ]
+    engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
 
     all_results = []
 
-    # 3. Run Benchmarks for each query
-    for query_def in test_queries:
-        print(f"\n--- Benchmarking Query: {query_def['name']} ---")
-        
-        sql_query = generate_sql_equivalent_query(query_def["cqc_query"], query_def["select_cols"])
+    # 2. Run Benchmarks for each query
+    for query_id, name, query_text in TEST_QUERIES:
+        print(f"\n--- Benchmarking Query: {name} ---")
+        parsed = parse_query_from_string(query_text)
+        missing = [t for t in parsed["join_order"] if t not in tables]
+        if missing:
+            print(f"Skipping: tables not found: {', '.join(missing)}")
+            continue
+        refusal = memory_budget_error(engine, parsed, memory_budget)
+        if refusal:
+            print(f"Skipping: {refusal}")
+            continue
+
+        sql_query = generate_sql_equivalent_query(parsed, parsed["select_cols"])
         print(f"Generated SQL: {sql_query}")
 
-        cqc_result = benchmark_cqc(tables, query_def["cqc_query"])
-        all_results.append(cqc_result)
+        cqc_result = benchmark_cq(tables, parsed, warmup=warmup, repetitions=repetitions, engine=engine)
+        sql_result = benchmark_sql(tables, sql_query, warmup=warmup, repetitions=repetitions,
+                                   query_parts=parsed)
+        diff = verify_results(cqc_result, sql_result, engine, get_baseline(tables), parsed, sql_query)
+        for result in (cqc_result, sql_result):
+            result["query_id"] = query_id
+            all_results.append(result)
         print("CQC Results:", cqc_result)
-
-        # Pass the generated SQL string to the corrected benchmark_sql function
-        sql_result = benchmark_sql(tables, sql_query)
-        all_results.append(sql_result)
         print("SQL Results:", sql_result)
+        if diff is not None:
+            print(format_diff(diff))
+
+    if output:
+        save_results(all_results, output)
+        print(f"\nResults written to {output}")
+
+    if history:
+        store = BenchmarkHistory(history)
+        try:
+            count = store.record(all_results, dataset_fingerprint(tables))
+        finally:
+            store.close()
+        print(f"Recorded {count} results in {history}")
+
+    # 3. Visualize the results
+    if plot:
+        print("\n--- Plotting Benchmark Results ---")
+        # Plotting pulls in matplotlib and seaborn: only import them when asked to plot
+        from benchmarking_suite.visualize import plot_benchmark_results
+        fig = plot_benchmark_results(all_results)
+        import matplotlib.pyplot as plt
+        plt.show()
+    return all_results
+
 
-    # 4. Visualize the results
-    print("\n--- Plotting Benchmark Results ---")
-    fig = plot_benchmark_results(all_results)
-    import matplotlib.pyplot as plt
-    plt.show()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SimpleCQ against SQLite.")
+    parser.add_argument("--data-dir", help="Directory of CSV tables (default: <project>/data)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warmup runs per query")
+    parser.add_argument("--repetitions", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--output", help="Write results to this .json or .csv file")
+    parser.add_argument("--history", help="Record results in this benchmark history database")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the matplotlib charts")
+    parser.add_argument("--memory-budget", type=parse_bytes, default=None,
+                        help="Skip queries estimated to need more memory, e.g. 4GB "
+                             "(default: half of physical memory, 0 for no limit)")
+    args = parser.parse_args(argv)
+    memory_budget = default_memory_budget() if args.memory_budget is None else args.memory_budget or None
+    run_full_benchmark(args.data_dir, args.warmup, args.repetitions, args.output, not args.no_plot, args.history,
+                       memory_budget)
 
 
 if __name__ == "__main__":
-    run_full_benchmark()
\ No newline at end of file
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import SimpleCQ
+from benchmarking_suite.benchmark_cqc import benchmark_cq
+from benchmarking_suite.benchmark_sql import benchmark_sql, get_baseline
+from benchmarking_suite.datagen import generate_tables, table_sizes
+from benchmarking_suite.fingerprint import format_diff, verify_results
+from benchmarking_suite.helpers import generate_sql_equivalent_query, save_results
+
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+# Log-log slope above which growth is reported as superlinear.
+SUPERLINEAR_SLOPE = 1.2
+
+# Fixed query set run at every scale: (query id, query text)
+SWEEP_QUERIES = [
+    ("filter_scan", """SELECT patients.patient_id, patients.last_name
+FROM patients
+WHERE patients.primary_condition = 'Diabetes'"""),
+    ("two_way_join", """SELECT patients.first_name, appointments.appointment_date
+FROM patients
+JOIN appointments ON patients.patient_id = appointments.patient_id
+WHERE appointments.doctor_specialty = 'Cardiology'"""),
+    ("three_way_join_agg", """SELECT patients.primary_condition, COUNT(prescriptions.prescription_id) AS prescription_count
+FROM patients
+JOIN appointments ON patients.patient_id = appointments.patient_id
+JOIN prescriptions ON appointments.appointment_id = prescriptions.appointment_id
+GROUP BY patients.primary_condition
+ORDER BY prescription_count DESC"""),
+    ("top_k", """SELECT prescriptions.prescription_id, prescriptions.duration_days
+FROM prescriptions
+WHERE prescriptions.medication_name = 'Metformin'
+ORDER BY prescriptions.duration_days DESC, prescriptions.prescription_id ASC
+LIMIT 10"""),
+]
+
+
+def generate_healthcare_tables(rows: int, seed: int = 42, skew: float = 0.0) -> dict:
+    """
+    Patients / appointments / prescriptions with `rows` rows each, from the
+    seeded healthcare generator in benchmarking_suite/datagen.py.
+    """
+    return generate_tables("healthcare", rows / table_sizes("healthcare")["patients"], seed, skew)
+
+
+def fit_growth(sizes, values) -> float:
+    """Slope of log(value) against log(size); ~1 is linear, >1 superlinear."""
+    sizes = np.asarray(sizes, dtype=float)
+    values = np.asarray(values, dtype=float)
+    ok = (sizes > 0) & (values > 0)
+    if ok.sum() < 2:
+        return float("nan")
+    slope, _ = np.polyfit(np.log(sizes[ok]), np.log(values[ok]), 1)
+    return float(slope)
+
+
+def analyze_growth(results: list, threshold: float = SUPERLINEAR_SLOPE) -> list:
+    """
+    Fits latency and peak memory growth per (query, engine) and flags any
+    slope above `threshold` as superlinear.
+    """
+    df = pd.DataFrame([r for r in results if not r.get("error")])
+    fits = []
+    if df.empty:
+        return fits
+    for (query_id, engine), group in df.groupby(["query_id", "query_expr"]):
+        group = group.sort_values("scale_rows")
+        time_slope = fit_growth(group["scale_rows"], group["execution_time_seconds"])
+        mem_slope = fit_growth(group["scale_rows"], group["memory_peak_bytes"].fillna(0))
+        fits.append({
+            "query_id": query_id,
+            "engine": engine,
+            "time_slope": time_slope,
+            "memory_slope": mem_slope,
+            "superlinear_time": bool(time_slope > threshold),
+            "superlinear_memory": bool(mem_slope > threshold),
+        })
+    return fits
+
+
+def run_scalability_sweep(scales=DEFAULT_SCALES, seed: int = 42, repetitions: int = 3,
+                          include_sqlite: bool = True, threshold: float = SUPERLINEAR_SLOPE,
+                          skew: float = 0.0):
+    """
+    Generates the healthcare dataset at each scale, runs SWEEP_QUERIES on
+    SimpleCQ (and SQLite) and returns (results, growth fits). `skew` is the
+    Zipf exponent of the foreign keys.
+    """
+    results = []
+    parsed_queries = [(qid, parse_query_from_string(text)) for qid, text in SWEEP_QUERIES]
+    for rows in scales:
+        print(f"\n=== Scale: {rows:,} rows per table ===")
+        tables = generate_healthcare_tables(rows, seed, skew)
+        engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+        for query_id, parsed in parsed_queries:
+            run = [benchmark_cq(tables, parsed, repetitions=repetitions, engine=engine)]
+            if include_sqlite:
+                sql_query = generate_sql_equivalent_query(parsed, parsed["select_cols"])
+                version = f"healthcare_{rows}_seed{seed}_skew{skew}"
+                run.append(benchmark_sql(tables, sql_query, repetitions=repetitions, query_parts=parsed,
+                                         dataset_version=version))
+                diff = verify_results(run[0], run[1], engine, get_baseline(tables, dataset_version=version),
+                                      parsed, sql_query)
+                if diff is not None:
+                    print(format_diff(diff))
+            for result in run:
+                result["query_id"] = query_id
+                result["scale_rows"] = rows
+                results.append(result)
+                print(f"{query_id:>20} {result['query_expr']:>15}: "
+                      f"{result['execution_time_seconds']:.4f}s, rows={result.get('result_rows')}")
+        del engine, tables
+
+    fits = analyze_growth(results, threshold)
+    for fit in fits:
+        flag = " SUPERLINEAR" if fit["superlinear_time"] or fit["superlinear_memory"] else ""
+        print(f"{fit['query_id']:>20} {fit['engine']:>15}: time ~ n^{fit['time_slope']:.2f}, "
+              f"memory ~ n^{fit['memory_slope']:.2f}{flag}")
+    return results, fits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency and memory scalability sweep.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="Rows per table at each scale factor, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=SUPERLINEAR_SLOPE,
+                        help="Log-log slope above which growth is flagged as superlinear")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent for foreign keys (0 = uniform)")
+    parser.add_argument("--no-sqlite", action="store_true", help="Only benchmark SimpleCQ")
+    parser.add_argument("--output", help="Write raw results to this .json or .csv file")
+    parser.add_argument("--plot", help="Save the log-log plot to this image file")
+    args = parser.parse_args(argv)
+
+    results, fits = run_scalability_sweep(args.scales, args.seed, args.repetitions,
+                                          not args.no_sqlite, args.threshold, args.skew)
+    if args.output:
+        save_results(results, args.output)
+    if args.plot:
+        from benchmarking_suite.visualize import plot_scalability
+        fig = plot_scalability(results)
+        if fig:
+            fig.savefig(args.plot)
+    # Non-zero exit lets CI catch queries that stopped scaling linearly
+    return 1 if any(f["superlinear_time"] or f["superlinear_memory"] for f in fits) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarking_suite.datagen import BLOCK_ROWS, generate_chunks, generate_tables, write_dataset, zipf_keys
+
+SCALE = 2.5 * BLOCK_ROWS / 1_000_000  # healthcare tables of 2.5 blocks
+
+
+def test_output_does_not_depend_on_chunking_or_workers(tmp_path):
+    tables = generate_tables("healthcare", SCALE, seed=3)
+    assert len(tables["patients"]) == int(round(2.5 * BLOCK_ROWS))
+    chunks = list(generate_chunks("healthcare", "appointments", SCALE, seed=3, chunk_rows=1))
+    assert len(chunks) == 3
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), tables["appointments"])
+
+    write_dataset(str(tmp_path), "healthcare", SCALE, seed=3, chunk_rows=BLOCK_ROWS, workers=2)
+    on_disk = pd.read_csv(tmp_path / "prescriptions.csv")
+    pd.testing.assert_frame_equal(on_disk, tables["prescriptions"])
+    assert not tables["patients"].equals(generate_tables("healthcare", SCALE, seed=4)["patients"])
+
+
+def test_zipf_skew_concentrates_foreign_keys():
+    rng = np.random.default_rng(0)
+    uniform = zipf_keys(rng, 10_000, 200_000)
+    skewed = zipf_keys(rng, 10_000, 200_000, skew=1.2)
+    assert skewed.min() >= 1 and skewed.max() <= 10_000
+    top_share = lambda keys: np.sort(np.bincount(keys))[-10:].sum() / len(keys)
+    assert top_share(uniform) < 0.01 < 0.3 < top_share(skewed)
+
+
+def test_parquet_output_matches_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    write_dataset(str(tmp_path), "commerce", 0.05, seed=1, formats=("csv", "parquet"))
+    for table in ("customers", "transactions"):
+        pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / f"{table}.parquet"),
+                                      pd.read_csv(tmp_path / f"{table}.csv"), check_dtype=False)
@@ -0,0 +1,22 @@
+import pandas as pd
+from benchmarking_suite.fingerprint import diff_results, result_fingerprint
+
+CQ = pd.DataFrame({"A_name": ["x", "y", "y", None], "A_score": [1, 2, 2, 3], "n": [0.1 + 0.2, 1.0, 1.0, -0.0]})
+
+
+def test_fingerprint_ignores_row_order_column_order_and_prefixes():
+    sql = pd.DataFrame({"n": [0.3, 1.0, 0.0, 1.0], "score": [1.0, 2.0, 3.0, 2.0], "Name": ["x", "y", None, "y"]})
+    assert result_fingerprint(CQ, ["A"]) == result_fingerprint(sql)
+
+
+def test_fingerprint_counts_duplicate_rows():
+    deduped = CQ.drop_duplicates()
+    assert result_fingerprint(CQ, ["A"]).digest != result_fingerprint(deduped, ["A"]).digest
+
+
+def test_diff_reports_sampled_rows_on_each_side():
+    other = pd.DataFrame({"name": ["x", "y", "z"], "score": [1, 2, 9], "n": [0.3, 1.0, 5.0]})
+    diff = diff_results(CQ, other, ["A"])
+    assert not diff["match"]
+    assert (diff["only_in_left"], diff["only_in_right"]) == (2, 1)
+    assert list(diff["right_sample"]["name"]) == ["z"]
@@ -0,0 +1,34 @@
+from benchmarking_suite.history import BenchmarkHistory, compare_runs, permutation_pvalue
+
+
+def _result(samples, memory, engine="SimpleCQ Query"):
+    return {"query_id": "q1", "query_expr": engine, "execution_time_seconds": sorted(samples)[len(samples) // 2],
+            "time_samples_seconds": samples, "memory_peak_bytes": memory, "error": None}
+
+
+def test_record_and_load_round_trip(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "history.sqlite"))
+    written = history.record([_result([0.1, 0.11, 0.12], 1000), {"query_expr": "x", "error": "boom"}],
+                             "ds1", commit="abc", machine="m1")
+    runs = history.load(git_commit="abc")
+    assert written == 1
+    assert runs["time_samples"].iloc[0] == [0.1, 0.11, 0.12]
+    assert history.latest_commit(exclude="other", machine="m1") == "abc"
+
+
+def test_compare_flags_only_significant_slowdowns(tmp_path):
+    history = BenchmarkHistory(str(tmp_path / "history.sqlite"))
+    history.record([_result([0.10, 0.101, 0.099, 0.1, 0.102], 1000)], "ds1", commit="base", machine="m1")
+    history.record([_result([0.20, 0.21, 0.19, 0.2, 0.205], 1000)], "ds1", commit="slow", machine="m1")
+    history.record([_result([0.10, 0.1, 0.101, 0.099, 0.1], 2000)], "ds1", commit="fat", machine="m1")
+
+    slow = compare_runs(history.load(git_commit="base"), history.load(git_commit="slow"))[0]
+    fat = compare_runs(history.load(git_commit="base"), history.load(git_commit="fat"))[0]
+    assert slow["time_regression"] and not slow["memory_regression"]
+    assert fat["memory_regression"] and not fat["time_regression"]
+
+
+def test_permutation_pvalue_is_high_for_identical_distributions():
+    samples = [0.1, 0.2, 0.3, 0.4]
+    assert permutation_pvalue(samples, samples) > 0.3
+    assert permutation_pvalue(samples, [1.0, 1.1, 1.2, 1.3]) < 0.05
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -38,4 +39,100 @@ def plot_benchmark_results(results_list: list):
         
     except Exception as e:
         print(f"Error creating visualization: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def plot_scalability(results: list):
+    """
+    Log-log plots of latency and peak memory against rows per table, one line
+    per (query, engine), from run_scalability_sweep results.
+    """
+    try:
+        df = pd.DataFrame(results)
+        df_clean = df[df['error'].isnull()].copy()
+        if df_clean.empty:
+            print("No valid scalability results to plot")
+            return None
+
+        df_clean['series'] = df_clean['query_id'] + " / " + df_clean['query_expr']
+        df_clean['memory_peak_mb'] = df_clean['memory_peak_bytes'] / (1024 * 1024)
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+
+        sns.lineplot(data=df_clean, x='scale_rows', y='execution_time_seconds', hue='series', marker='o', ax=ax1)
+        ax1.set_title('Latency vs. Input Size')
+        ax1.set_ylabel('Time (seconds)')
+
+        sns.lineplot(data=df_clean, x='scale_rows', y='memory_peak_mb', hue='series', marker='o', ax=ax2, legend=False)
+        ax2.set_title('Peak Memory vs. Input Size')
+        ax2.set_ylabel('Memory (MB)')
+
+        for ax in (ax1, ax2):
+            ax.set_xscale('log')
+            ax.set_yscale('log')
+            ax.set_xlabel('Rows per table')
+
+        plt.tight_layout()
+        return fig
+
+    except Exception as e:
+        print(f"Error creating visualization: {e}")
+        return None
+
+
+def plot_benchmark_trend(history_df: pd.DataFrame):
+    """
+    Median latency and peak memory per (query, engine) across recorded runs,
+    from BenchmarkHistory.load().
+    """
+    try:
+        if history_df is None or history_df.empty:
+            print("No benchmark history to plot")
+            return None
+
+        df = history_df.copy()
+        df['series'] = df['query_id'] + " / " + df['engine']
+        df['memory_peak_mb'] = df['memory_peak_bytes'] / (1024 * 1024)
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+
+        sns.lineplot(data=df, x='recorded_at', y='time_median_seconds', hue='series', marker='o', ax=ax1)
+        ax1.set_title('Median Latency Over Time')
+        ax1.set_ylabel('Time (seconds)')
+
+        sns.lineplot(data=df, x='recorded_at', y='memory_peak_mb', hue='series', marker='o', ax=ax2, legend=False)
+        ax2.set_title('Peak Memory Over Time')
+        ax2.set_ylabel('Memory (MB)')
+        ax2.set_xlabel('Recorded at')
+        ax2.tick_params(axis='x', rotation=45)
+
+        plt.tight_layout()
+        return fig
+
+    except Exception as e:
+        print(f"Error creating visualization: {e}")
+        return None
+
+
+def plot_speedup_matrix(matrix: pd.DataFrame):
+    """
+    Heatmap of a query x configuration speedup matrix from
+    ablation.speedup_matrix. Colours are on a log2 scale centred on 1x, so
+    slowdowns and speedups of the same factor look equally strong.
+    """
+    try:
+        if matrix is None or matrix.empty:
+            print("No ablation results to plot")
+            return None
+
+        fig, ax = plt.subplots(figsize=(max(8, 0.9 * len(matrix.columns)), max(4, 0.5 * len(matrix))))
+        sns.heatmap(np.log2(matrix.astype(float)), center=0, cmap='RdYlGn', annot=matrix.round(2), fmt='',
+                    cbar_kws={'label': 'log2 speedup'}, ax=ax)
+        ax.set_title('Speedup over No Optimizations')
+        ax.set_xlabel('Configuration')
+        ax.set_ylabel('Query')
+        ax.tick_params(axis='x', rotation=45)
+
+        plt.tight_layout()
+        return fig
+
+    except Exception as e:
+        print(f"Error creating visualization: {e}")
+        return None
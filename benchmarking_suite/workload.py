@@ -0,0 +1,447 @@
+import argparse
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from core_engine.parser import parse_query_from_string
+from core_engine.plan import parse_bytes
+
+SHAPES = ("chain", "star", "snowflake", "cyclic")
+AGGREGATE_FUNCS = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_]\w*$')
+# Categorical columns with at most this many distinct values can be grouped on.
+_MAX_GROUP_NDV = 1000
+_MAX_IN_VALUES = 20
+
+
+class ColumnProfile:
+    """
+    What the workload generator needs to know about a column: its kind
+    ('numeric' or 'categorical'), quantiles for numeric columns and the most
+    frequent values with their frequencies for categorical ones.
+    """
+    def __init__(self, kind: str, ndv: int, quantiles=None, is_integer: bool = False, top_values=None):
+        self.kind = kind
+        self.ndv = ndv
+        self.quantiles = quantiles
+        self.is_integer = is_integer
+        self.top_values = top_values or []
+
+    @classmethod
+    def from_series(cls, series: pd.Series, top: int = 50):
+        values = series.dropna()
+        ndv = int(values.nunique())
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            quantiles = np.quantile(values.to_numpy(dtype=float), np.linspace(0, 1, 101)) if len(values) else None
+            return cls("numeric", ndv, quantiles, pd.api.types.is_integer_dtype(values))
+        freqs = values.astype(str).value_counts(normalize=True).head(top)
+        # Values the generator cannot quote safely are left out
+        top_values = [(v, float(f)) for v, f in freqs.items() if "'" not in v]
+        return cls("categorical", ndv, top_values=top_values)
+
+    def value_for_selectivity(self, op: str, selectivity: float):
+        """Constant `v` such that `column <op> v` keeps roughly `selectivity` of the rows."""
+        q = selectivity if op in ("<", "<=") else 1 - selectivity
+        value = float(np.interp(q * 100, np.arange(101), self.quantiles))
+        return int(round(value)) if self.is_integer else round(value, 4)
+
+
+class Catalog:
+    """
+    Tables, key relationships and column profiles the workload generator draws
+    queries from. Relationships are (table1, column1, table2, column2) join
+    edges; if none are given they are inferred from shared column names where
+    one side is unique.
+    """
+    def __init__(self, row_counts: dict, columns: dict, relationships: list):
+        self.row_counts = row_counts
+        self.columns = columns
+        self.relationships = list(relationships)
+        self.adjacency = {t: [] for t in row_counts}
+        for t1, c1, t2, c2 in self.relationships:
+            self.adjacency[t1].append((t2, (t1, c1, t2, c2)))
+            self.adjacency[t2].append((t1, (t1, c1, t2, c2)))
+
+    @classmethod
+    def from_tables(cls, tables: dict, relationships: list = None, sample_rows: int = 100_000, seed: int = 0):
+        row_counts, columns = {}, {}
+        for name, df in tables.items():
+            sample = df.sample(sample_rows, random_state=seed) if len(df) > sample_rows else df
+            row_counts[name] = len(df)
+            columns[name] = {c: ColumnProfile.from_series(sample[c]) for c in df.columns
+                             if _IDENTIFIER_RE.match(str(c))}
+        if relationships is None:
+            relationships = infer_relationships(tables)
+        return cls(row_counts, columns, relationships)
+
+    def columns_of(self, table: str, kind: str = None) -> list:
+        return [c for c, p in self.columns[table].items() if kind is None or p.kind == kind]
+
+
+def infer_relationships(tables: dict) -> list:
+    """
+    Join edges between columns with the same name in two tables, where the
+    column is unique in the first (referenced) table.
+    """
+    edges = []
+    names = sorted(tables)
+    for t1 in names:
+        for col in tables[t1].columns:
+            if not tables[t1][col].is_unique:
+                continue
+            for t2 in names:
+                if t2 != t1 and col in tables[t2].columns and not (tables[t2][col].is_unique and t2 < t1):
+                    edges.append((t1, col, t2, col))
+    return edges
+
+
+def _quote(value) -> str:
+    return f"'{value}'" if isinstance(value, str) else repr(value)
+
+
+class WorkloadGenerator:
+    """
+    Generates random conjunctive queries over a Catalog, as SQL text plus the
+    parsed query dict SimpleCQ runs. Each query is drawn from its own generator
+    seeded with (seed, query index), so any query can be reproduced on its own.
+
+    Join shapes are chain, star, snowflake and cyclic (a chain closed by a
+    column-to-column predicate between its ends). Shapes the catalog's join
+    graph cannot form fall back to a chain, and the query records the shape
+    it actually got.
+    """
+    def __init__(self, catalog: Catalog, seed: int = 0, shapes=SHAPES, max_tables: int = 4,
+                 max_predicates: int = 3, selectivity=(0.01, 0.5), column_compare_prob: float = 0.2,
+                 or_prob: float = 0.1, aggregate_prob: float = 0.3, distinct_prob: float = 0.2,
+                 order_limit_prob: float = 0.3, max_limit: int = 100):
+        self.catalog = catalog
+        self.seed = seed
+        self.shapes = tuple(shapes)
+        self.max_tables = max_tables
+        self.max_predicates = max_predicates
+        self.selectivity = selectivity
+        self.column_compare_prob = column_compare_prob
+        self.or_prob = or_prob
+        self.aggregate_prob = aggregate_prob
+        self.distinct_prob = distinct_prob
+        self.order_limit_prob = order_limit_prob
+        self.max_limit = max_limit
+
+    def generate(self, count: int) -> list:
+        return [self.generate_one(i) for i in range(count)]
+
+    def generate_one(self, index: int) -> dict:
+        """
+        Returns {"query_id", "shape", "sql", "parsed"} for query `index`.
+        """
+        rng = np.random.default_rng([self.seed, index])
+        shape = self.shapes[rng.integers(len(self.shapes))]
+        n_tables = int(rng.integers(1, self.max_tables + 1)) if shape == "chain" else int(rng.integers(3, max(self.max_tables, 3) + 1))
+        join_order, edges, shape, closing = self._join_graph(rng, shape, n_tables)
+
+        predicates = self._predicates(rng, join_order)
+        if closing:
+            predicates.insert(0, closing)
+        select = self._select_clause(rng, join_order)
+
+        sql = f"SELECT {'DISTINCT ' if select['distinct'] else ''}{', '.join(select['items'])}\nFROM {join_order[0]}"
+        for table, (t1, c1, t2, c2) in zip(join_order[1:], edges):
+            sql += f"\nJOIN {table} ON {t1}.{c1} = {t2}.{c2}"
+        if predicates:
+            sql += "\nWHERE " + " AND ".join(predicates)
+        if select["group_by"]:
+            sql += "\nGROUP BY " + ", ".join(select["group_by"])
+        if select["order_by"]:
+            sql += "\nORDER BY " + ", ".join(select["order_by"])
+            if select["limit"]:
+                sql += f"\nLIMIT {select['limit']}"
+        return {
+            "query_id": f"q{self.seed}_{index}",
+            "shape": shape,
+            "sql": sql,
+            "parsed": parse_query_from_string(sql),
+        }
+
+    # Join shapes
+
+    def _join_graph(self, rng, shape: str, n_tables: int):
+        """Returns (join order, join edge per joined table, actual shape, closing predicate)."""
+        adjacency = self.catalog.adjacency
+        tables = sorted(adjacency)
+        if shape in ("star", "snowflake"):
+            centers = [t for t in tables if len({n for n, _ in adjacency[t]}) >= 2]
+            if centers:
+                return self._star(rng, centers[rng.integers(len(centers))], n_tables, shape == "snowflake") + (None,)
+        order, edges = self._chain(rng, tables[rng.integers(len(tables))], n_tables)
+        if shape == "cyclic" and len(order) >= 3:
+            closing = self._closing_predicate(rng, order[0], order[-1], edges)
+            if closing:
+                return order, edges, "cyclic", closing
+        return order, edges, "chain" if len(order) > 1 else "single", None
+
+    def _chain(self, rng, start: str, n_tables: int):
+        order, edges = [start], []
+        while len(order) < n_tables:
+            options = [(t, e) for t, e in self.catalog.adjacency[order[-1]] if t not in order]
+            if not options:
+                break
+            table, edge = options[rng.integers(len(options))]
+            order.append(table)
+            edges.append(edge)
+        return order, edges
+
+    def _star(self, rng, center: str, n_tables: int, snowflake: bool):
+        """Spokes around `center`; a snowflake also extends spokes by one more table."""
+        spokes = [(t, e) for t, e in self.catalog.adjacency[center] if t != center]
+        n_spokes = max(2, n_tables - 2) if snowflake else n_tables - 1
+        order, edges = [center], []
+        for i in rng.permutation(len(spokes)):
+            table, edge = spokes[i]
+            if table not in order and len(order) <= n_spokes:
+                order.append(table)
+                edges.append(edge)
+        shape = "star"
+        if snowflake:
+            for leaf in order[1:]:
+                options = [(t, e) for t, e in self.catalog.adjacency[leaf] if t not in order]
+                if options and len(order) < n_tables:
+                    table, edge = options[rng.integers(len(options))]
+                    order.append(table)
+                    edges.append(edge)
+                    shape = "snowflake"
+        return order, edges, shape
+
+    def _closing_predicate(self, rng, first: str, last: str, edges: list):
+        """A column-to-column equality between the chain ends, preferring a real join edge."""
+        used = set(edges)
+        direct = [e for t, e in self.catalog.adjacency[last] if t == first and e not in used]
+        if direct:
+            t1, c1, t2, c2 = direct[rng.integers(len(direct))]
+            return f"{t1}.{c1} = {t2}.{c2}"
+        left = self.catalog.columns_of(first, "numeric")
+        right = self.catalog.columns_of(last, "numeric")
+        if not left or not right:
+            return None
+        return f"{first}.{left[rng.integers(len(left))]} = {last}.{right[rng.integers(len(right))]}"
+
+    # WHERE
+
+    def _predicates(self, rng, join_order: list) -> list:
+        predicates = []
+        for _ in range(int(rng.integers(0, self.max_predicates + 1))):
+            pred = self._predicate(rng, join_order)
+            if pred and rng.random() < self.or_prob:
+                other = self._predicate(rng, join_order)
+                pred = f"({pred} OR {other})" if other else pred
+            if pred:
+                predicates.append(pred)
+        return predicates
+
+    def _predicate(self, rng, join_order: list):
+        if rng.random() < self.column_compare_prob:
+            numeric = [(t, c) for t in join_order for c in self.catalog.columns_of(t, "numeric")]
+            if len(numeric) >= 2:
+                i, j = rng.choice(len(numeric), 2, replace=False)
+                op = ("<", ">", "<=", ">=")[rng.integers(4)]
+                return f"{numeric[i][0]}.{numeric[i][1]} {op} {numeric[j][0]}.{numeric[j][1]}"
+        table = join_order[rng.integers(len(join_order))]
+        columns = self.catalog.columns_of(table)
+        if not columns:
+            return None
+        column = columns[rng.integers(len(columns))]
+        profile = self.catalog.columns[table][column]
+        # Log-uniform target selectivity
+        low, high = np.log(self.selectivity[0]), np.log(self.selectivity[1])
+        target = float(np.exp(rng.uniform(low, high)))
+        if profile.kind == "numeric":
+            if profile.quantiles is None:
+                return None
+            op = ("<", ">", "<=", ">=")[rng.integers(4)]
+            return f"{table}.{column} {op} {profile.value_for_selectivity(op, target)}"
+        if not profile.top_values:
+            return None
+        values, freqs = zip(*profile.top_values)
+        if rng.random() < 0.5 or len(values) == 1:
+            # Single value whose frequency is closest to the target
+            best = int(np.argmin(np.abs(np.log(np.asarray(freqs)) - np.log(target))))
+            return f"{table}.{column} = {_quote(values[best])}"
+        picked, total = [], 0.0
+        for i in rng.permutation(len(values)):
+            if total >= target or len(picked) == _MAX_IN_VALUES:
+                break
+            picked.append(values[i])
+            total += freqs[i]
+        return f"{table}.{column} IN ({', '.join(_quote(v) for v in picked)})"
+
+    # SELECT / GROUP BY / ORDER BY
+
+    def _select_clause(self, rng, join_order: list) -> dict:
+        catalog = self.catalog
+        groupable = [(t, c) for t in join_order for c in catalog.columns_of(t, "categorical")
+                     if catalog.columns[t][c].ndv <= _MAX_GROUP_NDV]
+        numeric = [(t, c) for t in join_order for c in catalog.columns_of(t, "numeric")]
+        select = {"items": [], "distinct": False, "group_by": [], "order_by": [], "limit": None}
+        order_limit = rng.random() < self.order_limit_prob
+
+        if groupable and rng.random() < self.aggregate_prob:
+            t, c = groupable[rng.integers(len(groupable))]
+            select["items"].append(f"{t}.{c}")
+            select["group_by"].append(f"{t}.{c}")
+            aggregates = []
+            for _ in range(int(rng.integers(1, 4))):
+                func = AGGREGATE_FUNCS[rng.integers(len(AGGREGATE_FUNCS))]
+                if func == "COUNT" or not numeric:
+                    call = "COUNT(*)"
+                else:
+                    at, ac = numeric[rng.integers(len(numeric))]
+                    call = f"{func}({at}.{ac})"
+                if call not in aggregates:
+                    aggregates.append(call)
+            select["items"].extend(f"{call} AS agg{i}" for i, call in enumerate(aggregates))
+            if order_limit:
+                # Group column as tie-breaker keeps LIMIT results deterministic
+                select["order_by"] = [f"agg0 {('ASC', 'DESC')[rng.integers(2)]}", f"{t}.{c}"]
+                select["limit"] = int(rng.integers(1, self.max_limit + 1))
+            return select
+
+        candidates = [(t, c) for t in join_order for c in catalog.columns_of(t)]
+        k = int(rng.integers(1, min(4, len(candidates)) + 1))
+        picked, seen = [], set()
+        for i in rng.permutation(len(candidates)):
+            t, c = candidates[i]
+            # Output columns must have distinct names in both engines
+            if c not in seen:
+                picked.append((t, c))
+                seen.add(c)
+            if len(picked) == k:
+                break
+        select["items"] = [f"{t}.{c}" for t, c in picked]
+        select["distinct"] = bool(rng.random() < self.distinct_prob)
+        if order_limit:
+            # Ordering by every output column makes LIMIT deterministic under ties
+            first = f"{picked[0][0]}.{picked[0][1]} {('ASC', 'DESC')[rng.integers(2)]}"
+            select["order_by"] = [first] + [f"{t}.{c}" for t, c in picked[1:]]
+            select["limit"] = int(rng.integers(1, self.max_limit + 1))
+        return select
+
+
+def run_workload(tables: dict, queries: list, repetitions: int = 1, slow_factor: float = 10.0,
+                 min_seconds: float = 0.05, memory_budget: int = None) -> list:
+    """
+    Runs generated queries on SimpleCQ and SQLite, cross-checks their results
+    and returns one summary row per query. Queries that fail, disagree, or take
+    SimpleCQ over `min_seconds` and more than `slow_factor` times as long as
+    SQLite are printed as suspicious. Queries whose estimated peak memory
+    exceeds `memory_budget` (bytes) are skipped and marked "skipped".
+    """
+    from core_engine.simple_cqc import SimpleCQ
+    from benchmarking_suite.benchmark_cqc import benchmark_cq, memory_budget_error
+    from benchmarking_suite.benchmark_sql import benchmark_sql, get_baseline
+    from benchmarking_suite.fingerprint import format_diff, verify_results
+    from benchmarking_suite.helpers import generate_sql_equivalent_query
+
+    engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+    baseline = get_baseline(tables)
+    summary = []
+    for query in queries:
+        parsed = query["parsed"]
+        refusal = memory_budget_error(engine, parsed, memory_budget)
+        if refusal:
+            print(f"Skipping query {query['query_id']}: {refusal}")
+            summary.append({"query_id": query["query_id"], "shape": query["shape"],
+                            "tables": len(parsed["join_order"]), "cq_seconds": None, "sqlite_seconds": None,
+                            "slowdown": None, "result_rows": None, "result_match": None, "error": refusal,
+                            "skipped": True})
+            continue
+        sql_query = generate_sql_equivalent_query(parsed, parsed["select_cols"])
+        cq = benchmark_cq(tables, parsed, repetitions=repetitions, measure_memory=False, engine=engine)
+        sql = benchmark_sql(tables, sql_query, repetitions=repetitions, measure_memory=False, query_parts=parsed)
+        diff = verify_results(cq, sql, engine, baseline, parsed, sql_query)
+        ratio = cq["execution_time_seconds"] / sql["execution_time_seconds"] if sql["execution_time_seconds"] else None
+        row = {
+            "query_id": query["query_id"],
+            "shape": query["shape"],
+            "tables": len(parsed["join_order"]),
+            "cq_seconds": cq["execution_time_seconds"],
+            "sqlite_seconds": sql["execution_time_seconds"],
+            "slowdown": ratio,
+            "result_rows": cq["result_rows"],
+            "result_match": cq.get("result_match"),
+            "error": cq["error"] or sql["error"],
+            "skipped": False,
+        }
+        summary.append(row)
+        slow = ratio is not None and ratio > slow_factor and row["cq_seconds"] > min_seconds
+        if row["error"] or diff is not None or slow:
+            print(f"\n--- Suspicious query {query['query_id']} ({query['shape']}) ---\n{query['sql']}")
+            print(f"SimpleCQ {row['cq_seconds']:.4f}s vs SQLite {row['sqlite_seconds']:.4f}s, error={row['error']}")
+            if diff is not None:
+                print(format_diff(diff))
+    return summary
+
+
+def write_workload(queries: list, path: str):
+    """Writes generated queries as a .sql file, one commented statement per query."""
+    with open(path, "w") as f:
+        for query in queries:
+            f.write(f"-- {query['query_id']} shape={query['shape']}\n{query['sql']};\n\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate (and optionally run) a random CQC workload.")
+    parser.add_argument("--data-dir", required=True, help="Directory of CSV tables to build the catalog from")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=SHAPES)
+    parser.add_argument("--max-tables", type=int, default=4)
+    parser.add_argument("--min-selectivity", type=float, default=0.01)
+    parser.add_argument("--max-selectivity", type=float, default=0.5)
+    parser.add_argument("--relationship", action="append", metavar="T1.C1=T2.C2",
+                        help="Join edge between two tables (repeatable); inferred from column names if omitted")
+    parser.add_argument("--output", help="Write the generated queries to this .sql file")
+    parser.add_argument("--run", action="store_true", help="Benchmark and cross-check every query")
+    parser.add_argument("--results", help="With --run, write the per-query summary to this .json or .csv file")
+    parser.add_argument("--memory-budget", type=parse_bytes, default=None,
+                        help="With --run, skip queries estimated to need more memory, e.g. 4GB "
+                             "(default: half of physical memory, 0 for no limit)")
+    args = parser.parse_args(argv)
+
+    from benchmarking_suite.helpers import load_tables_from_dir
+    tables = load_tables_from_dir(args.data_dir)
+    if not tables:
+        return 1
+    relationships = None
+    if args.relationship:
+        relationships = []
+        for spec in args.relationship:
+            left, right = spec.split("=")
+            relationships.append(tuple(left.strip().split(".", 1)) + tuple(right.strip().split(".", 1)))
+    generator = WorkloadGenerator(Catalog.from_tables(tables, relationships, seed=args.seed), seed=args.seed,
+                                  shapes=args.shapes, max_tables=args.max_tables,
+                                  selectivity=(args.min_selectivity, args.max_selectivity))
+    queries = generator.generate(args.count)
+    if args.output:
+        write_workload(queries, args.output)
+        print(f"Wrote {len(queries)} queries to {args.output}")
+    if args.run:
+        from core_engine.simple_cqc import default_memory_budget
+        memory_budget = default_memory_budget() if args.memory_budget is None else args.memory_budget or None
+        summary = run_workload(tables, queries, memory_budget=memory_budget)
+        if args.results:
+            from benchmarking_suite.helpers import save_results
+            save_results(summary, args.results)
+        bad = [row for row in summary if (row["error"] and not row["skipped"]) or row["result_match"] is False]
+        skipped = sum(row["skipped"] for row in summary)
+        print(f"\n{len(summary) - skipped} queries run, {len(bad)} failed or mismatched, "
+              f"{skipped} skipped over the memory budget.")
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Boolean expression trees for WHERE and HAVING clauses.
+
+A predicate is one of:
+- Comparison(table, column, op, value, func): `table.column <op> value`. `value`
+  may be a literal, a tuple (for IN / NOT IN), None (for IS NULL) or a ColumnRef
+  for column-vs-column comparisons. `func` names an aggregate (HAVING only).
+- And(children) / Or(children): n-ary conjunction / disjunction.
+- Not(child): negation.
+
+Trees are tuples, so they are immutable, hashable and serialize to JSON as lists.
+"""
+import re
+from typing import NamedTuple, Optional
+import pandas as pd
+
+# Maximum number of clauses produced when distributing OR over AND in to_cnf.
+MAX_CNF_CLAUSES = 16
+
+_NEGATED_OPS = {
+    "=": "!=", "==": "!=", "!=": "=", "<>": "=",
+    "<": ">=", ">=": "<", ">": "<=", "<=": ">",
+    "IN": "NOT IN", "NOT IN": "IN",
+}
+
+
+class ColumnRef(NamedTuple):
+    table: Optional[str]
+    column: str
+
+
+class Comparison(NamedTuple):
+    table: Optional[str]
+    column: str
+    op: str
+    value: object = None
+    func: Optional[str] = None
+
+
+class And(NamedTuple):
+    children: tuple
+
+
+class Or(NamedTuple):
+    children: tuple
+
+
+class Not(NamedTuple):
+    child: object
+
+
+def column_name(table, col):
+    """Returns the prefixed, sanitized column name produced by SimpleCQ.prepare_tables."""
+    return f"{table}_{col.replace(' ', '_')}" if table else col.replace(' ', '_')
+
+
+def make_and(children):
+    children = tuple(children)
+    return children[0] if len(children) == 1 else And(children)
+
+
+def make_or(children):
+    children = tuple(children)
+    return children[0] if len(children) == 1 else Or(children)
+
+
+def conditions_to_expression(conditions, having: bool = False):
+    """
+    Converts legacy flat condition tuples into a tree. Each tuple's trailing
+    `logic` flag joins it to the *next* condition, and the chain is folded left
+    to right, matching generate_sql_equivalent_query.
+
+    WHERE tuples are (table, col, op, val, logic); HAVING tuples are
+    (func, table, col, op, val, logic) with func "VALUE" for plain columns.
+    """
+    expr = None
+    prev_logic = None
+    for cond in conditions:
+        if having:
+            func, table, col, op, val, logic = cond
+            if isinstance(val, str):
+                try:
+                    val = float(val)
+                except ValueError:
+                    pass
+            node = Comparison(table, col, op, val, None if func == "VALUE" else func)
+        else:
+            if len(cond) != 5:
+                raise ValueError("Invalid compare_conditions tuple length. Expected 5 elements.")
+            table, col, op, val, logic = cond
+            if isinstance(val, (list, set)):
+                val = tuple(val)
+            node = Comparison(table, col, op, val)
+        if expr is None:
+            expr = node
+        elif prev_logic == "OR":
+            expr = Or((expr, node))
+        elif prev_logic in ("AND", None):
+            expr = And((expr, node))
+        else:
+            raise ValueError(f"Unsupported logic operator: {prev_logic}")
+        prev_logic = logic
+    return expr
+
+
+def expression_to_conditions(expr, having: bool = False):
+    """
+    Inverse of conditions_to_expression for pure conjunctions of literal
+    comparisons. Returns None when the tree cannot be expressed as a flat list.
+    """
+    items = conjuncts(expr)
+    conditions = []
+    for i, node in enumerate(items):
+        if not isinstance(node, Comparison) or isinstance(node.value, ColumnRef):
+            return None
+        logic = "AND" if i < len(items) - 1 else None
+        if having:
+            conditions.append((node.func or "VALUE", node.table, node.column, node.op, node.value, logic))
+        else:
+            conditions.append((node.table, node.column, node.op, node.value, logic))
+    return conditions
+
+
+def _negate(expr):
+    if isinstance(expr, Not):
+        return push_not_down(expr.child)
+    if isinstance(expr, And):
+        return make_or(_negate(child) for child in expr.children)
+    if isinstance(expr, Or):
+        return make_and(_negate(child) for child in expr.children)
+    if isinstance(expr, Comparison) and expr.op.upper() in _NEGATED_OPS:
+        return expr._replace(op=_NEGATED_OPS[expr.op.upper()])
+    return Not(expr)
+
+
+def push_not_down(expr):
+    """Applies De Morgan's laws so NOT only wraps comparisons it cannot invert."""
+    if isinstance(expr, Not):
+        return _negate(expr.child)
+    if isinstance(expr, And):
+        return make_and(push_not_down(child) for child in expr.children)
+    if isinstance(expr, Or):
+        return make_or(push_not_down(child) for child in expr.children)
+    return expr
+
+
+def flatten(expr):
+    """Merges nested And/Or nodes of the same kind."""
+    if isinstance(expr, (And, Or)):
+        children = []
+        for child in (flatten(c) for c in expr.children):
+            if type(child) is type(expr):
+                children.extend(child.children)
+            else:
+                children.append(child)
+        return type(expr)(tuple(children)) if len(children) > 1 else children[0]
+    if isinstance(expr, Not):
+        return Not(flatten(expr.child))
+    return expr
+
+
+def to_cnf(expr):
+    """
+    Normalizes a tree towards conjunctive normal form: NOTs are pushed down,
+    nested And/Or are flattened, and OR is distributed over AND as long as the
+    result stays within MAX_CNF_CLAUSES conjuncts. Larger disjunctions are left
+    as a single conjunct.
+    """
+    expr = flatten(push_not_down(expr))
+    if isinstance(expr, And):
+        return flatten(make_and(to_cnf(child) for child in expr.children))
+    if isinstance(expr, Or):
+        children = [to_cnf(child) for child in expr.children]
+        clauses = [()]
+        for child in children:
+            options = child.children if isinstance(child, And) else (child,)
+            if len(clauses) * len(options) > MAX_CNF_CLAUSES:
+                return flatten(make_or(children))
+            clauses = [clause + (option,) for clause in clauses for option in options]
+        return flatten(make_and(flatten(make_or(clause)) for clause in clauses))
+    return expr
+
+
+def conjuncts(expr) -> list:
+    """Returns the top-level AND terms of a tree (an empty list for None)."""
+    if expr is None:
+        return []
+    if isinstance(expr, And):
+        return list(expr.children)
+    return [expr]
+
+
+def referenced_tables(expr) -> set:
+    """Tables referenced by a tree; None stands for an unqualified column."""
+    if isinstance(expr, Comparison):
+        tables = {expr.table}
+        if isinstance(expr.value, ColumnRef):
+            tables.add(expr.value.table)
+        return tables
+    if isinstance(expr, Not):
+        return referenced_tables(expr.child)
+    tables = set()
+    for child in expr.children:
+        tables |= referenced_tables(child)
+    return tables
+
+
+def referenced_columns(expr) -> set:
+    """Prefixed column names (see column_name) read by a tree."""
+    if isinstance(expr, Comparison):
+        columns = {column_name(expr.table, expr.column)} if expr.column != "*" else set()
+        if isinstance(expr.value, ColumnRef):
+            columns.add(column_name(expr.value.table, expr.value.column))
+        return columns
+    if isinstance(expr, Not):
+        return referenced_columns(expr.child)
+    columns = set()
+    for child in expr.children:
+        columns |= referenced_columns(child)
+    return columns
+
+
+def _literal_sql(val):
+    if val is None:
+        return "NULL"
+    if isinstance(val, ColumnRef):
+        return column_sql(val.table, val.column)
+    if isinstance(val, str):
+        return "'" + val.replace("'", "''") + "'"
+    return str(val)
+
+
+def column_sql(table, col):
+    col = col.strip('"\'').replace(' ', '_')
+    return f"{table}.{col}" if table else col
+
+
+def to_sql(expr) -> str:
+    """Renders a tree as a fully parenthesized SQL boolean expression."""
+    if isinstance(expr, Comparison):
+        if expr.func:
+            arg = "*" if expr.column == "*" else column_sql(expr.table, expr.column)
+            lhs = f"{expr.func}({arg})"
+        else:
+            lhs = column_sql(expr.table, expr.column)
+        op = expr.op.upper()
+        if op == "IS NULL":
+            return f"{lhs} IS NULL"
+        if op in ("IN", "NOT IN"):
+            values = expr.value if isinstance(expr.value, (list, tuple, set)) else [expr.value]
+            return f"{lhs} {op} (" + ", ".join(_literal_sql(v) for v in values) + ")"
+        if op == "==":
+            op = "="
+        return f"{lhs} {op} {_literal_sql(expr.value)}"
+    if isinstance(expr, Not):
+        return f"NOT ({to_sql(expr.child)})"
+    joiner = " AND " if isinstance(expr, And) else " OR "
+    return joiner.join(f"({to_sql(child)})" for child in expr.children)
+
+
+def _like_to_regex(pattern: str) -> str:
+    parts = []
+    for ch in str(pattern):
+        if ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return "".join(parts)
+
+
+def evaluate(expr, df: pd.DataFrame, resolve=None) -> pd.Series:
+    """
+    Evaluates a tree against a DataFrame and returns a boolean mask. `resolve`
+    maps a Comparison to the DataFrame column it tests; by default the
+    prefixed column_name(table, column) is used.
+    """
+    if isinstance(expr, And):
+        mask = evaluate(expr.children[0], df, resolve)
+        for child in expr.children[1:]:
+            mask = mask & evaluate(child, df, resolve)
+        return mask
+    if isinstance(expr, Or):
+        mask = evaluate(expr.children[0], df, resolve)
+        for child in expr.children[1:]:
+            mask = mask | evaluate(child, df, resolve)
+        return mask
+    if isinstance(expr, Not):
+        return ~evaluate(expr.child, df, resolve)
+
+    left_col = resolve(expr) if resolve else column_name(expr.table, expr.column)
+    if left_col not in df.columns:
+        raise ValueError(f"Column {left_col} not found in DataFrame. Available columns: {df.columns.tolist()}")
+    series = df[left_col]
+    op = expr.op.upper()
+    val = expr.value
+    if isinstance(val, ColumnRef):
+        right_col = column_name(val.table, val.column)
+        if right_col not in df.columns:
+            raise ValueError(f"Column {right_col} not found in DataFrame. Available columns: {df.columns.tolist()}")
+        val = df[right_col]
+    if op == "IS NULL":
+        return series.isnull()
+    if op == "LIKE":
+        return series.astype(str).str.fullmatch(_like_to_regex(val), case=False, na=False)
+    if op in ("IN", "NOT IN"):
+        if not isinstance(val, (list, tuple, set)):
+            val = [val]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # isin does not coerce date literals the way == does
+            val = pd.to_datetime(list(val), errors="coerce")
+        mask = series.isin(val)
+        return mask if op == "IN" else ~mask
+    if op == '<': return series < val
+    if op == '<=': return series <= val
+    if op == '>': return series > val
+    if op == '>=': return series >= val
+    if op in ('=', '=='): return series == val
+    if op in ('!=', '<>'): return series != val
+    raise ValueError(f"Unsupported operator: {expr.op}")
@@ -0,0 +1,210 @@
+"""
+Sufficient statistics for linear models, computed over a join without
+materializing it.
+
+For an acyclic equi-join, the sums over joined rows of x, x x^T and x y
+decompose along the join tree: every table only needs, per join key, how many
+completions its subtree has and the sum of their features (an upward pass),
+and how many completions the rest of the tree has (a downward pass). Each
+block of the Gram matrix is then a weighted X^T W X over the rows of a single
+table, so the cost is linear in the input tables rather than in the join output.
+"""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from core_engine.expressions import (
+    column_name, conditions_to_expression, conjuncts, evaluate, referenced_tables, to_cnf, to_sql,
+)
+
+
+@dataclass
+class SufficientStatistics:
+    """
+    count, sum(x), sum(x x^T), sum(x y), sum(y) and sum(y^2) over the rows of
+    a (joined) dataset, with the names of the columns of x. Statistics of
+    disjoint row sets add up with `+`.
+    """
+    feature_names: list
+    count: float
+    x_sum: np.ndarray
+    xx: np.ndarray
+    xy: np.ndarray
+    y_sum: float
+    yy: float
+
+    @classmethod
+    def from_arrays(cls, X, y, feature_names=None) -> "SufficientStatistics":
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        names = list(feature_names) if feature_names is not None else [f"x{i}" for i in range(X.shape[1])]
+        return cls(names, float(len(y)), X.sum(axis=0), X.T @ X, X.T @ y, float(y.sum()), float(y @ y))
+
+    def __add__(self, other: "SufficientStatistics") -> "SufficientStatistics":
+        if list(self.feature_names) != list(other.feature_names):
+            raise ValueError("Cannot add statistics over different features")
+        return SufficientStatistics(self.feature_names, self.count + other.count, self.x_sum + other.x_sum,
+                                    self.xx + other.xx, self.xy + other.xy, self.y_sum + other.y_sum,
+                                    self.yy + other.yy)
+
+
+def _split_ref(ref: str, tables: dict):
+    table, _, column = ref.partition(".")
+    if table not in tables or column_name(table, column) not in tables[table].columns:
+        raise ValueError(f"Unknown column: {ref}")
+    return table, column_name(table, column)
+
+
+class _Node:
+    def __init__(self, table, df):
+        self.table = table
+        self.df = df
+        self.children = []      # (child node, key column in this table)
+        self.key = None         # key column towards the parent
+        self.columns = []       # (name, values) own features
+        self.index = None       # parent key values as a pd.Index, aligned with counts/sums
+        self.codes = None       # position of each row's key in index (-1: NULL key)
+
+
+def sufficient_statistics(tables: dict, query_parts: dict, features: list, target: str,
+                          categorical: list = ()) -> SufficientStatistics:
+    """
+    Statistics of `features` ("table.column", numeric) plus one-hot columns of
+    `categorical` ("table.column", named "table.column=value") against `target`
+    over the join of query_parts (from parse_query_from_string; only the FROM /
+    JOIN / WHERE parts are used). `tables` are prepared as by
+    SimpleCQ.prepare_tables. Rows with a missing feature or target are left
+    out, and WHERE conjuncts must each reference a single table.
+
+    Raises ValueError when the join graph is not a tree of equi-joins.
+    """
+    join_order = list(query_parts["join_order"])
+    edges = query_parts.get("join_conditions") or []
+    if len(edges) != len(join_order) - 1:
+        raise ValueError("Sufficient statistics need an acyclic join: one join condition per joined table")
+
+    # 1. Filtered tables
+    where = query_parts.get("where")
+    if where is None and query_parts.get("compare_conditions"):
+        where = conditions_to_expression(query_parts["compare_conditions"])
+    filtered = {t: tables[t] for t in join_order}
+    for pred in conjuncts(to_cnf(where)) if where is not None else []:
+        refs = referenced_tables(pred)
+        if len(refs) != 1 or next(iter(refs)) not in filtered:
+            raise ValueError(f"Only single-table WHERE conditions are supported here: {to_sql(pred)}")
+        t = next(iter(refs))
+        filtered[t] = filtered[t][evaluate(pred, filtered[t])]
+
+    if target in features:
+        raise ValueError(f"Target {target} is also listed as a feature")
+    numeric = [_split_ref(ref, tables) for ref in features] + [_split_ref(target, tables)]
+    for t, col in numeric:
+        filtered[t] = filtered[t][filtered[t][col].notna()]
+
+    # 2. Join tree, rooted at the largest table
+    nodes = {t: _Node(t, filtered[t]) for t in join_order}
+    adjacency = {t: [] for t in join_order}
+    for t1, c1, t2, c2 in edges:
+        adjacency[t1].append((t2, column_name(t1, c1), column_name(t2, c2)))
+        adjacency[t2].append((t1, column_name(t2, c2), column_name(t1, c1)))
+    root = nodes[max(join_order, key=lambda t: len(filtered[t]))]
+    order, seen = [root], {root.table}
+    for node in order:
+        for other, key, other_key in adjacency[node.table]:
+            if other in seen:
+                continue
+            seen.add(other)
+            nodes[other].key = other_key
+            node.children.append((nodes[other], key))
+            order.append(nodes[other])
+    if len(seen) != len(join_order):
+        raise ValueError("Sufficient statistics need a connected, acyclic join graph")
+
+    # 3. Own feature columns, in the caller's order; target last
+    names = []
+    for ref, (t, col) in zip(list(features) + [target], numeric):
+        nodes[t].columns.append((ref, nodes[t].df[col].to_numpy(dtype=float)))
+        names.append(ref)
+    for ref in categorical:
+        t, col = _split_ref(ref, tables)
+        values = nodes[t].df[col]
+        codes, vocab = pd.factorize(values, sort=True)  # missing values get code -1: all zeros
+        for j, value in enumerate(vocab):
+            name = f"{ref}={value}"
+            nodes[t].columns.append((name, (codes == j).astype(float)))
+            names.append(name)
+
+    # Column positions of each subtree's features: own, then children in order
+    layout = {}
+
+    def assign(node):
+        own = [names.index(name) for name, _ in node.columns]
+        layout[node.table] = own + [i for child, _ in node.children for i in assign(child)]
+        return layout[node.table]
+    assign(root)
+
+    # 4. Upward pass: per node, rows x (own features, mean subtree features
+    # of each child for the row's key), and the number of subtree completions
+    rows = {}
+    for node in reversed(order):
+        n = len(node.df)
+        inside = np.ones(n)
+        blocks = [np.column_stack([v for _, v in node.columns]) if node.columns else np.empty((n, 0))]
+        child_counts = []
+        for child, key in node.children:
+            idx = child.index.get_indexer(node.df[key])
+            hit = idx >= 0
+            counts = np.where(hit, child.counts[np.maximum(idx, 0)], 0.0)
+            means = np.zeros((n, child.sums.shape[1]))
+            ok = hit & (counts > 0)
+            means[ok] = child.sums[idx[ok]] / counts[ok, None]
+            inside *= counts
+            blocks.append(means)
+            child_counts.append((idx, counts))
+        m = np.hstack(blocks)
+        rows[node.table] = (m, inside, child_counts)
+        if node is not root:
+            node.codes, uniques = pd.factorize(node.df[node.key])
+            node.index = pd.Index(uniques)
+            valid = node.codes >= 0
+            group = sparse.csr_matrix((inside[valid], (node.codes[valid], np.flatnonzero(valid))),
+                                      shape=(len(uniques), n))
+            node.counts = np.asarray(group.sum(axis=1)).ravel()
+            node.sums = group @ m
+
+    # 5. Downward pass: rows weighted by completions outside and inside their
+    # subtree; every block whose two features meet at this node is X^T W X here
+    dim = len(names)
+    gram = np.zeros((dim, dim))
+    outside = {root.table: np.ones(len(root.df))}
+    for node in order:
+        m, inside, child_counts = rows[node.table]
+        weight = outside[node.table] * inside
+        pos = np.array(layout[node.table], dtype=int)
+        local = (m * weight[:, None]).T @ m
+        # Child-diagonal blocks hold mean x mean products; the child computes them exactly
+        keep = np.ones_like(local, dtype=bool)
+        start = len(node.columns)
+        for child, _ in node.children:
+            width = len(layout[child.table])
+            keep[start:start + width, start:start + width] = False
+            start += width
+        gram[np.ix_(pos, pos)] = np.where(keep, local, gram[np.ix_(pos, pos)])
+        if node is root:
+            count = weight.sum()
+            x_sum = np.zeros(dim)
+            x_sum[pos] = weight @ m
+        for i, (child, key) in enumerate(node.children):
+            idx, _ = child_counts[i]
+            others = outside[node.table].copy()
+            for j, (_, counts) in enumerate(child_counts):
+                if j != i:
+                    others *= counts
+            hit = idx >= 0
+            per_key = np.bincount(idx[hit], weights=others[hit], minlength=len(child.index))
+            outside[child.table] = np.where(child.codes >= 0, per_key[np.maximum(child.codes, 0)], 0.0)
+
+    y = names.index(target)
+    x = [i for i in range(dim) if i != y]
+    return SufficientStatistics([names[i] for i in x], float(count), x_sum[x], gram[np.ix_(x, x)],
+                                gram[x, y], float(x_sum[y]), float(gram[y, y]))
@@ -0,0 +1,312 @@
+"""
+Background query execution in worker processes.
+
+A QueryRunner starts each submitted query in its own process, at most
+`max_workers` at a time (later submissions wait as "queued"). The returned
+QueryJob is polled for operator progress and can be cancelled or
+time-limited: the engine stops cooperatively at its next
+checkpoint (see SimpleCQ.check_cancelled), and a worker that does not stop
+within a grace period, e.g. inside one long pandas call, is killed.
+Queries that would exceed the memory budget end as "over_budget" (see
+SimpleCQ.memory_budget).
+
+Workers write result chunks to files in a temporary directory per job and
+only send their paths, so results are neither pickled through a pipe nor
+held in memory: QueryJob.iter_chunks() reads them back as they arrive,
+while the query is still running.
+
+Workers are forked where possible and inherit the engine. Under other start
+methods (CQC_START_METHOD=forkserver or spawn, e.g. to avoid forking a
+threaded server) the engine's tables are first moved to shared memory, so
+workers attach to them rather than each unpickling a copy.
+"""
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+import pandas as pd
+from core_engine.simple_cqc import DEFAULT_CHUNK_ROWS, MemoryBudgetExceeded, QueryCancelled
+from core_engine.spill import read_frame, write_frame
+from core_engine.tracing import ProgressTracer
+
+# Seconds a worker gets to stop at a checkpoint before it is killed.
+CANCEL_GRACE_SECONDS = 2.0
+FINAL_STATES = ("done", "failed", "cancelled", "timed_out", "over_budget")
+# Start method of worker processes; by default fork where available.
+START_METHOD = os.environ.get("CQC_START_METHOD") or ("fork" if "fork" in mp.get_all_start_methods() else None)
+
+
+def worker_context(engine):
+    """
+    Multiprocessing context for workers running queries on `engine`. Forked
+    workers inherit the engine (tables, statistics, indexes) without copying
+    it; otherwise its tables are shared first (SimpleCQ.share_tables) and the
+    pickled engine carries only a handle to them.
+    """
+    ctx = mp.get_context(START_METHOD)
+    if ctx.get_start_method() != "fork":
+        engine.share_tables()
+    return ctx
+
+
+def _remove_results(path: str, owner_pid: int):
+    # Forked workers inherit the parent's jobs; only the parent removes their results
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _run_in_worker(engine, query_parts, chunk_rows, timeout, profile, memory_budget, refuse_over_budget,
+                   result_dir, cancel_event, messages):
+    engine.tracer = ProgressTracer(lambda event: messages.put(("progress", event)))
+    engine.cancel_event = cancel_event
+    engine.deadline = time.monotonic() + timeout if timeout else None
+    engine.profile = bool(profile)
+    engine.profile_memory = profile == "memory"
+    engine.memory_budget = memory_budget
+    engine.refuse_over_budget = refuse_over_budget
+    try:
+        for i, chunk in enumerate(engine.iter_parsed(query_parts, chunk_rows)):
+            path = write_frame(os.path.join(result_dir, f"{i:08d}"), chunk)
+            messages.put(("chunk", (path, len(chunk))))
+        outcome = ("done", None)
+    except QueryCancelled as e:
+        timed_out = engine.deadline is not None and time.monotonic() > engine.deadline
+        outcome = ("timed_out" if timed_out else "cancelled", str(e))
+    except MemoryBudgetExceeded as e:
+        outcome = ("over_budget", str(e))
+    except Exception as e:
+        outcome = ("failed", f"{type(e).__name__}: {e}")
+    if engine.last_plan is not None:
+        # Also after a cancel or timeout: the operators that did run show where the time went
+        messages.put(("plan", engine.last_plan.to_dict()))
+    messages.put(outcome)
+
+
+class QueryJob:
+    """
+    Handle on a query submitted to a QueryRunner.
+
+    `status` is one of "queued", "running", "done", "failed", "cancelled",
+    "timed_out" or "over_budget". poll() collects the worker's messages so
+    far; `progress` holds the latest operator event (see ProgressTracer),
+    `chunk_files` the result chunks written and `rows` their row count. For
+    profiled jobs, `plan` is the analyzed plan (PlanNode.to_dict()) once
+    finished. The result files are removed by discard(), or once the job is
+    garbage collected.
+    """
+    def __init__(self, runner, job_id, engine, query_parts, chunk_rows, timeout, profile=False,
+                 memory_budget=None, refuse_over_budget=True):
+        self.runner = runner
+        self.id = job_id
+        self.timeout = timeout
+        self.memory_budget = memory_budget
+        self.status = "queued"
+        self.error = None
+        self.progress = None
+        self.chunk_files = []
+        self.rows = 0
+        self.plan = None
+        self.submitted_at = time.monotonic()
+        self.started_at = self.finished_at = None
+        self._args = (engine, query_parts, chunk_rows, timeout, profile, memory_budget, refuse_over_budget)
+        self._process = self._cancel_event = self._messages = None
+        self.result_dir = tempfile.mkdtemp(prefix="cqc_result_")
+        self._cleanup = weakref.finalize(self, _remove_results, self.result_dir, os.getpid())
+
+    def _start(self):
+        ctx = worker_context(self._args[0])
+        self._cancel_event = ctx.Event()
+        self._messages = ctx.Queue()
+        self._process = ctx.Process(target=_run_in_worker, daemon=True,
+                                    args=self._args + (self.result_dir, self._cancel_event, self._messages))
+        self._process.start()
+        self._args = None
+        self.status = "running"
+        self.started_at = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATES
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the query started running (0 while queued)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.monotonic()
+        if self._process is not None:
+            self._process.join(CANCEL_GRACE_SECONDS)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._messages.close()
+        self.runner._start_queued()
+
+    def _drain(self):
+        while not self.finished:
+            try:
+                kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "progress":
+                self.progress = payload
+            elif kind == "chunk":
+                path, rows = payload
+                self.chunk_files.append(path)
+                self.rows += rows
+            elif kind == "plan":
+                self.plan = payload
+            elif kind == "done":
+                self._finish("done")
+            else:
+                self._finish(kind, payload)
+
+    def _kill(self, status, error):
+        self._process.kill()
+        self._process.join()
+        self._finish(status, error)
+
+    def poll(self) -> bool:
+        """Collects the worker's messages; returns True while the query is queued or running."""
+        self.runner._start_queued()
+        if self.status != "running":
+            return not self.finished
+        self._drain()
+        if self.finished:
+            return False
+        if not self._process.is_alive():
+            self._drain()  # messages sent just before exiting
+            if not self.finished:
+                self._finish("failed", f"Worker exited with code {self._process.exitcode}")
+        elif self.timeout and self.elapsed > self.timeout + CANCEL_GRACE_SECONDS:
+            self._kill("timed_out", "Query timed out")
+        return not self.finished
+
+    def wait(self, timeout: float = None, interval: float = 0.05) -> bool:
+        """Polls until the job finishes or `timeout` seconds pass; returns whether it finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def cancel(self):
+        """Stops the query: cooperatively at the next checkpoint, or by killing the worker."""
+        if self.status == "queued":
+            self.runner._dequeue(self)
+            self._finish("cancelled", "Query cancelled")
+            return
+        if self.finished:
+            return
+        self._cancel_event.set()
+        if not self.wait(CANCEL_GRACE_SECONDS):
+            self._kill("cancelled", "Query cancelled")
+
+    def iter_chunks(self, interval: float = 0.05):
+        """
+        Yields the result chunks, reading each from disk when it is reached.
+        While the job runs, waits (polling) for the chunks still to come; ends
+        once the job has finished and every chunk was read, whatever its
+        status. Each call starts again from the first chunk; rows are
+        numbered from 0 across chunks.
+        """
+        read = rows = 0
+        while True:
+            if read < len(self.chunk_files):
+                chunk = read_frame(self.chunk_files[read])
+                chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+                read += 1
+                rows += len(chunk)
+                yield chunk
+                continue
+            running = self.poll()
+            if read < len(self.chunk_files):
+                continue
+            if not running:
+                return
+            time.sleep(interval)
+
+    def result(self) -> pd.DataFrame:
+        """The full result of a finished job; raises RuntimeError if it did not succeed."""
+        if self.status != "done":
+            raise RuntimeError(self.error or f"Query is {self.status}")
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+    def discard(self):
+        """Cancels the job if it has not finished and removes its result files."""
+        self.cancel()
+        self._cleanup()
+
+
+class QueryRunner:
+    """
+    Runs queries on a SimpleCQ engine in worker processes, at most
+    `max_workers` at once. `timeout` (seconds) and `memory_budget` (bytes)
+    are the defaults of submitted queries, None for no limit.
+    """
+    def __init__(self, max_workers: int = 2, timeout: float = None, memory_budget: int = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_budget = memory_budget
+        self._jobs = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def submit(self, engine, query_parts: dict, timeout: float = None,
+               chunk_rows: int = DEFAULT_CHUNK_ROWS, profile=False, memory_budget: int = None,
+               refuse_over_budget: bool = True) -> QueryJob:
+        """
+        Queues a parsed query (see parse_query_from_string) and returns its
+        QueryJob. With profile=True the job records per-operator rows and
+        time (see SimpleCQ.profile); profile="memory" also records memory.
+        Pass refuse_over_budget=False to run a plan whose estimate is over
+        the memory budget, e.g. after the user confirmed it; live accounting
+        still stops the query once it actually exceeds the budget.
+        """
+        with self._lock:
+            self._next_id += 1
+            job = QueryJob(self, self._next_id, engine, query_parts, chunk_rows,
+                           self.timeout if timeout is None else timeout, profile,
+                           self.memory_budget if memory_budget is None else memory_budget, refuse_over_budget)
+            self._jobs.append(job)
+        self._start_queued()
+        return job
+
+    def _start_queued(self):
+        with self._lock:
+            self._jobs = [job for job in self._jobs if not job.finished]
+            running = sum(job.status == "running" for job in self._jobs)
+            for job in self._jobs:
+                if running >= self.max_workers:
+                    break
+                if job.status == "queued":
+                    job._start()
+                    running += 1
+
+    def _dequeue(self, job):
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+    @property
+    def active_jobs(self) -> list:
+        with self._lock:
+            return [job for job in self._jobs if not job.finished]
+
+    def shutdown(self):
+        """Cancels all queued and running jobs."""
+        for job in self.active_jobs:
+            job.cancel()
@@ -1,10 +1,264 @@
 import re
+from core_engine.expressions import (
+    And, ColumnRef, Comparison, Not, Or, expression_to_conditions, make_and, make_or, to_cnf,
+)
+
+# Clause-level patterns, compiled once at import.
+_EXPLAIN_RE = re.compile(r'\s*EXPLAIN\s+(ANALYZE\s+)?', re.IGNORECASE)
+_SELECT_RE = re.compile(r'SELECT\s+(DISTINCT\s+)?(.*?)(\s+FROM\s+)', re.IGNORECASE)
+_SELECT_SPLIT_RE = re.compile(r',(?![^(]*\))')
+_AGG_RE = re.compile(r'(\w+)\((\*|\w+\.\w+|\w+)\)(?:\s+AS\s+(\w+))?', re.IGNORECASE)
+_QUALIFIED_COL_RE = re.compile(r'(\w+)\."?([\w\s]+?)"?(?:\s+AS\s+(\w+))?$', re.IGNORECASE)
+_UNQUALIFIED_COL_RE = re.compile(r'"?([\w\s]+?)"?(?:\s+AS\s+(\w+))?$', re.IGNORECASE)
+# Table aliases may omit AS (FROM patients p), so an alias must not be a clause keyword
+_FROM_RE = re.compile(
+    r'FROM\s+([^\s,]+)'
+    r'(?:\s+(?:AS\s+)?(?!(?:INNER|JOIN|LEFT|RIGHT|FULL|CROSS|WHERE|GROUP|ORDER|HAVING|LIMIT|OFFSET)\b)(\w+))?',
+    re.IGNORECASE)
+_OUTER_JOIN_RE = re.compile(r'\b(?:LEFT|RIGHT|FULL)(?:\s+OUTER)?\s+JOIN\b', re.IGNORECASE)
+_JOIN_RE = re.compile(
+    r'(?:INNER\s+)?JOIN\s+([^\s]+)(?:\s+(?:AS\s+)?(?!ON\b)(\w+))?\s+ON\s+(.*?)'
+    r'(?=\s+(?:(?:INNER\s+)?JOIN|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|OFFSET)\b|$)',
+    re.IGNORECASE)
+_ON_RE = re.compile(r'(\w+)\."?([\w\s]+?)"?\s*=\s*(\w+)\."?([\w\s]+?)"?\s*$')
+_WHERE_RE = re.compile(r'WHERE\s+(.*?)(?=\s+(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|OFFSET)\b|$)', re.IGNORECASE)
+_GROUP_BY_RE = re.compile(r'GROUP\s+BY\s+(.*?)(?=\s+(?:ORDER\s+BY|HAVING|LIMIT|OFFSET)\b|$)', re.IGNORECASE)
+_HAVING_RE = re.compile(r'HAVING\s+(.*?)(?=\s+(?:ORDER\s+BY|LIMIT|OFFSET)\b|$)', re.IGNORECASE)
+_ORDER_BY_RE = re.compile(r'ORDER\s+BY\s+(.*?)(?=\s+(?:LIMIT|OFFSET)\b|$)', re.IGNORECASE)
+_LIMIT_RE = re.compile(r'LIMIT\s+(\d+)', re.IGNORECASE)
+_OFFSET_RE = re.compile(r'OFFSET\s+(\d+)', re.IGNORECASE)
+
+# Tokenizer for WHERE/HAVING boolean expressions.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<qident>"[^"]*")
+      | (?P<number>-?\d+(?:\.\d+)?(?!\w))
+      | (?P<op><=|>=|!=|<>|==|=|<|>)
+      | (?P<word>[A-Za-z_]\w*)
+      | (?P<punct>[().,*])
+    )""", re.VERBOSE)
+_KEYWORDS = {"AND", "OR", "NOT", "IS", "NULL", "IN", "LIKE"}
+
+
+def tokenize(text: str) -> list:
+    """Splits a boolean expression into (kind, text) tokens."""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unexpected character in expression at position {pos}: {text[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "word" and value.upper() in _KEYWORDS:
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _ExpressionParser:
+    """
+    Recursive-descent parser for WHERE/HAVING expressions with standard
+    precedence (NOT > AND > OR) and parentheses.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        expr = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Could not parse condition near {self.tokens[self.pos][1]!r} in: {self.text}")
+        return expr
+
+    def _peek(self, offset: int = 0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def _accept(self, kind, value=None):
+        tok_kind, tok_value = self._peek()
+        if tok_kind == kind and (value is None or tok_value == value):
+            self.pos += 1
+            return tok_value
+        return None
+
+    def _expect(self, kind, value=None):
+        result = self._accept(kind, value)
+        if result is None:
+            found = self._peek()[1]
+            raise ValueError(f"Expected {value or kind} but found {found!r} in: {self.text}")
+        return result
+
+    def _or(self):
+        parts = [self._and()]
+        while self._accept("keyword", "OR"):
+            parts.append(self._and())
+        return make_or(parts)
+
+    def _and(self):
+        parts = [self._not()]
+        while self._accept("keyword", "AND"):
+            parts.append(self._not())
+        return make_and(parts)
+
+    def _not(self):
+        if self._accept("keyword", "NOT"):
+            return Not(self._not())
+        if self._accept("punct", "("):
+            expr = self._or()
+            self._expect("punct", ")")
+            return expr
+        return self._predicate()
+
+    def _predicate(self):
+        func, table, column = self._operand()
+        if self._accept("keyword", "IS"):
+            negate = self._accept("keyword", "NOT")
+            self._expect("keyword", "NULL")
+            node = Comparison(table, column, "IS NULL", None, func)
+            return Not(node) if negate else node
+        negate = self._accept("keyword", "NOT")
+        if self._accept("keyword", "IN"):
+            self._expect("punct", "(")
+            values = [self._value()]
+            while self._accept("punct", ","):
+                values.append(self._value())
+            self._expect("punct", ")")
+            return Comparison(table, column, "NOT IN" if negate else "IN", tuple(values), func)
+        if self._accept("keyword", "LIKE"):
+            node = Comparison(table, column, "LIKE", self._value(), func)
+            return Not(node) if negate else node
+        if negate:
+            raise ValueError(f"Expected IN or LIKE after NOT in: {self.text}")
+        op = self._expect("op")
+        op = {"==": "=", "<>": "!="}.get(op, op)
+        return Comparison(table, column, op, self._value(), func)
+
+    def _name(self):
+        """Reads a column name: a quoted identifier or a run of plain words."""
+        quoted = self._accept("qident")
+        if quoted is not None:
+            return quoted.strip('"')
+        words = [self._expect("word")]
+        while self._peek()[0] == "word":
+            words.append(self._accept("word"))
+        return " ".join(words)
+
+    def _operand(self):
+        """Returns (aggregate function or None, table or None, column)."""
+        kind, value = self._peek()
+        if kind == "word" and self._peek(1) == ("punct", "("):
+            self.pos += 2
+            if self._accept("punct", "*"):
+                table, column = None, "*"
+            else:
+                table, column = self._column_ref()
+            self._expect("punct", ")")
+            return value.upper(), table, column
+        table, column = self._column_ref()
+        return None, table, column
+
+    def _column_ref(self):
+        kind, value = self._peek()
+        if kind == "word" and self._peek(1) == ("punct", "."):
+            self.pos += 2
+            return value, self._name()
+        return None, self._name()
+
+    def _value(self):
+        kind, value = self._peek()
+        if kind == "string":
+            self.pos += 1
+            return value[1:-1].replace("''", "'")
+        if kind == "qident":
+            self.pos += 1
+            return value.strip('"')
+        if kind == "number":
+            self.pos += 1
+            return float(value) if "." in value else int(value)
+        if kind == "keyword" and value == "NULL":
+            self.pos += 1
+            return None
+        if kind == "word":
+            if self._peek(1) == ("punct", "."):
+                return ColumnRef(*self._column_ref())
+            # Bare words are treated as string literals, e.g. Country = Canada
+            return self._name()
+        raise ValueError(f"Expected a value but found {value!r} in: {self.text}")
+
+
+def parse_expression(text: str):
+    """Parses a WHERE/HAVING condition string into an expression tree."""
+    return _ExpressionParser(text).parse()
+
+
+def _qualify(expr, default_table, keep_unqualified=()):
+    """Assigns default_table to unqualified columns, except names in keep_unqualified."""
+    if isinstance(expr, Comparison):
+        if expr.table is None and expr.column != "*" and expr.column not in keep_unqualified:
+            expr = expr._replace(table=default_table)
+        if isinstance(expr.value, ColumnRef) and expr.value.table is None:
+            expr = expr._replace(value=expr.value._replace(table=default_table))
+        return expr
+    if isinstance(expr, Not):
+        return Not(_qualify(expr.child, default_table, keep_unqualified))
+    children = tuple(_qualify(child, default_table, keep_unqualified) for child in expr.children)
+    return And(children) if isinstance(expr, And) else Or(children)
+
+
+def _rename_tables(expr, aliases: dict):
+    """Replaces table aliases in an expression tree by the table names."""
+    if isinstance(expr, Comparison):
+        expr = expr._replace(table=aliases.get(expr.table, expr.table))
+        if isinstance(expr.value, ColumnRef):
+            expr = expr._replace(value=expr.value._replace(table=aliases.get(expr.value.table, expr.value.table)))
+        return expr
+    if isinstance(expr, Not):
+        return Not(_rename_tables(expr.child, aliases))
+    children = tuple(_rename_tables(child, aliases) for child in expr.children)
+    return And(children) if isinstance(expr, And) else Or(children)
+
+
+def _resolve_aliases(query_parts: dict):
+    """Rewrites every table alias reference (p.patient_id) to its table (patients.patient_id)."""
+    aliases = query_parts["aliases"]
+
+    def table(name):
+        return aliases.get(name, name)
+    query_parts["select_cols"] = [(table(t), c, a) for t, c, a in query_parts["select_cols"]]
+    query_parts["select_aggs"] = [(f, table(t), c, a) for f, t, c, a in query_parts["select_aggs"]]
+    query_parts["join_conditions"] = [(table(t1), c1, table(t2), c2)
+                                      for t1, c1, t2, c2 in query_parts["join_conditions"]]
+    query_parts["group_by"] = [(table(t), c) for t, c in query_parts["group_by"]]
+    query_parts["order_by"] = [(table(t), c, asc) for t, c, asc in query_parts["order_by"]]
+    if query_parts["where"] is not None:
+        query_parts["where"] = _rename_tables(query_parts["where"], aliases)
+        query_parts["compare_conditions"] = expression_to_conditions(query_parts["where"]) or []
+    if query_parts["having"] is not None:
+        query_parts["having"] = _rename_tables(query_parts["having"], aliases)
+        query_parts["having_conditions"] = expression_to_conditions(query_parts["having"], having=True) or []
+
 
 def parse_query_from_string(query_string: str) -> dict:
     """
     Parses a simplified SQL-like query string into a structured dictionary
-    that the SimpleCQ engine can understand. Supports DISTINCT, JOIN, WHERE (AND/OR),
-    ORDER BY, LIMIT, OFFSET, GROUP BY, HAVING, and aggregate functions.
+    that the SimpleCQ engine can understand. Supports DISTINCT, JOIN, WHERE and
+    HAVING boolean expressions (AND/OR/NOT with parentheses), ORDER BY, LIMIT,
+    OFFSET, GROUP BY and aggregate functions.
+    Queries prefixed with EXPLAIN or EXPLAIN ANALYZE set the "explain" and
+    "analyze" flags; the rest of the query is parsed as usual.
+
+    WHERE and HAVING are returned as expression trees ("where", "having"; see
+    core_engine.expressions) normalized towards conjunctive form. When a clause
+    is a plain conjunction of literal comparisons it is also returned in the
+    legacy flat form ("compare_conditions", "having_conditions").
+
+    Table aliases (FROM patients p, JOIN appointments AS a) are resolved to
+    table names throughout. Outer joins are rejected with a ValueError.
     """
     query_parts = {
         "select_cols": [],
@@ -13,12 +267,16 @@ def parse_query_from_string(query_string: str) -> dict:
         "join_order": [],
         "join_conditions": [],
         "compare_conditions": [],
+        "where": None,
         "order_by": [],      # List of tuples: (table, col, asc)
         "limit": None,
         "offset": None,
         "group_by": [],
         "having_conditions": [],
+        "having": None,
         "aliases": {},
+        "explain": False,
+        "analyze": False,
     }
 
     # Remove trailing semicolon
@@ -27,16 +285,23 @@ def parse_query_from_string(query_string: str) -> dict:
     # Remove line breaks
     query_string = query_string.replace('\n', ' ')
 
+    # Parse EXPLAIN [ANALYZE]
+    explain_match = _EXPLAIN_RE.match(query_string)
+    if explain_match:
+        query_parts["explain"] = True
+        query_parts["analyze"] = bool(explain_match.group(1))
+        query_string = query_string[explain_match.end():]
+
     # Parse SELECT [DISTINCT]
-    select_match = re.search(r'SELECT\s+(DISTINCT\s+)?(.*?)(\s+FROM\s+)', query_string, re.IGNORECASE)
+    select_match = _SELECT_RE.search(query_string)
     if select_match:
         query_parts["distinct"] = bool(select_match.group(1))
         cols_str = select_match.group(2).strip()
         # Split columns by comma and handle each individually
-        cols = [col.strip() for col in re.split(r',(?![^(]*\))', cols_str) if col.strip()]
+        cols = [col.strip() for col in _SELECT_SPLIT_RE.split(cols_str) if col.strip()]
         for col in cols:
             # Aggregate function?
-            agg_match = re.match(r'(\w+)\((\*|\w+\.\w+|\w+)\)(?:\s+AS\s+(\w+))?', col, re.IGNORECASE)
+            agg_match = _AGG_RE.match(col)
             if agg_match:
                 func, arg, alias = agg_match.groups()
                 if '.' in arg:
@@ -48,13 +313,13 @@ def parse_query_from_string(query_string: str) -> dict:
                 query_parts["select_aggs"].append((func.upper(), table, column, alias))
             else:
                 # Qualified? (table.col)
-                col_match = re.match(r'(\w+)\."?([\w\s]+)"?(?:\s+AS\s+(\w+))?$', col)
+                col_match = _QUALIFIED_COL_RE.match(col)
                 if col_match:
                     table, column, alias = col_match.groups()
                     query_parts["select_cols"].append((table, column.strip(), alias))
                 else:
                     # Unqualified
-                    col_match = re.match(r'"?([\w\s]+)"?(?:\s+AS\s+(\w+))?$', col)
+                    col_match = _UNQUALIFIED_COL_RE.match(col)
                     if col_match:
                         column, alias = col_match.groups()
                         query_parts["select_cols"].append((None, column.strip(), alias))
@@ -62,68 +327,38 @@ def parse_query_from_string(query_string: str) -> dict:
                         print(f"Warning: Could not parse SELECT column: {col}")
 
     # Parse FROM, JOINs, and Aliases
-    from_match = re.search(r'FROM\s+([^\s,]+)(?:\s+AS\s+(\w+))?', query_string, re.IGNORECASE)
+    outer_join = _OUTER_JOIN_RE.search(query_string)
+    if outer_join:
+        raise ValueError(f"Outer joins are not supported: {outer_join.group(0)}")
+    from_match = _FROM_RE.search(query_string)
     if from_match:
         main_table, alias = from_match.groups()
         query_parts["join_order"].append(main_table)
         if alias:
             query_parts["aliases"][alias] = main_table
     # All JOINs
-    join_pattern = re.compile(
-        r'(?:INNER\s+)?JOIN\s+([^\s]+)(?:\s+AS\s+(\w+))?\s+ON\s+(\w+)\."?([\w\s]+)"?\s*=\s*(\w+)\."?([\w\s]+)"?',
-        re.IGNORECASE)
-    for match in join_pattern.finditer(query_string):
-        t2, alias2, t1, col1, t2b, col2 = match.groups()
+    for match in _JOIN_RE.finditer(query_string):
+        t2, alias2, on_str = match.groups()
+        on_match = _ON_RE.match(on_str.strip())
+        if not on_match:
+            raise ValueError(f"Could not parse JOIN condition: {on_str.strip()}")
+        t1, col1, t2b, col2 = on_match.groups()
         query_parts["join_order"].append(t2)
         if alias2:
             query_parts["aliases"][alias2] = t2
         query_parts["join_conditions"].append((t1, col1.strip(), t2b, col2.strip()))
 
+    default_table = query_parts["join_order"][0] if query_parts["join_order"] else None
+
     # Parse WHERE
-    where_match = re.search(r'WHERE (.*?)(GROUP BY|ORDER BY|HAVING|LIMIT|OFFSET|$)', query_string, re.IGNORECASE)
-    if where_match:
-        where_str = where_match.group(1).strip()
-        tokens = re.split(r'(\s+(?:AND|OR)\s+)', where_str, flags=re.IGNORECASE)
-        conditions = []
-        logic_ops = []
-        for token in tokens:
-            if token.strip().upper() in ('AND', 'OR'):
-                logic_ops.append(token.strip().upper())
-            elif token.strip():
-                conditions.append(token.strip())
-        for i, cond_str in enumerate(conditions):
-            # Try table.column first
-            comp_match = re.match(r'(\w+)\."?([\w\s]+)"?\s*([<>=!]+|IS\s+NULL|LIKE|IN|NOT\s+IN)\s*(.*)', cond_str, re.IGNORECASE)
-            if comp_match:
-                table, col, op, val_str = comp_match.groups()
-            else:
-                # Try just column
-                comp_match = re.match(r'"?([\w\s]+)"?\s*([<>=!]+|IS\s+NULL|LIKE|IN|NOT\s+IN)\s*(.*)', cond_str, re.IGNORECASE)
-                if comp_match:
-                    col, op, val_str = comp_match.groups()
-                    table = query_parts["join_order"][0]
-                else:
-                    print(f"Warning: Could not parse WHERE condition: {cond_str}")
-                    continue
-            col = col.strip()
-            val_str = val_str.strip()
-            if (val_str.startswith("'") and val_str.endswith("'")) or (val_str.startswith('"') and val_str.endswith('"')):
-                val = val_str.strip("'\"")
-            elif val_str.upper() == "NULL":
-                val = None
-            elif op.upper() in ("IN", "NOT IN"):
-                # Parse IN list
-                val = [v.strip(" '\"") for v in re.split(r',', val_str.strip("() ")) if v.strip()]
-            else:
-                try: val = int(val_str)
-                except ValueError:
-                    try: val = float(val_str)
-                    except ValueError: val = val_str
-            logic = logic_ops[i] if i < len(logic_ops) else None
-            query_parts["compare_conditions"].append((table, col, op.strip(), val, logic))
+    where_match = _WHERE_RE.search(query_string)
+    if where_match and where_match.group(1).strip():
+        where = to_cnf(_qualify(parse_expression(where_match.group(1)), default_table))
+        query_parts["where"] = where
+        query_parts["compare_conditions"] = expression_to_conditions(where) or []
 
     # Parse GROUP BY
-    gb_match = re.search(r'GROUP BY\s+(.*?)(ORDER BY|HAVING|LIMIT|OFFSET|$)', query_string, re.IGNORECASE)
+    gb_match = _GROUP_BY_RE.search(query_string)
     if gb_match:
         gb_str = gb_match.group(1).strip()
         gb_cols = [col.strip() for col in gb_str.split(',')]
@@ -135,51 +370,16 @@ def parse_query_from_string(query_string: str) -> dict:
             query_parts["group_by"].append((table, col))
 
     # Parse HAVING
-    having_match = re.search(r'HAVING\s+(.*?)(ORDER BY|LIMIT|OFFSET|$)', query_string, re.IGNORECASE)
-    if having_match:
-        having_str = having_match.group(1).strip()
-        tokens = re.split(r'(\s+(?:AND|OR)\s+)', having_str, flags=re.IGNORECASE)
-        conditions = []
-        logic_ops = []
-        for token in tokens:
-            if token.strip().upper() in ('AND', 'OR'):
-                logic_ops.append(token.strip().upper())
-            elif token.strip():
-                conditions.append(token.strip())
-        for i, cond_str in enumerate(conditions):
-            # Support aggregates in HAVING
-            agg_match = re.match(r'(\w+)\((\*|\w+\.\w+|\w+)\)\s*([<>=!]+)\s*(.*)', cond_str, re.IGNORECASE)
-            if agg_match:
-                func, arg, op, val_str = agg_match.groups()
-                if '.' in arg:
-                    table, col = arg.split('.', 1)
-                elif arg == '*':
-                    table, col = None, '*'
-                else:
-                    table, col = None, arg
-                val = val_str.strip("'\"")
-                logic = logic_ops[i] if i < len(logic_ops) else None
-                query_parts["having_conditions"].append((func.upper(), table, col, op.strip(), val, logic))
-            else:
-                # Try table.column
-                comp_match = re.match(r'(\w+)\."?([\w\s]+)"?\s*([<>=!]+)\s*(.*)', cond_str, re.IGNORECASE)
-                if comp_match:
-                    table, col, op, val_str = comp_match.groups()
-                else:
-                    comp_match = re.match(r'"?([\w\s]+)"?\s*([<>=!]+)\s*(.*)', cond_str, re.IGNORECASE)
-                    if comp_match:
-                        col, op, val_str = comp_match.groups()
-                        table = query_parts["join_order"][0]
-                    else:
-                        print(f"Warning: Could not parse HAVING condition: {cond_str}")
-                        continue
-                col = col.strip()
-                val = val_str.strip("'\"")
-                logic = logic_ops[i] if i < len(logic_ops) else None
-                query_parts["having_conditions"].append(("VALUE", table, col, op.strip(), val, logic))
+    having_match = _HAVING_RE.search(query_string)
+    if having_match and having_match.group(1).strip():
+        # Aggregate aliases (HAVING AvgQ > 10) stay unqualified
+        agg_aliases = {alias for _, _, _, alias in query_parts["select_aggs"] if alias}
+        having = to_cnf(_qualify(parse_expression(having_match.group(1)), default_table, agg_aliases))
+        query_parts["having"] = having
+        query_parts["having_conditions"] = expression_to_conditions(having, having=True) or []
 
     # Parse ORDER BY
-    ob_match = re.search(r'ORDER BY\s+(.*?)(LIMIT|OFFSET|$)', query_string, re.IGNORECASE)
+    ob_match = _ORDER_BY_RE.search(query_string)
     if ob_match:
         ob_str = ob_match.group(1).strip()
         ob_items = [o.strip() for o in ob_str.split(',')]
@@ -196,14 +396,68 @@ def parse_query_from_string(query_string: str) -> dict:
             query_parts["order_by"].append((table, col, direction.upper() == "ASC"))
 
     # Parse LIMIT
-    limit_match = re.search(r'LIMIT\s+(\d+)', query_string, re.IGNORECASE)
+    limit_match = _LIMIT_RE.search(query_string)
     if limit_match:
         query_parts["limit"] = int(limit_match.group(1))
 
     # Parse OFFSET
-    offset_match = re.search(r'OFFSET\s+(\d+)', query_string, re.IGNORECASE)
+    offset_match = _OFFSET_RE.search(query_string)
     if offset_match:
         query_parts["offset"] = int(offset_match.group(1))
 
-    print(f"Debug: Parsed query parts: {query_parts}")
-    return query_parts
\ No newline at end of file
+    if query_parts["aliases"]:
+        _resolve_aliases(query_parts)
+    return query_parts
+
+
+def _statement_name(comment: str) -> str:
+    # "-- Query 1: Join patients ..." -> "query_1"; "-- q001 shape=star" -> "q001"
+    words = [w for w in comment.split(":", 1)[0].split() if "=" not in w]
+    return re.sub(r"\W+", "_", " ".join(words)).strip("_").lower()
+
+
+def split_sql_statements(text: str) -> list:
+    """
+    Splits a script of ;-terminated statements into (name, statement) pairs.
+    A statement is named after the -- comment just before it (see
+    _statement_name), or q<n> without one; names are made unique. Semicolons
+    and -- inside quoted strings are kept.
+    """
+    statements = []
+    current, comment = [], None
+    i, n = 0, len(text)
+    quote = None
+    while i < n:
+        ch = text[i]
+        if quote:
+            current.append(ch)
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+            current.append(ch)
+        elif text.startswith("--", i):
+            end = text.find("\n", i)
+            end = n if end == -1 else end
+            if not "".join(current).strip():
+                comment = text[i + 2:end].strip()
+            i = end
+            continue
+        elif ch == ";":
+            statements.append((comment, "".join(current).strip()))
+            current, comment = [], None
+        else:
+            current.append(ch)
+        i += 1
+    if "".join(current).strip():
+        statements.append((comment, "".join(current).strip()))
+
+    named, seen = [], set()
+    for i, (comment, sql) in enumerate(s for s in statements if s[1]):
+        base = (comment and _statement_name(comment)) or f"q{i + 1}"
+        name, k = base, 2
+        while name in seen:
+            name, k = f"{base}_{k}", k + 1
+        seen.add(name)
+        named.append((name, sql))
+    return named
@@ -0,0 +1,108 @@
+def format_bytes(n) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def parse_bytes(text) -> int:
+    """Parses a size such as "512MB", "2 GB" or "1048576" (bytes) into bytes."""
+    text = str(text).strip().upper().replace(" ", "")
+    for unit, factor in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(float(text))
+
+
+class PlanNode:
+    """
+    A single operator in a SimpleCQ execution plan.
+
+    Planning fills in `estimated_rows`, and SimpleCQ.estimate_memory adds
+    `estimated_bytes` (estimated size of the node's output); executing the plan with analyze=True
+    additionally records `actual_rows`, `input_rows` (rows read from the
+    children, or from the table for scans), `elapsed_ns` (time spent in this
+    operator, excluding its inputs) and `bytes_allocated` (peak traced
+    allocation).
+    """
+    def __init__(self, op: str, detail: str = "", children=None, **params):
+        self.op = op
+        self.detail = detail
+        self.children = children or []
+        self.params = params
+        self.estimated_rows = None
+        self.estimated_bytes = None
+        self.actual_rows = None
+        self.input_rows = None
+        self.elapsed_ns = None
+        self.bytes_allocated = None
+
+    def walk(self):
+        """Yields the nodes of the tree in pre-order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def clear_actuals(self):
+        """Resets the recorded actuals of the whole tree before a new analyzed run."""
+        for node in self.walk():
+            node.actual_rows = node.input_rows = node.elapsed_ns = node.bytes_allocated = None
+
+    def add_actuals(self, rows: int, elapsed_ns: int, input_rows=None, bytes_allocated=None):
+        """Records one run of this operator; runs over several chunks add up (peak memory is kept)."""
+        self.actual_rows = (self.actual_rows or 0) + rows
+        self.elapsed_ns = (self.elapsed_ns or 0) + elapsed_ns
+        if input_rows is not None:
+            self.input_rows = (self.input_rows or 0) + input_rows
+        if bytes_allocated is not None:
+            self.bytes_allocated = max(self.bytes_allocated or 0, bytes_allocated)
+
+    def signature(self):
+        """
+        Hashable key identifying the computation of this subtree: two nodes with
+        equal signatures produce the same result.
+        """
+        return (self.op, repr(sorted(self.params.items())), tuple(child.signature() for child in self.children))
+
+    def to_dict(self) -> dict:
+        return {
+            "op": self.op,
+            "detail": self.detail,
+            "estimated_rows": self.estimated_rows,
+            "estimated_bytes": self.estimated_bytes,
+            "actual_rows": self.actual_rows,
+            "input_rows": self.input_rows,
+            "elapsed_ns": self.elapsed_ns,
+            "bytes_allocated": self.bytes_allocated,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def describe(self) -> str:
+        line = f"{self.op} {self.detail}".strip()
+        est = "?" if self.estimated_rows is None else f"{self.estimated_rows:.0f}"
+        line += f"  (est_rows={est}"
+        if self.estimated_bytes is not None:
+            line += f" est_mem={format_bytes(self.estimated_bytes)}"
+        if self.actual_rows is not None:
+            line += f" actual_rows={self.actual_rows}"
+        if self.elapsed_ns is not None:
+            line += f" time={self.elapsed_ns / 1e6:.3f}ms"
+        if self.bytes_allocated is not None:
+            line += f" alloc={format_bytes(self.bytes_allocated)}"
+        return line + ")"
+
+    def format(self, depth: int = 0) -> str:
+        """Renders the tree as indented EXPLAIN text."""
+        prefix = "" if depth == 0 else "  " * (depth - 1) + "-> "
+        lines = [prefix + self.describe()]
+        for child in self.children:
+            lines.append(child.format(depth + 1))
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return f"PlanNode({self.op!r}, {self.detail!r}, children={len(self.children)})"
@@ -0,0 +1,215 @@
+"""
+Tables in shared memory, for worker processes that would otherwise each
+unpickle their own copy.
+
+share_tables() writes the column buffers of a dict of DataFrames once, into
+files under /dev/shm (memory-backed on Linux) or another directory, and
+returns a SharedTables dict of frames mapping those files. A SharedTables
+pickles as its directory path alone: unpickling it in another process maps
+the same buffers, so N workers hold about one copy of the data between them
+and attach in milliseconds.
+
+NumPy columns and Arrow-backed columns (pandas' default strings) are mapped
+without copying. Object columns are dictionary encoded: their codes are
+mapped and each process decodes them against the pickled distinct values.
+Categorical codes are mapped as they are; any other column is pickled.
+
+The process that called share_tables() owns the files and removes them once
+its SharedTables is closed or garbage collected, or when it exits. Frames
+already mapped by any process stay valid after that.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.pkl"
+# Column buffers start at multiples of this many bytes (Arrow's alignment).
+BUFFER_ALIGNMENT = 64
+SHARED_MEMORY_DIR = "/dev/shm"
+
+# SharedTables mapped in this process, by directory
+_attached = weakref.WeakValueDictionary()
+
+
+def default_directory():
+    """/dev/shm where it is writable, else None (the system temporary directory)."""
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return None
+
+
+def _remove(path: str, owner_pid: int):
+    # Forked children inherit the owner's SharedTables; only the owner removes the files
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class SharedTables(dict):
+    """
+    Table name -> DataFrame whose columns map the buffers written to `path`
+    by share_tables(). Pickles as `path`; see attach_tables().
+    """
+    def __init__(self, path: str, tables: dict, owner: bool = False):
+        super().__init__(tables)
+        self.path = path
+        self._finalizer = weakref.finalize(self, _remove, path, os.getpid()) if owner else None
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared files."""
+        return sum(entry.stat().st_size for entry in os.scandir(self.path))
+
+    def close(self):
+        """Removes the shared files now if this process owns them."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __reduce__(self):
+        return attach_tables, (self.path,)
+
+
+class _BufferFile:
+    """Appends aligned buffers to one file, returning their (offset, nbytes)."""
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+
+    def write(self, data) -> tuple:
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+        view = memoryview(data).cast("B")
+        padding = -self.offset % BUFFER_ALIGNMENT
+        self.f.write(b"\0" * padding)
+        self.f.write(view)
+        start = self.offset + padding
+        self.offset = start + view.nbytes
+        return start, view.nbytes
+
+
+def _arrow_array(values):
+    """The Arrow array of an Arrow-backed column without nested fields, else None."""
+    if not isinstance(values, pd.arrays.ArrowExtensionArray):
+        return None
+    import pyarrow as pa
+    array = values.__arrow_array__()
+    array = array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+    if array.type.num_fields or pa.types.is_dictionary(array.type):
+        return None
+    return array
+
+
+def _write_column(out: _BufferFile, series: pd.Series) -> tuple:
+    dtype, values = series.dtype, series.array
+    if isinstance(dtype, np.dtype) and dtype != object:
+        return "numpy", dtype, out.write(series.to_numpy())
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "categorical", dtype, values.codes.dtype, out.write(values.codes)
+    array = _arrow_array(values)
+    if array is not None:
+        buffers = [None if b is None else out.write(b) for b in array.buffers()]
+        return "arrow", dtype, array.type, len(array), array.null_count, array.offset, buffers
+    if dtype == object:
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:  # unhashable values
+            return "pickle", dtype, values
+        uniques = np.asarray(uniques, dtype=object)
+        nulls = codes < 0
+        if nulls.any():
+            # Nulls decode to the column's first null (None or NaN) as the last value
+            uniques = np.append(uniques, np.array([series[nulls].iloc[0]], dtype=object))
+            codes[nulls] = len(uniques) - 1
+        codes = codes.astype(np.int32 if len(uniques) < 2 ** 31 else np.int64)
+        return "dictionary", dtype, uniques, codes.dtype, out.write(codes)
+    return "pickle", dtype, values
+
+
+def _read_column(buffer, spec):
+    kind, dtype = spec[:2]
+
+    def array(item_dtype, location):
+        offset, nbytes = location
+        return np.frombuffer(buffer, dtype=item_dtype, count=nbytes // item_dtype.itemsize, offset=offset)
+
+    if kind == "numpy":
+        return array(dtype, spec[2])
+    if kind == "categorical":
+        return pd.Categorical.from_codes(array(spec[2], spec[3]), dtype=dtype)
+    if kind == "arrow":
+        import pyarrow as pa
+        arrow_type, length, null_count, offset, locations = spec[2:]
+        buffers = [None if loc is None else pa.py_buffer(buffer[loc[0]:loc[0] + loc[1]]) for loc in locations]
+        return dtype.__from_arrow__(pa.Array.from_buffers(arrow_type, length, buffers, null_count, offset))
+    if kind == "dictionary":
+        uniques, code_dtype, location = spec[2:]
+        return uniques.take(array(code_dtype, location))
+    return spec[2]
+
+
+def _write_table(path: str, df: pd.DataFrame) -> dict:
+    with open(path, "wb") as f:
+        out = _BufferFile(f)
+        specs = [_write_column(out, df.iloc[:, i]) for i in range(df.shape[1])]
+    return {"columns": df.columns, "index": df.index, "specs": specs}
+
+
+def _read_table(path: str, entry: dict) -> pd.DataFrame:
+    if os.path.getsize(path):
+        buffer = memoryview(np.memmap(path, dtype=np.uint8, mode="r"))
+    else:
+        buffer = memoryview(b"")  # mmap cannot map an empty file
+    columns = {i: _read_column(buffer, spec) for i, spec in enumerate(entry["specs"])}
+    df = pd.DataFrame(columns, index=entry["index"], copy=False)
+    df.columns = entry["columns"]
+    return df
+
+
+def _read_manifest(path: str, manifest: dict) -> dict:
+    return {name: _read_table(os.path.join(path, entry["file"]), entry) for name, entry in manifest.items()}
+
+
+def share_tables(tables: dict, directory: str = None) -> SharedTables:
+    """
+    Writes `tables` (name -> DataFrame) to a new directory under `directory`
+    (default_directory() if None) and returns them as a SharedTables owned by
+    this process, mapping the written files. The original frames can then be
+    dropped: together with any number of attached workers, about one copy of
+    the data is held.
+    """
+    if isinstance(tables, SharedTables):
+        return tables
+    path = tempfile.mkdtemp(prefix="cqc_tables_", dir=directory or default_directory())
+    try:
+        manifest = {}
+        for i, (name, df) in enumerate(tables.items()):
+            manifest[name] = dict(_write_table(os.path.join(path, f"{i}.bin"), df), file=f"{i}.bin")
+        # Written last: a directory without it is incomplete
+        with open(os.path.join(path, MANIFEST), "wb") as f:
+            pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        shared = SharedTables(path, _read_manifest(path, manifest), owner=True)
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    _attached[path] = shared
+    return shared
+
+
+def attach_tables(path: str) -> SharedTables:
+    """
+    Maps the tables shared at `path` by share_tables(), without copying
+    them; a process attaches to a directory once and reuses the result.
+    """
+    shared = _attached.get(path)
+    if shared is None:
+        try:
+            with open(os.path.join(path, MANIFEST), "rb") as f:
+                manifest = pickle.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No shared tables at {path} (removed by their owner?)") from None
+        shared = SharedTables(path, _read_manifest(path, manifest))
+        _attached[path] = shared
+    return shared
@@ -1,12 +1,222 @@
+import os
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
+from core_engine.expressions import (
+    And, ColumnRef, Comparison, Not, column_name, conditions_to_expression, conjuncts,
+    evaluate, referenced_columns, referenced_tables, to_cnf, to_sql,
+)
+from core_engine.plan import PlanNode, format_bytes
+from core_engine.shared_tables import SharedTables, share_tables
+from core_engine.statistics import TableStats, join_selectivity
+from core_engine.tracing import NULL_TRACER
+
+# Keys of a parsed query dict that map directly onto run_query keyword arguments.
+QUERY_KEYS = (
+    "join_order", "join_conditions", "compare_conditions", "select_cols", "select_aggs",
+    "distinct", "order_by", "limit", "offset", "group_by", "having_conditions",
+    "where", "having",
+)
+
+
+def query_kwargs(query_parts: dict) -> dict:
+    """Extracts run_query keyword arguments from a parsed query dictionary."""
+    return {key: query_parts.get(key) for key in QUERY_KEYS if key in query_parts}
+
+
+JOIN_OPS = ("HashJoin", "CrossJoin")
+# Operators that make up the scan/filter/join part of a plan.
+JOIN_TREE_OPS = JOIN_OPS + ("Scan", "Filter")
+
+# Optimizations that can be switched off individually (SimpleCQ.optimizations).
+OPTIMIZATIONS = (
+    "predicate_pushdown",    # WHERE conjuncts run at the lowest point their tables are available
+    "predicate_ordering",    # conjuncts of a Filter run most selective first
+    "join_reordering",       # greedy join order, smallest estimated intermediate first
+    "semi_join_reduction",   # the larger join input is cut to keys present in the smaller
+    "projection_pruning",    # scans only keep the columns the query reads
+    "index_scans",           # selective = / IN predicates on a table use a cached hash index
+    "top_k",                 # ORDER BY ... LIMIT partitions on the first key instead of a full sort
+    "spill_joins",           # streamed hash joins over the memory budget spill to disk (GraceHashJoin)
+)
+DEFAULT_OPTIMIZATIONS = frozenset(OPTIMIZATIONS)
+# An index scan is used when its predicate keeps at most this fraction of rows.
+INDEX_SCAN_SELECTIVITY = 0.2
+# Semi-join reduction kicks in when one join input is this many times larger.
+SEMI_JOIN_RATIO = 4
+# Plans made only of these operators are executed chunk by chunk by iter_parsed.
+STREAMING_OPS = ("Scan", "IndexScan", "Filter", "Project", "Limit")
+DEFAULT_CHUNK_ROWS = 100_000
+# Cross joins are built in pieces of about this many output rows, checking
+# for cancellation in between.
+CROSS_JOIN_CHUNK_ROWS = 1_000_000
+# Estimated bytes per row of a DataFrame index (filters and joins leave an int64 index).
+INDEX_BYTES_PER_ROW = 8
+# Hash joins count their exact output size before merging unless this many
+# times their estimated output still fits in the remaining memory budget.
+EXACT_JOIN_SIZE_MARGIN = 10
+# Share of physical memory used by default_memory_budget().
+DEFAULT_MEMORY_FRACTION = 0.5
+
+
+class QueryCancelled(Exception):
+    """Raised at an execution checkpoint once a query is cancelled or past its deadline."""
+
+
+class MemoryBudgetExceeded(Exception):
+    """
+    Raised when a query would hold more intermediate results than the engine's
+    memory_budget: before execution from the plan's estimate, or while running
+    once an operator's actual input and output sizes are known.
+    """
+    def __init__(self, message: str, required: int, budget: int):
+        super().__init__(message)
+        self.required = required
+        self.budget = budget
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Shallow in-memory size of a DataFrame, index included (see TableStats.column_bytes)."""
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+def default_memory_budget():
+    """
+    DEFAULT_MEMORY_FRACTION of the machine's physical memory in bytes, or
+    None where it cannot be determined.
+    """
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * DEFAULT_MEMORY_FRACTION)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _where_conjuncts(where=None, compare_conditions=None) -> list:
+    """WHERE clause of a query as a list of CNF conjuncts."""
+    if where is None and compare_conditions:
+        where = conditions_to_expression(compare_conditions)
+    return conjuncts(to_cnf(where)) if where is not None else []
+
+
+def _join_tree_parent(plan: PlanNode):
+    """Returns (parent, node) for the topmost scan/filter/join node of a plan."""
+    parent, node = None, plan
+    while node.op not in JOIN_TREE_OPS:
+        parent, node = node, node.children[0]
+    return parent, node
+
+
+def _join_tree(plan: PlanNode) -> PlanNode:
+    return _join_tree_parent(plan)[1]
+
+
+def _join_skeleton(node: PlanNode):
+    """Signature of a join tree with all filters removed."""
+    if node.op == "Filter":
+        return _join_skeleton(node.children[0])
+    return (node.op, node.detail, tuple(_join_skeleton(child) for child in node.children))
+
+
+def _tree_predicates(node: PlanNode) -> list:
+    return [p for n in node.walk() if n.op == "Filter" for p in n.params["predicates"]]
+
 
 class SimpleCQ:
     """
     Advanced engine for acyclic conjunctive queries with comparisons, aggregates,
     grouping, ordering, limit/offset, and distinct.
+
+    Queries are first planned into a tree of PlanNode operators (scans, joins,
+    filters, aggregation, sort, limit) and then executed bottom-up. An optional
+    Tracer (see core_engine.tracing) is notified around every operator.
+
+    `optimizations` is the set of OPTIMIZATIONS to apply (DEFAULT_OPTIMIZATIONS
+    when omitted); it can be changed between queries to compare plans.
+
+    Execution checks for cancellation between operators and between the
+    chunks of chunked loops: once `cancel_event` (anything with is_set(),
+    e.g. a threading or multiprocessing Event) is set, or time.monotonic()
+    passes `deadline`, the running query raises QueryCancelled.
+
+    With `profile` set, run_query and iter_parsed execute like EXPLAIN
+    ANALYZE and keep the annotated plan of the last query in `last_plan`;
+    allocations are only traced when `profile_memory` is also set.
+
+    `memory_budget` (bytes, None for no limit) caps the intermediate results
+    a query holds at once; resident tables are not counted. Plans whose
+    estimated peak (see estimate_memory) is over budget are refused before
+    execution unless `refuse_over_budget` is cleared, e.g. once a user has
+    confirmed them. While running, operator outputs are accounted as they
+    are produced, and joins check their exact output size before building
+    it; either way the query stops with MemoryBudgetExceeded instead of
+    exhausting memory. In iter_parsed, a hash join under only filters,
+    projections and LIMIT whose output would not fit is instead run as a
+    Grace hash join (see core_engine.spill) spilling to `spill_dir` (the
+    system temporary directory if None), its output streamed on in pieces.
     """
-    def __init__(self, tables: dict):
+    def __init__(self, tables: dict, tracer=None, optimizations=None):
         self.tables = tables
+        self.tracer = tracer or NULL_TRACER
+        self.optimizations = DEFAULT_OPTIMIZATIONS if optimizations is None else optimizations
+        self.cancel_event = None
+        self.deadline = None
+        self.profile = False
+        self.profile_memory = False
+        self.last_plan = None
+        self.memory_budget = None
+        self.refuse_over_budget = True
+        self.spill_dir = None
+        self._held_bytes = 0
+        self._stats = {}
+        self._indexes = {}
+
+    @property
+    def optimizations(self) -> frozenset:
+        return self._optimizations
+
+    @optimizations.setter
+    def optimizations(self, enabled):
+        enabled = frozenset(enabled)
+        unknown = enabled - set(OPTIMIZATIONS)
+        if unknown:
+            raise ValueError(f"Unknown optimization(s): {', '.join(sorted(unknown))}")
+        self._optimizations = enabled
+
+    def session(self, tracer=None) -> "SimpleCQ":
+        """
+        Engine over the same tables that shares this engine's statistics and
+        index caches but has its own tracer, cancellation, deadline and
+        profiling settings: one per concurrent query when serving many clients.
+        The memory budget and spill directory are inherited.
+        """
+        engine = SimpleCQ(self.tables, tracer=tracer, optimizations=self.optimizations)
+        engine.memory_budget = self.memory_budget
+        engine.refuse_over_budget = self.refuse_over_budget
+        engine.spill_dir = self.spill_dir
+        engine._stats = self._stats
+        engine._indexes = self._indexes
+        return engine
+
+    def share_tables(self, directory: str = None) -> SharedTables:
+        """
+        Moves the tables to shared memory (see core_engine.shared_tables), so
+        that worker processes unpickling this engine map them instead of
+        receiving a copy. Sessions created before keep the private tables.
+        """
+        if not isinstance(self.tables, SharedTables):
+            self.tables = share_tables(self.tables, directory)
+            self._stats.clear()  # statistics hold on to the private tables
+        return self.tables
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if isinstance(self.tables, SharedTables):
+            # Statistics and indexes would copy table data; workers rebuild them as needed
+            state["_stats"], state["_indexes"] = {}, {}
+        return state
 
     @staticmethod
     def prepare_tables(raw_tables: dict):
@@ -16,10 +226,79 @@ class SimpleCQ:
             df = df.copy()
             df.columns = new_columns
             tables[tname] = df
-            print(f"Debug: Table {tname} columns: {df.columns.tolist()}")
         return tables
 
-    def run_query(
+    def table_stats(self, table: str) -> TableStats:
+        if table not in self._stats:
+            self._stats[table] = TableStats(self.tables[table])
+        return self._stats[table]
+
+    def join_selectivity(self, t1: str, key1: str, t2: str, key2: str) -> float:
+        """Skew-aware selectivity of t1.key1 = t2.key2 over the cross product (keys are prefixed column names)."""
+        left = self.table_stats(t1).column(key1) if t1 in self.tables else None
+        right = self.table_stats(t2).column(key2) if t2 in self.tables else None
+        return join_selectivity(left, right)
+
+    def heavy_keys(self, t1: str, key1: str, t2: str, key2: str) -> int:
+        """Number of join key values that are skewed (see ColumnStats.skewed_values) on either side."""
+        keys = set()
+        for table, key in ((t1, key1), (t2, key2)):
+            stats = self.table_stats(table).column(key) if table in self.tables else None
+            keys |= stats.skewed_values() if stats else set()
+        return len(keys)
+
+    def expression_selectivity(self, expr) -> float:
+        """Estimates the fraction of rows satisfying an expression tree."""
+        if isinstance(expr, And):
+            sel = 1.0
+            for child in expr.children:
+                sel *= self.expression_selectivity(child)
+            return sel
+        if isinstance(expr, Not):
+            return 1.0 - self.expression_selectivity(expr.child)
+        if not isinstance(expr, Comparison):
+            miss = 1.0
+            for child in expr.children:
+                miss *= 1.0 - self.expression_selectivity(child)
+            return 1.0 - miss
+        if expr.table not in self.tables:
+            return 1.0
+        stats = self.table_stats(expr.table)
+        col = column_name(expr.table, expr.column)
+        if isinstance(expr.value, ColumnRef):
+            if expr.op not in ("=", "=="):
+                return 1 / 3
+            other = expr.value
+            if other.table == expr.table:
+                other_ndv = stats.ndv(column_name(other.table, other.column))
+                return 1.0 / max(stats.ndv(col), other_ndv)
+            return self.join_selectivity(expr.table, col, other.table, column_name(other.table, other.column))
+        return stats.selectivity(col, expr.op, expr.value)
+
+    def _filter_node(self, child: PlanNode, predicates: list) -> PlanNode:
+        """Wraps child in a Filter whose conjuncts run most selective first."""
+        scored = [(self.expression_selectivity(p), to_sql(p), p) for p in predicates]
+        if "predicate_ordering" in self.optimizations:
+            # Ties are broken by SQL text so equal predicate sets always get the same order
+            scored.sort()
+        ordered = [p for _, _, p in scored]
+        node = PlanNode("Filter", " AND ".join(to_sql(p) for p in ordered), [child], predicates=ordered)
+        sel = 1.0
+        for score, _, _ in scored:
+            sel *= score
+        node.estimated_rows = child.estimated_rows * sel
+        return node
+
+    def _push_filters(self, node: PlanNode, pending: list, available: set) -> PlanNode:
+        """Applies every pending conjunct whose tables are all in `available`."""
+        ready = [p for p in pending if referenced_tables(p) <= available]
+        if not ready:
+            return node
+        for p in ready:
+            pending.remove(p)
+        return self._filter_node(node, ready)
+
+    def plan_query(
         self,
         join_order,
         join_conditions,
@@ -31,167 +310,893 @@ class SimpleCQ:
         limit=None,
         offset=None,
         group_by=None,
-        having_conditions=None
-    ):
-        # 1. JOIN tables
-        df = self.tables[join_order[0]].copy()
-        for i in range(1, len(join_order)):
-            left = join_order[i - 1]
-            right = join_order[i]
-            cond = [c for c in join_conditions if (c[0], c[2]) == (left, right) or (c[2], c[0]) == (left, right)]
+        having_conditions=None,
+        where=None,
+        having=None
+    ) -> PlanNode:
+        """
+        Builds the operator tree for a query, annotated with row estimates
+        derived from table statistics. Takes the same arguments as run_query.
+
+        The WHERE tree is split into conjuncts and each one is pushed down to the
+        lowest point where all the tables it references are available (usually
+        straight onto a scan), ordered by estimated selectivity. Which of the
+        OPTIMIZATIONS are applied is controlled by self.optimizations.
+        """
+        return self._physical_plan(self._logical_plan(
+            join_order, join_conditions, compare_conditions,
+            select_cols=select_cols, select_aggs=select_aggs, distinct=distinct,
+            order_by=order_by, limit=limit, offset=offset,
+            group_by=group_by, having_conditions=having_conditions,
+            where=where, having=having,
+        ))
+
+    def _logical_plan(
+        self,
+        join_order,
+        join_conditions,
+        compare_conditions,
+        select_cols=None,
+        select_aggs=None,
+        distinct=False,
+        order_by=None,
+        limit=None,
+        offset=None,
+        group_by=None,
+        having_conditions=None,
+        where=None,
+        having=None,
+        shared_join_order=None
+    ) -> PlanNode:
+        """
+        Operator tree before physical rewrites (see _physical_plan).
+        `shared_join_order` replaces per-query join reordering (see run_batch).
+        """
+        self._check_columns(join_order, select_cols, select_aggs, group_by, order_by)
+        if where is None and compare_conditions:
+            where = conditions_to_expression(compare_conditions)
+        if having is None and having_conditions:
+            having = conditions_to_expression(having_conditions, having=True)
+        pending = _where_conjuncts(where)
+        opts = self.optimizations
+        deferred = []
+        if "predicate_pushdown" not in opts:
+            deferred, pending = pending, []
+        projected = bool(select_cols or select_aggs)
+        if shared_join_order is not None:
+            join_order = shared_join_order
+        elif "join_reordering" in opts and projected and len(join_order) > 1:
+            # Only for projected queries, so SELECT * keeps its column order
+            join_order = self._reorder_joins(join_order, join_conditions, pending)
+        scan_columns = {}
+        if "projection_pruning" in opts and projected:
+            scan_columns = self._needed_columns(join_order, join_conditions, select_cols, select_aggs,
+                                                group_by, order_by, where, having)
+
+        # 1. Scans and joins, with WHERE conjuncts pushed down. Each table is
+        # hash joined on its first condition with any table joined before it;
+        # further conditions (star and cyclic join graphs) become filters.
+        joined = {join_order[0]}
+        node = self._push_filters(self._scan_node(join_order[0], scan_columns.get(join_order[0])), pending, joined)
+        for right in join_order[1:]:
+            scan = self._push_filters(self._scan_node(right, scan_columns.get(right)), pending, {right})
+            cond = [c for c in join_conditions
+                    if (c[2] == right and c[0] in joined) or (c[0] == right and c[2] in joined)]
             if cond:
-                c = cond[0]
-                c1_sanitized = c[1].replace(' ', '_')
-                c3_sanitized = c[3].replace(' ', '_')
-                left_key = f"{left}_{c1_sanitized}" if c[0] == left else f"{left}_{c3_sanitized}"
-                right_key = f"{right}_{c3_sanitized}" if c[0] == left else f"{right}_{c1_sanitized}"
-                print(f"Debug: Merging {left} on {left_key} with {right} on {right_key}")
-                df = df.merge(self.tables[right], left_on=left_key, right_on=right_key)
+                t1, c1, t2, c2 = cond[0]
+                left, left_col, right_col = (t1, c1, c2) if t2 == right else (t2, c2, c1)
+                left_key = column_name(left, left_col)
+                right_key = column_name(right, right_col)
+                heavy = self.heavy_keys(left, left_key, right, right_key)
+                detail = f"{left_key} = {right_key}" + (f" ({heavy} heavy keys)" if heavy else "")
+                join = PlanNode("HashJoin", detail, [node, scan],
+                                left_key=left_key, right_key=right_key,
+                                semi_join="semi_join_reduction" in opts)
+                join.estimated_rows = node.estimated_rows * scan.estimated_rows \
+                    * self.join_selectivity(left, left_key, right, right_key)
+                pending.extend(Comparison(t1, c1, "=", ColumnRef(t2, c2)) for t1, c1, t2, c2 in cond[1:])
             else:
-                df = df.merge(self.tables[right], how='cross')
-
-        # 2. WHERE filtering
-        if compare_conditions:
-            mask = None
-            for comp in compare_conditions:
-                if len(comp) == 5:
-                    t1, col1, op, val, logic = comp
-                    col1_sanitized = col1.replace(' ', '_')
-                    left_col = f"{t1}_{col1_sanitized}" if t1 else col1_sanitized
-                    if left_col not in df.columns:
-                        raise ValueError(f"Column {left_col} not found in DataFrame. Available columns: {df.columns.tolist()}")
-                    # Build condition mask
-                    if op == "=": op = "=="
-                    if op == "IS NULL":
-                        cond_mask = df[left_col].isnull()
-                    elif op == "LIKE":
-                        pattern = str(val).replace('%', '.*')
-                        cond_mask = df[left_col].astype(str).str.contains(pattern, case=False, na=False, regex=True)
-                    elif op in ["IN", "NOT IN"]:
-                        if not isinstance(val, (list, tuple, set)):
-                            val = [val]
-                        if op == "IN":
-                            cond_mask = df[left_col].isin(val)
-                        else:
-                            cond_mask = ~df[left_col].isin(val)
-                    else:
-                        if op == '<': cond_mask = df[left_col] < val
-                        elif op == '<=': cond_mask = df[left_col] <= val
-                        elif op == '>': cond_mask = df[left_col] > val
-                        elif op == '>=': cond_mask = df[left_col] >= val
-                        elif op == '==': cond_mask = df[left_col] == val
-                        elif op == '!=': cond_mask = df[left_col] != val
-                        else:
-                            raise ValueError(f"Unsupported operator: {op}")
-                    if mask is None:
-                        mask = cond_mask
-                    else:
-                        if logic == "AND" or logic is None:
-                            mask = mask & cond_mask
-                        elif logic == "OR":
-                            mask = mask | cond_mask
-                        else:
-                            raise ValueError(f"Unsupported logic operator: {logic}")
-                else:
-                    raise ValueError("Invalid compare_conditions tuple length. Expected 5 elements.")
-            df = df[mask] if mask is not None else df
+                join = PlanNode("CrossJoin", "", [node, scan])
+                join.estimated_rows = node.estimated_rows * scan.estimated_rows
+            joined.add(right)
+            node = self._push_filters(join, pending, set(joined))
 
-        # 3. GROUP BY and AGGREGATE
-        if group_by and (select_aggs or having_conditions):
-            # Build groupby columns
-            gb_cols = []
+        # 2. Remaining WHERE conjuncts (e.g. unqualified columns), or all of
+        # them when pushdown is off
+        if pending or deferred:
+            node = self._filter_node(node, deferred + pending)
+
+        # 3. GROUP BY and AGGREGATE, or projection
+        if group_by and (select_aggs or having is not None):
+            gb_cols = [column_name(t, c) for t, c in group_by]
+            groups = 1
             for t, c in group_by:
-                gb_col = f"{t}_{c.replace(' ', '_')}" if t else c.replace(' ', '_')
-                gb_cols.append(gb_col)
-            grouped = df.groupby(gb_cols, dropna=False)
-            agg_dict = {}
-            agg_names = []
-            for func, t, c, alias in select_aggs or []:
-                if c == "*":
-                    agg_col = None
-                else:
-                    agg_col = f"{t}_{c.replace(' ', '_')}" if t else c.replace(' ', '_')
-                key = alias or f"{func}_{agg_col or 'all'}"
-                agg_names.append(key)
-                if func == "COUNT":
-                    agg_dict[key] = (agg_col, 'count') if agg_col else ('count')
-                elif func == "SUM":
-                    agg_dict[key] = (agg_col, 'sum')
-                elif func == "AVG":
-                    agg_dict[key] = (agg_col, 'mean')
-                elif func == "MIN":
-                    agg_dict[key] = (agg_col, 'min')
-                elif func == "MAX":
-                    agg_dict[key] = (agg_col, 'max')
-            # pandas groupby agg
-            result_df = grouped.agg(**agg_dict).reset_index()
-            # HAVING
-            if having_conditions:
-                mask = None
-                for cond in having_conditions:
-                    func, t, c, op, val, logic = cond
-                    if func == "VALUE":
-                        col_name = f"{t}_{c.replace(' ', '_')}" if t else c.replace(' ', '_')
-                    else:
-                        col_name = None
-                        for f, t2, c2, alias in select_aggs or []:
-                            if f == func and ((t2 == t and c2 == c) or (c == "*" and c2 == "*")):
-                                col_name = alias or f"{func}_{f'{t2}_{c2}' if t2 and c2 else 'all'}"
-                                break
-                        if not col_name:
-                            col_name = f"{func}_{t}_{c}"
-                    # Build mask
-                    if op == "=": op = "=="
-                    cond_mask = None
-                    if op == '<': cond_mask = result_df[col_name] < float(val)
-                    elif op == '<=': cond_mask = result_df[col_name] <= float(val)
-                    elif op == '>': cond_mask = result_df[col_name] > float(val)
-                    elif op == '>=': cond_mask = result_df[col_name] >= float(val)
-                    elif op == '==': cond_mask = result_df[col_name] == float(val)
-                    elif op == '!=': cond_mask = result_df[col_name] != float(val)
-                    else:
-                        raise ValueError(f"Unsupported HAVING operator: {op}")
-                    if mask is None:
-                        mask = cond_mask
-                    else:
-                        if logic == "AND" or logic is None:
-                            mask = mask & cond_mask
-                        elif logic == "OR":
-                            mask = mask | cond_mask
-                        else:
-                            raise ValueError(f"Unsupported HAVING logic: {logic}")
-                result_df = result_df[mask] if mask is not None else result_df
-        else:
-            result_df = df.copy()
-            # Select columns (if not using aggregates)
-            if select_cols:
-                final_cols = []
-                for t, col, alias in select_cols:
-                    sanitized_col = f"{t}_{col.replace(' ', '_')}" if t else col.replace(' ', '_')
-                    if sanitized_col in result_df.columns:
-                        final_cols.append(sanitized_col)
-                if final_cols:
-                    result_df = result_df[final_cols]
+                groups *= self.table_stats(t).ndv(column_name(t, c)) if t in self.tables else 1
+            node = PlanNode("Aggregate", f"group by {', '.join(gb_cols)}", [node],
+                            group_cols=gb_cols, select_aggs=select_aggs or [])
+            node.estimated_rows = min(node.children[0].estimated_rows, groups)
+            if having is not None:
+                node = PlanNode("Having", to_sql(having), [node], predicate=having, select_aggs=select_aggs or [])
+                node.estimated_rows = node.children[0].estimated_rows / 3
+        elif select_cols:
+            cols = [column_name(t, col) for t, col, alias in select_cols]
+            node = PlanNode("Project", ", ".join(cols), [node], columns=cols)
+            node.estimated_rows = node.children[0].estimated_rows
+
         # 4. DISTINCT
         if distinct:
-            result_df = result_df.drop_duplicates()
+            node = PlanNode("Distinct", "", [node])
+            node.estimated_rows = node.children[0].estimated_rows
 
         # 5. ORDER BY
-        if order_by and result_df is not None and not result_df.empty:
-            ob_cols = []
-            ascending = []
-            for t, col, asc in order_by:
-                ob_col = f"{t}_{col.replace(' ', '_')}" if t else col.replace(' ', '_')
-                if ob_col in result_df.columns:
-                    ob_cols.append(ob_col)
-                    ascending.append(asc)
-            if ob_cols:
-                result_df = result_df.sort_values(by=ob_cols, ascending=ascending)
+        if order_by:
+            detail = ", ".join(f"{column_name(t, c)} {'ASC' if asc else 'DESC'}" for t, c, asc in order_by)
+            node = PlanNode("Sort", detail, [node], order_by=order_by)
+            node.estimated_rows = node.children[0].estimated_rows
 
         # 6. LIMIT/OFFSET
-        if offset is not None and result_df is not None:
-            result_df = result_df[offset:]
-        if limit is not None and result_df is not None:
-            result_df = result_df.head(limit)
+        if limit is not None or offset is not None:
+            node = PlanNode("Limit", f"limit={limit} offset={offset}", [node], limit=limit, offset=offset)
+            rows = max(node.children[0].estimated_rows - (offset or 0), 0)
+            node.estimated_rows = rows if limit is None else min(rows, limit)
+
+        return node
+
+    def _scan_node(self, table: str, columns: list = None) -> PlanNode:
+        node = PlanNode("Scan", table, table=table, columns=columns)
+        node.estimated_rows = self.table_stats(table).row_count
+        return node
+
+    def _reorder_joins(self, join_order: list, join_conditions: list, predicates: list) -> list:
+        """
+        Greedy join order: start from the smallest table after its own filters,
+        then repeatedly join the table giving the smallest estimated result.
+        """
+        sizes = {}
+        for table in join_order:
+            sel = 1.0
+            for p in predicates:
+                if referenced_tables(p) == {table}:
+                    sel *= self.expression_selectivity(p)
+            sizes[table] = self.table_stats(table).row_count * sel
+        order = [min(join_order, key=lambda t: sizes[t])]
+        rows = sizes[order[0]]
+        remaining = [t for t in join_order if t != order[0]]
+        while remaining:
+            best = None
+            for table in remaining:
+                cond = [c for c in join_conditions
+                        if (c[0] == table and c[2] in order) or (c[2] == table and c[0] in order)]
+                if cond:
+                    t1, c1, t2, c2 = cond[0]
+                    estimate = rows * sizes[table] \
+                        * self.join_selectivity(t1, column_name(t1, c1), t2, column_name(t2, c2))
+                else:
+                    estimate = rows * sizes[table]
+                if best is None or estimate < best[0]:
+                    best = (estimate, table)
+            rows, table = best
+            order.append(table)
+            remaining.remove(table)
+        return order
+
+    def _check_columns(self, join_order, select_cols, select_aggs, group_by, order_by):
+        """
+        Raises ValueError for a selected, aggregated, grouped or ordered column
+        that none of the joined tables has, rather than letting projection
+        pruning decide what an unknown column returns.
+        """
+        available = {col for table in join_order if table in self.tables for col in self.tables[table].columns}
+        refs = [(t, c) for t, c, alias in select_cols or []]
+        refs += [(t, c) for func, t, c, alias in select_aggs or [] if c != "*"]
+        refs += list(group_by or [])
+        # Unqualified ORDER BY columns may name aggregate outputs
+        refs += [(t, c) for t, c, asc in order_by or [] if t is not None]
+        unknown = [f"{t}.{c}" if t else c for t, c in refs if column_name(t, c) not in available]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(dict.fromkeys(unknown))}")
+
+    def _needed_columns(self, join_order, join_conditions, select_cols, select_aggs, group_by,
+                        order_by, where, having) -> dict:
+        """Per table, the columns a query reads, in table order."""
+        needed = set()
+        needed.update(column_name(t, c) for t, c, alias in select_cols or [])
+        needed.update(column_name(t, c) for func, t, c, alias in select_aggs or [] if c != "*")
+        needed.update(column_name(t, c) for t, c in group_by or [])
+        needed.update(column_name(t, c) for t, c, asc in order_by or [])
+        for t1, c1, t2, c2 in join_conditions or []:
+            needed.update((column_name(t1, c1), column_name(t2, c2)))
+        for expr in (where, having):
+            if expr is not None:
+                needed |= referenced_columns(expr)
+        columns = {}
+        for table in join_order:
+            all_columns = list(self.tables[table].columns)
+            # Keep one column so row counts survive for COUNT(*) and cross joins
+            columns[table] = [c for c in all_columns if c in needed] or all_columns[:1]
+        return columns
+
+    def _physical_plan(self, node: PlanNode) -> PlanNode:
+        """
+        Rewrites a logical plan bottom-up with physical operators: index scans
+        under selective filters, and top-k for ORDER BY ... LIMIT.
+        """
+        node.children = [self._physical_plan(child) for child in node.children]
+        opts = self.optimizations
+        if node.op == "Filter" and node.children[0].op == "Scan" and "index_scans" in opts:
+            return self._index_scan(node)
+        if node.op == "Limit" and node.params["limit"] is not None and node.children[0].op == "Sort" \
+                and "top_k" in opts:
+            sort = node.children[0]
+            k = node.params["limit"] + (node.params["offset"] or 0)
+            top = PlanNode("TopK", f"{sort.detail} k={k}", sort.children, order_by=sort.params["order_by"], k=k)
+            top.estimated_rows = min(sort.estimated_rows, k)
+            node.children = [top]
+        return node
+
+    def _index_scan(self, node: PlanNode) -> PlanNode:
+        """Replaces Filter(Scan) with an IndexScan on its most selective = / IN conjunct."""
+        scan = node.children[0]
+        table = scan.params["table"]
+        df = self.tables[table]
+        best = None
+        for pred in node.params["predicates"]:
+            if not isinstance(pred, Comparison) or pred.table != table or pred.func \
+                    or isinstance(pred.value, ColumnRef) or pred.op.upper() not in ("=", "==", "IN"):
+                continue
+            col = column_name(table, pred.column)
+            # Date literals only compare equal to datetime columns after coercion
+            if col not in df.columns or pd.api.types.is_datetime64_any_dtype(df[col]):
+                continue
+            sel = self.expression_selectivity(pred)
+            if sel <= INDEX_SCAN_SELECTIVITY and (best is None or sel < best[0]):
+                best = (sel, pred, col)
+        if best is None:
+            return node
+        sel, pred, col = best
+        # A value listed twice must not return its rows twice
+        values = tuple(dict.fromkeys(pred.value)) if pred.op.upper() == "IN" else (pred.value,)
+        index_node = PlanNode("IndexScan", f"{table} using {to_sql(pred)}", table=table, column=col,
+                              values=values, columns=scan.params["columns"])
+        index_node.estimated_rows = scan.estimated_rows * sel
+        rest = [p for p in node.params["predicates"] if p is not pred]
+        if not rest:
+            return index_node
+        filter_node = PlanNode("Filter", " AND ".join(to_sql(p) for p in rest), [index_node], predicates=rest)
+        filter_node.estimated_rows = node.estimated_rows
+        return filter_node
+
+    def column_index(self, table: str, column: str) -> dict:
+        """Hash index of a column (value -> row positions), built on first use."""
+        key = (table, column)
+        if key not in self._indexes:
+            self._indexes[key] = self.tables[table].groupby(column, sort=False).indices
+        return self._indexes[key]
+
+
+    def _column_bytes(self, column: str) -> float:
+        for table, df in self.tables.items():
+            if column in df.columns:
+                return self.table_stats(table).column_bytes(column)
+        return 8.0
+
+    def _row_bytes(self, node: PlanNode, child_widths: list) -> float:
+        """Estimated bytes per row of a node's output, given its children's."""
+        if node.op in ("Scan", "IndexScan"):
+            stats = self.table_stats(node.params["table"])
+            columns = node.params.get("columns") or self.tables[node.params["table"]].columns
+            return sum(stats.column_bytes(col) for col in columns)
+        if node.op == "Project":
+            return sum(self._column_bytes(col) for col in node.params["columns"])
+        if node.op == "Aggregate":
+            return sum(self._column_bytes(col) for col in node.params["group_cols"]) \
+                + 8 * len(node.params["select_aggs"])
+        return sum(child_widths)
+
+    def _estimate_bytes(self, node: PlanNode):
+        """Sets estimated_bytes on a subtree; returns (row width, estimated peak bytes held)."""
+        widths, peak, held = [], 0, 0
+        for child in node.children:
+            width, child_peak = self._estimate_bytes(child)
+            widths.append(width)
+            # Earlier inputs are held while later ones are computed
+            peak = max(peak, held + child_peak)
+            held += child.estimated_bytes
+        width = self._row_bytes(node, widths)
+        if node.op == "Scan" and node.params.get("columns") is None:
+            node.estimated_bytes = 0  # the resident table itself
+        else:
+            node.estimated_bytes = int((node.estimated_rows or 0) * (width + INDEX_BYTES_PER_ROW))
+        return width, max(peak, held + node.estimated_bytes)
+
+    def estimate_memory(self, plan: PlanNode, streaming: bool = False) -> int:
+        """
+        Annotates every node of a plan with `estimated_bytes` (estimated rows
+        times the row width from table statistics) and returns the estimated
+        peak of intermediate results held at once: an operator's inputs plus
+        its output, and earlier join inputs while later ones are built.
+
+        With streaming=True the peak is the one of iter_parsed: for a join
+        that may spill (see _spillable_join) only its inputs must fit.
+        """
+        peak = self._estimate_bytes(plan)[1]
+        join = self._spillable_join(list(plan.walk())) if streaming else None
+        if join is None:
+            return peak
+        peak = held = 0
+        for child in join.children:
+            peak = max(peak, held + self._estimate_bytes(child)[1])
+            held += child.estimated_bytes
+        return peak
+
+    def check_memory(self, plan: PlanNode, budget: int = None, streaming: bool = False) -> int:
+        """
+        Returns the estimated peak memory of a plan (see estimate_memory);
+        raises MemoryBudgetExceeded when it is over `budget` (default:
+        memory_budget).
+        """
+        budget = self.memory_budget if budget is None else budget
+        peak = self.estimate_memory(plan, streaming)
+        if budget is not None and peak > budget:
+            raise MemoryBudgetExceeded(
+                f"Estimated peak memory {format_bytes(peak)} exceeds the memory budget of "
+                f"{format_bytes(budget)}; add join conditions or filters, or raise the budget",
+                peak, budget)
+        return peak
+
+    def _charged_bytes(self, df: pd.DataFrame) -> int:
+        return 0 if any(df is table for table in self.tables.values()) else frame_bytes(df)
+
+    def _reserve(self, node: PlanNode, nbytes: int):
+        """Live accounting: raises MemoryBudgetExceeded if nbytes more would exceed the budget."""
+        if self.memory_budget is not None and self._held_bytes + nbytes > self.memory_budget:
+            raise MemoryBudgetExceeded(
+                f"{node.op} {node.detail}".strip() + f" needs about {format_bytes(nbytes)} with "
+                f"{format_bytes(self._held_bytes)} already held, over the memory budget of "
+                f"{format_bytes(self.memory_budget)}",
+                self._held_bytes + nbytes, self.memory_budget)
+
+    def execute_plan(self, plan: PlanNode, analyze: bool = False, cache: dict = None,
+                     analyze_memory: bool = True) -> pd.DataFrame:
+        """
+        Executes a plan produced by plan_query. With analyze=True every node is
+        annotated with its input and actual row counts, elapsed time and (unless
+        analyze_memory=False) allocated bytes.
+
+        `cache` maps PlanNode signatures to results; nodes whose signature is a
+        key are computed once and reused (see run_batch).
+
+        With a memory_budget, over-budget plans are refused up front (unless
+        refuse_over_budget is cleared) and intermediate results are accounted
+        as they are produced.
+        """
+        if self.memory_budget is not None and self.refuse_over_budget:
+            self.check_memory(plan)
+        self._held_bytes = 0
+        self.tracer.on_plan(plan)
+        if analyze:
+            plan.clear_actuals()
+            analyze = "memory" if analyze_memory else True
+        with self._tracing_memory(analyze):
+            result_df = self._execute(plan, analyze, cache)
+        if any(result_df is df for df in self.tables.values()):
+            result_df = result_df.copy()
+        return result_df
+
+    @contextmanager
+    def _tracing_memory(self, analyze):
+        """Runs tracemalloc while analyzing memory or when the tracer asks for it."""
+        track_memory = analyze == "memory" or (self.tracer.enabled and self.tracer.track_memory)
+        started_tracing = track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    def _execute(self, node: PlanNode, analyze, cache: dict = None) -> pd.DataFrame:
+        sig = node.signature() if cache is not None else None
+        cached = cache.get(sig) if cache is not None else None
+        if cached is not None:
+            self._held_bytes += self._charged_bytes(cached)
+            return cached
+        inputs = [self._execute(child, analyze, cache) for child in node.children]
+        df = self._run_operator(node, inputs, analyze)
+        if self.memory_budget is not None:
+            # Inputs are released once the operator has run; its output is held
+            self._reserve(node, self._charged_bytes(df))
+            self._held_bytes += self._charged_bytes(df) - sum(self._charged_bytes(i) for i in inputs)
+        if cache is not None and sig in cache:
+            cache[sig] = df
+        return df
+
+    def check_cancelled(self):
+        """Execution checkpoint: raises QueryCancelled if the query should stop."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise QueryCancelled("Query cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise QueryCancelled("Query timed out")
+
+    def _run_operator(self, node: PlanNode, inputs: list, analyze) -> pd.DataFrame:
+        """
+        Runs one operator. `analyze` is False, True (record rows and time on
+        the node) or "memory" (also record allocations). Repeated runs of a
+        node, one per chunk in iter_parsed, add up.
+        """
+        self.check_cancelled()
+        operator = getattr(self, f"_op_{node.op.lower()}")
+        tracer = self.tracer
+        if not analyze and not tracer.enabled:
+            return operator(node, *inputs)
+        track_memory = analyze == "memory" or (tracer.enabled and tracer.track_memory)
+        tracer.on_operator_start(node)
+        if track_memory:
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            df = operator(node, *inputs)
+        except QueryCancelled:
+            if analyze:
+                # Keep the time of the interrupted operator so the profile shows where it went
+                node.elapsed_ns = (node.elapsed_ns or 0) + time.perf_counter_ns() - start
+            raise
+        elapsed_ns = time.perf_counter_ns() - start
+        memory_delta = None
+        if track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory_delta = current - mem_before
+        if analyze:
+            if inputs:
+                input_rows = sum(len(i) for i in inputs)
+            else:
+                input_rows = len(self.tables[node.params["table"]]) if node.op == "Scan" else None
+            node.add_actuals(len(df), elapsed_ns, input_rows, peak - mem_before if track_memory else None)
+        tracer.on_operator_end(node, len(df), elapsed_ns, memory_delta)
+        return df
+
+    def _op_scan(self, node):
+        df = self.tables[node.params["table"]]
+        columns = node.params.get("columns")
+        return df if columns is None else df[columns]
+
+    def _op_indexscan(self, node):
+        index = self.column_index(node.params["table"], node.params["column"])
+        parts = [index[v] for v in node.params["values"] if v in index]
+        positions = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+        df = self.tables[node.params["table"]]
+        columns = node.params.get("columns")
+        return df.iloc[positions] if columns is None else df.iloc[positions][columns]
+
+    def _op_hashjoin(self, node, left_df, right_df):
+        left_key, right_key = node.params["left_key"], node.params["right_key"]
+        if node.params.get("semi_join"):
+            # Drop rows of the much larger side that cannot find a partner
+            if len(left_df) * SEMI_JOIN_RATIO < len(right_df):
+                right_df = right_df[right_df[right_key].isin(left_df[left_key])]
+            elif len(right_df) * SEMI_JOIN_RATIO < len(left_df):
+                left_df = left_df[left_df[left_key].isin(right_df[right_key])]
+        if self.memory_budget is not None:
+            nbytes = self._join_output_bytes(node, left_df, right_df)
+            if nbytes is not None:
+                self._reserve(node, nbytes)
+        return left_df.merge(right_df, left_on=left_key, right_on=right_key)
+
+    def _join_output_bytes(self, node, left_df, right_df):
+        """
+        Exact output size of a hash join, counted from its key values, or None
+        when EXACT_JOIN_SIZE_MARGIN times its estimate fits the memory budget.
+        """
+        row_bytes = self._merged_row_bytes(left_df, right_df)
+        estimate = (node.estimated_rows or 0) * EXACT_JOIN_SIZE_MARGIN * row_bytes
+        if self._held_bytes + estimate <= self.memory_budget:
+            return None
+        left_counts = left_df[node.params["left_key"]].value_counts(dropna=False)
+        right_counts = right_df[node.params["right_key"]].value_counts(dropna=False)
+        rows = (right_counts.reindex(left_counts.index, fill_value=0) * left_counts).sum()
+        return int(rows * row_bytes)
+
+    @staticmethod
+    def _merged_row_bytes(left_df, right_df) -> float:
+        return sum(df.iloc[:1].memory_usage(index=False, deep=False).sum() for df in (left_df, right_df)) \
+            + INDEX_BYTES_PER_ROW
+
+    def _op_crossjoin(self, node, left_df, right_df):
+        if self.memory_budget is not None:
+            self._reserve(node, int(len(left_df) * len(right_df) * self._merged_row_bytes(left_df, right_df)))
+        step = max(1, CROSS_JOIN_CHUNK_ROWS // max(len(right_df), 1))
+        if len(left_df) <= step:
+            return left_df.merge(right_df, how='cross')
+        parts = []
+        for start in range(0, len(left_df), step):
+            self.check_cancelled()
+            parts.append(left_df.iloc[start:start + step].merge(right_df, how='cross'))
+        return pd.concat(parts, ignore_index=True)
+
+    def _op_filter(self, node, df):
+        # Conjuncts are applied one at a time, most selective first, so later
+        # predicates only see the rows that survived the earlier ones.
+        for predicate in node.params["predicates"]:
+            df = df[evaluate(predicate, df)]
+        return df
+
+    def _op_aggregate(self, node, df):
+        grouped = df.groupby(node.params["group_cols"], dropna=False)
+        agg_dict = {}
+        for func, t, c, alias in node.params["select_aggs"]:
+            if c == "*":
+                agg_col = None
+            else:
+                agg_col = column_name(t, c)
+            key = alias or f"{func}_{agg_col or 'all'}"
+            if func == "COUNT":
+                # COUNT(*) counts rows, so any column works with 'size'
+                agg_dict[key] = (agg_col, 'count') if agg_col else (df.columns[0], 'size')
+            elif func == "SUM":
+                agg_dict[key] = (agg_col, 'sum')
+            elif func == "AVG":
+                agg_dict[key] = (agg_col, 'mean')
+            elif func == "MIN":
+                agg_dict[key] = (agg_col, 'min')
+            elif func == "MAX":
+                agg_dict[key] = (agg_col, 'max')
+        # pandas groupby agg
+        return grouped.agg(**agg_dict).reset_index()
+
+    def _op_having(self, node, result_df):
+        select_aggs = node.params["select_aggs"]
+
+        def resolve(cond):
+            if not cond.func:
+                return column_name(cond.table, cond.column)
+            for f, t2, c2, alias in select_aggs:
+                if f == cond.func and ((t2 == cond.table and c2 == cond.column) or (cond.column == "*" and c2 == "*")):
+                    return alias or f"{f}_{column_name(t2, c2) if c2 != '*' else 'all'}"
+            return f"{cond.func}_{column_name(cond.table, cond.column) if cond.column != '*' else 'all'}"
+
+        return result_df[evaluate(node.params["predicate"], result_df, resolve)]
+
+    def _op_project(self, node, df):
+        final_cols = [col for col in node.params["columns"] if col in df.columns]
+        return df[final_cols] if final_cols else df
+
+    def _op_distinct(self, node, df):
+        return df.drop_duplicates()
+
+    @staticmethod
+    def _sort_keys(order_by, df):
+        ob_cols = []
+        ascending = []
+        for t, col, asc in order_by:
+            ob_col = column_name(t, col)
+            if ob_col in df.columns:
+                ob_cols.append(ob_col)
+                ascending.append(asc)
+        return ob_cols, ascending
+
+    def _op_sort(self, node, df):
+        if df.empty:
+            return df
+        ob_cols, ascending = self._sort_keys(node.params["order_by"], df)
+        if ob_cols:
+            df = df.sort_values(by=ob_cols, ascending=ascending)
+        return df
+
+    def _op_topk(self, node, df):
+        k = node.params["k"]
+        ob_cols, ascending = self._sort_keys(node.params["order_by"], df)
+        if not ob_cols:
+            return df.head(k)
+        first = df[ob_cols[0]]
+        if len(df) > k and pd.api.types.is_numeric_dtype(first) and not pd.api.types.is_bool_dtype(first):
+            # Keep rows up to the k-th value of the first key (ties included),
+            # so only those need sorting
+            values = first.to_numpy(dtype=float, na_value=np.nan)
+            if not ascending[0]:
+                values = -values
+            kth = np.partition(values, k - 1)[k - 1]
+            if not np.isnan(kth):
+                df = df[values <= kth]
+        return df.sort_values(by=ob_cols, ascending=ascending).head(k)
+
+    def _op_limit(self, node, df):
+        offset, limit = node.params["offset"], node.params["limit"]
+        if offset is not None:
+            df = df[offset:]
+        if limit is not None:
+            df = df.head(limit)
+        return df
+
+    def run_query(
+        self,
+        join_order,
+        join_conditions,
+        compare_conditions,
+        select_cols=None,
+        select_aggs=None,
+        distinct=False,
+        order_by=None,
+        limit=None,
+        offset=None,
+        group_by=None,
+        having_conditions=None,
+        where=None,
+        having=None
+    ):
+        """
+        Runs a query. Filters can be given either as legacy flat tuples
+        (compare_conditions / having_conditions) or as expression trees
+        (where / having, see core_engine.expressions); trees take precedence.
+        """
+        plan = self.plan_query(
+            join_order, join_conditions, compare_conditions,
+            select_cols=select_cols, select_aggs=select_aggs, distinct=distinct,
+            order_by=order_by, limit=limit, offset=offset,
+            group_by=group_by, having_conditions=having_conditions,
+            where=where, having=having,
+        )
+        if not self.profile:
+            return self.execute_plan(plan)
+        self.last_plan = plan
+        return self.execute_plan(plan, analyze=True, analyze_memory=self.profile_memory)
+
+    def explain(self, query_parts: dict, analyze: bool = False) -> PlanNode:
+        """
+        Returns the operator tree for a parsed query. With analyze=True the query is
+        executed and each node carries actual rows, wall time and bytes allocated.
+        """
+        plan = self.plan_query(**query_kwargs(query_parts))
+        self.estimate_memory(plan)
+        if analyze:
+            self.execute_plan(plan, analyze=True)
+        return plan
+
+    def run_batch(self, queries: list) -> list:
+        """
+        Runs several parsed queries (dicts from parse_query_from_string or with
+        run_query keyword arguments) and returns their results in order.
+
+        Queries over the same join graph share a single evaluation of the join:
+        only the filters common to all of them are pushed below the shared join,
+        and each query's own filters, aggregates and projections are applied to
+        its output. Any other identical subtree, such as the same filtered scan
+        used by several queries, is also computed once.
+        """
+        kwargs = [query_kwargs(q) for q in queries]
+        orders = self._shared_join_orders(kwargs)
+        plans = self._share_join_trees([self._logical_plan(**kw, shared_join_order=orders.get(i))
+                                        for i, kw in enumerate(kwargs)])
+        plans = [self._physical_plan(plan) for plan in plans]
+        counts = Counter(node.signature() for plan in plans for node in plan.walk())
+        cache = {sig: None for sig, n in counts.items() if n > 1}
+        results = []
+        for plan in plans:
+            df = self.execute_plan(plan, cache=cache)
+            if any(df is prev for prev in results):
+                df = df.copy()
+            results.append(df)
+        return results
+
+    def _shared_join_orders(self, kwargs: list) -> dict:
+        """
+        With join reordering on, queries over the same join graph would each
+        pick an order from their own filters and no longer share a join tree.
+        Each group gets one order, chosen from the filters all its queries
+        have in common. Returns {query index: join order}.
+        """
+        if "join_reordering" not in self.optimizations:
+            return {}
+        groups = {}
+        for i, kw in enumerate(kwargs):
+            if len(kw.get("join_order") or []) > 1 and (kw.get("select_cols") or kw.get("select_aggs")):
+                key = (frozenset(kw["join_order"]), frozenset(map(tuple, kw.get("join_conditions") or [])))
+                groups.setdefault(key, []).append(i)
+        orders = {}
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            common = set.intersection(*(set(_where_conjuncts(kwargs[i].get("where"),
+                                                             kwargs[i].get("compare_conditions")))
+                                        for i in members))
+            first = kwargs[members[0]]
+            order = self._reorder_joins(first["join_order"], first.get("join_conditions") or [], list(common))
+            orders.update({i: order for i in members})
+        return orders
+
+    def _share_join_trees(self, plans: list) -> list:
+        """Rewrites plans with the same join graph to use an identical join tree."""
+        groups = {}
+        for i, plan in enumerate(plans):
+            tree = _join_tree(plan)
+            if tree.op in JOIN_OPS:
+                groups.setdefault(_join_skeleton(tree), []).append(i)
+        plans = list(plans)
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            common = set.intersection(*(set(_tree_predicates(_join_tree(plans[i]))) for i in members))
+            columns = self._union_scan_columns([_join_tree(plans[i]) for i in members])
+            for i in members:
+                lifted = []
+                parent, tree = _join_tree_parent(plans[i])
+                new_tree = self._strip_filters(tree, common, lifted, columns)
+                if lifted:
+                    new_tree = self._filter_node(new_tree, lifted)
+                if parent is None:
+                    plans[i] = new_tree
+                else:
+                    parent.children[0] = new_tree
+        return plans
+
+    def _union_scan_columns(self, trees: list) -> dict:
+        """Per table, the union of the pruned scan columns of several join trees (None = all)."""
+        wanted = {}
+        for tree in trees:
+            for node in tree.walk():
+                if node.op == "Scan":
+                    table, cols = node.params["table"], node.params.get("columns")
+                    if cols is None or wanted.get(table, set()) is None:
+                        wanted[table] = None
+                    else:
+                        wanted[table] = wanted.get(table, set()) | set(cols)
+        return {table: None if cols is None else [c for c in self.tables[table].columns if c in cols]
+                for table, cols in wanted.items()}
+
+    def _strip_filters(self, node: PlanNode, keep: set, lifted: list, columns: dict) -> PlanNode:
+        """
+        Copies a join tree keeping only predicates in `keep`; others go to
+        `lifted`. Scans are rebuilt to read `columns` of their table.
+        """
+        if node.op == "Filter":
+            child = self._strip_filters(node.children[0], keep, lifted, columns)
+            kept = [p for p in node.params["predicates"] if p in keep]
+            lifted.extend(p for p in node.params["predicates"] if p not in keep)
+            return self._filter_node(child, kept) if kept else child
+        if node.op == "Scan":
+            table = node.params["table"]
+            return self._scan_node(table, columns.get(table, node.params.get("columns")))
+        if node.op not in JOIN_OPS:
+            return node
+        children = [self._strip_filters(child, keep, lifted, columns) for child in node.children]
+        copy = PlanNode(node.op, node.detail, children, **node.params)
+        copy.estimated_rows = node.estimated_rows
+        for old, new in zip(node.children, children):
+            if old.estimated_rows:
+                copy.estimated_rows *= new.estimated_rows / old.estimated_rows
+        return copy
+
+    def sufficient_statistics(self, query_parts: dict, features: list, target: str, categorical: list = ()):
+        """
+        count, sum(x), sum(x x^T) and sum(x y) of `features` and one-hot
+        `categorical` columns ("table.column") against `target` over the join
+        of a parsed query, without materializing the join. See
+        core_engine.factorized.sufficient_statistics.
+        """
+        from core_engine.factorized import sufficient_statistics
+        return sufficient_statistics(self.tables, query_parts, features, target, categorical)
+
+    def run_parsed(self, query_parts: dict):
+        """
+        Runs a query dictionary from parse_query_from_string. EXPLAIN queries
+        return a PlanNode instead of a DataFrame.
+        """
+        if query_parts.get("explain"):
+            return self.explain(query_parts, analyze=query_parts.get("analyze", False))
+        return self.run_query(**query_kwargs(query_parts))
+
+    def iter_parsed(self, query_parts: dict, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """
+        Yields the result of a parsed query as DataFrame chunks of at most
+        chunk_rows rows. Single-table plans of scans, filters, projections and
+        LIMIT / OFFSET run lazily, one input chunk at a time, and stop reading
+        once the limit is reached, so the first rows of a large result arrive
+        without computing the rest. Other plans (joins, aggregates, sorts,
+        DISTINCT) need all their input and are executed fully, then sliced.
+        """
+        plan = self.plan_query(**query_kwargs(query_parts))
+        if self.profile:
+            self.last_plan = plan
+        chain = list(plan.walk())
+        join = self._spillable_join(chain)
+        if join is not None:
+            # The join's output streams from memory or disk to the operators above it
+            if self.refuse_over_budget:
+                self.check_memory(plan, streaming=True)
+            chain = chain[:chain.index(join) + 1]
+        elif any(node.op not in STREAMING_OPS or len(node.children) > 1 for node in chain):
+            df = self.execute_plan(plan, analyze=self.profile, analyze_memory=self.profile_memory)
+            for start in range(0, len(df), chunk_rows):
+                self.check_cancelled()
+                yield df.iloc[start:start + chunk_rows]
+            return
+        self.tracer.on_plan(plan)
+        analyze = ("memory" if self.profile_memory else True) if self.profile else False
+        with self._tracing_memory(analyze):
+            yield from self._stream_chain(chain, chunk_rows, analyze)
+
+    def _stream_chain(self, chain: list, chunk_rows: int, analyze):
+        """
+        Runs a Filter / Project / Limit chain (root first) over a scan or a
+        hash join one chunk at a time.
+        """
+        leaf, operators = chain[-1], [node for node in reversed(chain[:-1]) if node.op != "Limit"]
+        limit = next((node for node in chain if node.op == "Limit"), None)
+        skip = (limit.params["offset"] or 0) if limit else 0
+        remaining = limit.params["limit"] if limit else None
+        sources = self._join_chunks(leaf, analyze) if leaf.op == "HashJoin" \
+            else [self._run_operator(leaf, [], analyze)]
+        for source in sources:
+            for start in range(0, len(source), chunk_rows):
+                if remaining is not None and remaining <= 0:
+                    return
+                self.check_cancelled()
+                chunk = source.iloc[start:start + chunk_rows]
+                for node in operators:
+                    chunk = self._run_operator(node, [chunk], analyze)
+                input_rows, started = len(chunk), time.perf_counter_ns()
+                if skip:
+                    chunk, skip = chunk.iloc[skip:], max(skip - len(chunk), 0)
+                if remaining is not None:
+                    chunk = chunk.iloc[:remaining]
+                    remaining -= len(chunk)
+                if analyze and limit is not None:
+                    limit.add_actuals(len(chunk), time.perf_counter_ns() - started, input_rows)
+                if len(chunk):
+                    yield chunk
+
+    def _spillable_join(self, chain: list):
+        """
+        The HashJoin of a plan (nodes root first) made of Filter / Project /
+        Limit operators over a hash join, when its output may spill to disk.
+        """
+        if self.memory_budget is None or "spill_joins" not in self.optimizations:
+            return None
+        for node in chain:
+            if node.op == "HashJoin":
+                return node
+            if node.op not in ("Filter", "Project", "Limit"):
+                return None
+        return None
 
-        return result_df
\ No newline at end of file
+    def _join_chunks(self, node: PlanNode, analyze):
+        """
+        Yields the output of a hash join in pieces: merged in memory when it
+        fits the memory budget, otherwise through a GraceHashJoin that spills
+        both inputs to disk and releases them.
+        """
+        self._held_bytes = 0
+        left, right = [self._execute(child, analyze) for child in node.children]
+        nbytes = self._join_output_bytes(node, left, right)
+        if nbytes is None or self._held_bytes + nbytes <= self.memory_budget:
+            yield self._run_operator(node, [left, right], analyze)
+            return
+        from core_engine.spill import GraceHashJoin
+        self.check_cancelled()
+        grace = GraceHashJoin(node.params["left_key"], node.params["right_key"], self.memory_budget,
+                              self.spill_dir, check=self.check_cancelled)
+        input_rows = len(left) + len(right)
+        self.tracer.on_operator_start(node)
+        rows = elapsed_ns = 0
+        try:
+            started = time.perf_counter_ns()
+            grace.partition(left, right)
+            elapsed_ns = time.perf_counter_ns() - started
+            del left, right  # partitioned to disk, now released
+            self._held_bytes = 0
+            pieces = grace.pieces()
+            while True:
+                started = time.perf_counter_ns()
+                piece = next(pieces, None)
+                elapsed_ns += time.perf_counter_ns() - started
+                if piece is None:
+                    break
+                rows += len(piece)
+                yield piece
+        finally:
+            grace.close()
+            node.detail += f" (spilled {format_bytes(grace.spilled_bytes)} in {grace.partitions} partitions)"
+            if analyze:
+                node.add_actuals(rows, elapsed_ns, input_rows)
+            self.tracer.on_operator_end(node, rows, elapsed_ns, None)
@@ -0,0 +1,280 @@
+"""
+Grace hash join: an equi-join whose working set is bounded by a memory
+budget rather than by the size of its inputs and output.
+
+Both inputs are hash partitioned on the join key into temporary columnar
+files (Arrow IPC streams, or pickles where pyarrow is missing), and the
+partitions are joined one pair at a time, each output piece being handed to
+the caller before the next pair is read. A partition pair that is still too
+large is partitioned again with a different hash; one that cannot be split
+further (a single heavy key) is joined block by block, slicing its inputs so
+each piece of output fits.
+"""
+import math
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from core_engine.simple_cqc import frame_bytes
+
+# Input rows partitioned at a time.
+SPILL_CHUNK_ROWS = 100_000
+# A join needs about this many times its input bytes while hashing and merging.
+MERGE_MEMORY_FACTOR = 2
+MAX_SPILL_PARTITIONS = 256
+# Partitions are split again at most this many times before falling back to
+# block-wise joining (a partition that does not shrink holds one heavy key).
+MAX_SPILL_DEPTH = 3
+
+
+def _partition_ids(keys: pd.Series, partitions: int, depth: int, as_float: bool) -> np.ndarray:
+    if as_float:
+        # Equal int and float keys must land in the same partition
+        keys = keys.astype("float64")
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=f"cqcspill{depth:08d}").to_numpy()
+    return (hashes % np.uint64(partitions)).astype(np.intp)
+
+
+class SpillFile:
+    """
+    DataFrame chunks appended to one temporary file and read back in order.
+    `rows` and `nbytes` (in-memory size) track what was written.
+    """
+    def __init__(self, path: str, schema=None):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self.nbytes = 0
+        self._file = open(path, "wb")
+        self._writer = None
+
+    def append(self, df: pd.DataFrame):
+        if self.schema is not None:
+            import pyarrow as pa
+            batch = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            if self._writer is None:
+                self._writer = pa.ipc.new_stream(self._file, self.schema)
+            self._writer.write_table(batch)
+        else:
+            pickle.dump(df.reset_index(drop=True), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(df)
+        self.nbytes += frame_bytes(df)
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._writer is not None:
+            self._writer.close()
+        self._file.close()
+
+    def chunks(self):
+        """Yields the appended chunks as DataFrames."""
+        self.close()
+        if not self.rows:
+            return
+        with open(self.path, "rb") as f:
+            if self.schema is not None:
+                import pyarrow as pa
+                for batch in pa.ipc.open_stream(f):
+                    yield batch.to_pandas()
+            else:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        return
+
+    def read(self, columns) -> pd.DataFrame:
+        parts = list(self.chunks())
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def _arrow_schema(df: pd.DataFrame):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    try:
+        return pa.Schema.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None  # mixed-type object columns: fall back to pickles
+
+
+def write_frame(path: str, df: pd.DataFrame) -> str:
+    """
+    Writes one DataFrame (without its index) to `path` plus ".arrow" (an
+    Arrow IPC stream) or, where pyarrow is missing or cannot hold it, ".pkl";
+    returns the file's path. See read_frame.
+    """
+    schema = _arrow_schema(df)
+    path += ".pkl" if schema is None else ".arrow"
+    f = SpillFile(path, schema)
+    try:
+        f.append(df)
+    finally:
+        f.close()
+    return path
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Reads a DataFrame written by write_frame."""
+    with open(path, "rb") as f:
+        if path.endswith(".arrow"):
+            import pyarrow as pa
+            return pa.ipc.open_stream(f).read_pandas()
+        return pickle.load(f)
+
+
+class GraceHashJoin:
+    """
+    Joins `left` and `right` on left_key = right_key (as DataFrame.merge)
+    using at most about `memory_bytes` of working memory, spilling to a
+    temporary directory under `spill_dir` (the system default if None).
+
+    Iterating join() yields the output in pieces; the temporary files are
+    removed once it is exhausted or closed. join() is partition() followed
+    by pieces(), for callers that free the inputs in between. `check` is called between
+    pieces (e.g. SimpleCQ.check_cancelled). After a run, `partitions`,
+    `spilled_bytes` and `depth` describe what was spilled.
+    """
+    def __init__(self, left_key: str, right_key: str, memory_bytes: int, spill_dir: str = None, check=None):
+        self.left_key = left_key
+        self.right_key = right_key
+        self.memory_bytes = max(int(memory_bytes), 1)
+        self.spill_dir = spill_dir
+        self.check = check or (lambda: None)
+        self.partitions = 0
+        self.spilled_bytes = 0
+        self.depth = 0
+        self._dir = None
+        self._files = 0
+        self._columns = None
+        self._as_float = False
+        self._pairs = []
+
+    def join(self, left: pd.DataFrame, right: pd.DataFrame):
+        """Partitions both inputs, then yields the output pieces (see partition and pieces)."""
+        self.partition(left, right)
+        del left, right
+        yield from self.pieces()
+
+    def partition(self, left: pd.DataFrame, right: pd.DataFrame):
+        """
+        Writes both inputs to hash partitions on disk. Once it returns the
+        caller may free its inputs; pieces() then joins the partitions.
+        """
+        left_keys, right_keys = left[self.left_key], right[self.right_key]
+        self._as_float = left_keys.dtype != right_keys.dtype \
+            and pd.api.types.is_numeric_dtype(left_keys) and pd.api.types.is_numeric_dtype(right_keys)
+        self._columns = (list(left.columns), list(right.columns))
+        schemas = (_arrow_schema(left), _arrow_schema(right))
+        self._dir = tempfile.mkdtemp(prefix="cqc_spill_", dir=self.spill_dir)
+        try:
+            count = self._partition_count(frame_bytes(left) + frame_bytes(right))
+            left_files = self._partition(self._slices(left), self.left_key, count, 0, schemas[0])
+            right_files = self._partition(self._slices(right), self.right_key, count, 0, schemas[1])
+        except BaseException:
+            self.close()
+            raise
+        self.partitions = count
+        self._pairs = list(zip(left_files, right_files))
+
+    def pieces(self):
+        """Yields the join output of the partitions written by partition(), then removes them."""
+        try:
+            for left_file, right_file in self._pairs:
+                yield from self._join_files(left_file, right_file, 0)
+        finally:
+            self.close()
+
+    def close(self):
+        """Removes the temporary files."""
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def _partition_count(self, input_bytes: int) -> int:
+        # Half the budget for a partition pair's inputs, half for its output
+        count = math.ceil(2 * MERGE_MEMORY_FACTOR * input_bytes / self.memory_bytes)
+        return min(max(count, 2), MAX_SPILL_PARTITIONS)
+
+    @staticmethod
+    def _slices(df: pd.DataFrame):
+        for start in range(0, len(df), SPILL_CHUNK_ROWS):
+            yield df.iloc[start:start + SPILL_CHUNK_ROWS]
+
+    def _new_file(self, schema) -> SpillFile:
+        self._files += 1
+        return SpillFile(os.path.join(self._dir, f"part{self._files}.spill"), schema)
+
+    def _partition(self, chunks, key: str, count: int, depth: int, schema) -> list:
+        files = [self._new_file(schema) for _ in range(count)]
+        for chunk in chunks:
+            self.check()
+            ids = _partition_ids(chunk[key], count, depth, self._as_float)
+            order = np.argsort(ids, kind="stable")
+            bounds = np.searchsorted(ids[order], np.arange(count + 1))
+            chunk = chunk.take(order)
+            for part, f in enumerate(files):
+                if bounds[part] < bounds[part + 1]:
+                    piece = chunk.iloc[bounds[part]:bounds[part + 1]]
+                    f.append(piece)
+                    self.spilled_bytes += frame_bytes(piece)
+        for f in files:
+            f.close()
+        return files
+
+    def _join_files(self, left_file: SpillFile, right_file: SpillFile, depth: int):
+        try:
+            if not left_file.rows or not right_file.rows:
+                return
+            input_bytes = left_file.nbytes + right_file.nbytes
+            if MERGE_MEMORY_FACTOR * input_bytes <= self.memory_bytes / 2:
+                left = left_file.read(self._columns[0])
+                right = right_file.read(self._columns[1])
+                yield from self._merge_bounded(left, right)
+            elif depth < MAX_SPILL_DEPTH:
+                count = self._partition_count(input_bytes)
+                self.depth = max(self.depth, depth + 1)
+                left_parts = self._partition(left_file.chunks(), self.left_key, count, depth + 1, left_file.schema)
+                right_parts = self._partition(right_file.chunks(), self.right_key, count, depth + 1,
+                                              right_file.schema)
+                os.remove(left_file.path)
+                os.remove(right_file.path)
+                for left_part, right_part in zip(left_parts, right_parts):
+                    yield from self._join_files(left_part, right_part, depth + 1)
+            else:
+                # Too large and not splitting: typically one heavy key. Every pair of
+                # stored chunks is joined on its own.
+                for left in left_file.chunks():
+                    for right in right_file.chunks():
+                        yield from self._merge_bounded(left, right)
+        finally:
+            for f in (left_file, right_file):
+                if os.path.exists(f.path):
+                    os.remove(f.path)
+
+    def _merge_bounded(self, left: pd.DataFrame, right: pd.DataFrame):
+        """Merges two in-memory inputs, in left slices small enough for each output piece to fit."""
+        self.check()
+        left_counts = left[self.left_key].value_counts(dropna=False)
+        right_counts = right[self.right_key].value_counts(dropna=False)
+        if self._as_float:
+            left_counts.index = left_counts.index.astype("float64")
+            right_counts.index = right_counts.index.astype("float64")
+        rows = int((right_counts.reindex(left_counts.index, fill_value=0) * left_counts).sum())
+        if not rows:
+            return
+        row_bytes = sum(df.iloc[:1].memory_usage(index=False, deep=False).sum() for df in (left, right)) + 8
+        pieces = max(1, math.ceil(2 * rows * row_bytes / self.memory_bytes))
+        step = max(1, math.ceil(len(left) / pieces))
+        for start in range(0, len(left), step):
+            if start:
+                self.check()
+            out = left.iloc[start:start + step].merge(right, left_on=self.left_key, right_on=self.right_key)
+            if len(out):
+                yield out
@@ -0,0 +1,150 @@
+import math
+import pandas as pd
+
+# Fallback selectivities used when a predicate cannot be estimated from statistics.
+DEFAULT_RANGE_SELECTIVITY = 1 / 3
+DEFAULT_LIKE_SELECTIVITY = 0.1
+# At most this many heavy hitters are kept per column, most frequent first.
+MAX_HEAVY_HITTERS = 100
+# A heavy hitter counts as skew when it is this many times more frequent than a
+# typical value (see ColumnStats.skewed_values).
+SKEW_FACTOR = 10
+
+
+class ColumnStats:
+    """
+    Summary statistics for a single column, used for cardinality estimation.
+
+    Heavy hitters are values occurring more than sqrt(row_count) times (the
+    degree threshold of the heavy/light decomposition); their exact counts are
+    kept, and every other ("light") value is assumed equally frequent.
+    """
+    def __init__(self, row_count: int, ndv: int, null_count: int, min_value=None, max_value=None,
+                 heavy_hitters: dict = None):
+        self.row_count = row_count
+        self.ndv = max(ndv, 1)
+        self.null_count = null_count
+        self.min_value = min_value
+        self.max_value = max_value
+        self.heavy_hitters = heavy_hitters or {}
+
+    @classmethod
+    def from_series(cls, series: pd.Series):
+        null_count = int(series.isnull().sum())
+        counts = series.value_counts(dropna=True)
+        ndv = len(counts)
+        heavy = counts[counts > math.sqrt(len(series))].head(MAX_HEAVY_HITTERS)
+        min_value = max_value = None
+        if pd.api.types.is_numeric_dtype(series) and len(series) > null_count:
+            min_value, max_value = series.min(), series.max()
+        return cls(len(series), ndv, null_count, min_value, max_value,
+                   {value: int(count) for value, count in heavy.items()})
+
+    @property
+    def light_ndv(self) -> int:
+        return max(self.ndv - len(self.heavy_hitters), 1)
+
+    @property
+    def light_frequency(self) -> float:
+        """Average number of rows per light value."""
+        light_rows = self.row_count - self.null_count - sum(self.heavy_hitters.values())
+        return max(light_rows, 0) / self.light_ndv
+
+    def skewed_values(self, factor: float = SKEW_FACTOR) -> set:
+        """
+        Heavy hitters more than `factor` times as frequent as a typical value:
+        a light value, or the average value when every value is heavy (on
+        uniform keys with few distinct values, all of them pass sqrt(rows)).
+        """
+        light_rows = self.row_count - self.null_count - sum(self.heavy_hitters.values())
+        typical = self.light_frequency if light_rows > 0 else (self.row_count - self.null_count) / self.ndv
+        return {value for value, count in self.heavy_hitters.items() if count > factor * typical}
+
+    def frequency(self, value) -> float:
+        """Estimated number of rows equal to `value`."""
+        try:
+            return self.heavy_hitters.get(value, self.light_frequency)
+        except TypeError:  # unhashable literal
+            return self.light_frequency
+
+    def selectivity(self, op: str, val) -> float:
+        """
+        Estimates the fraction of rows satisfying `column <op> val`.
+        """
+        if self.row_count == 0:
+            return 0.0
+        op = op.upper()
+        if op == "IS NULL":
+            return self.null_count / self.row_count
+        if op in ("=", "=="):
+            return min(1.0, self.frequency(val) / self.row_count)
+        if op == "!=":
+            return 1.0 - min(1.0, self.frequency(val) / self.row_count)
+        if op in ("IN", "NOT IN"):
+            values = val if isinstance(val, (list, tuple, set)) else [val]
+            sel = min(1.0, sum(self.frequency(v) for v in values) / self.row_count)
+            return sel if op == "IN" else 1.0 - sel
+        if op == "LIKE":
+            return DEFAULT_LIKE_SELECTIVITY
+        if op in ("<", "<=", ">", ">="):
+            if self.min_value is None or not isinstance(val, (int, float)) or self.max_value == self.min_value:
+                return DEFAULT_RANGE_SELECTIVITY
+            frac = (val - self.min_value) / (self.max_value - self.min_value)
+            frac = min(max(frac, 0.0), 1.0)
+            return frac if op in ("<", "<=") else 1.0 - frac
+        return DEFAULT_RANGE_SELECTIVITY
+
+
+class TableStats:
+    """
+    Lazily computed per-table statistics. Column statistics are computed on first
+    use and cached, so planning a query only pays for the columns it touches.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self.row_count = len(df)
+        self._columns = {}
+
+    def column(self, name: str):
+        if name not in self._df.columns:
+            return None
+        if name not in self._columns:
+            self._columns[name] = ColumnStats.from_series(self._df[name])
+        return self._columns[name]
+
+    def ndv(self, name: str) -> int:
+        col = self.column(name)
+        return col.ndv if col else max(self.row_count, 1)
+
+    def column_bytes(self, name: str) -> float:
+        """
+        Average in-memory bytes per row of a column, counting object columns
+        by their pointers: copies made by joins and filters share the objects.
+        """
+        if name not in self._df.columns or not self.row_count:
+            return 8.0
+        return self._df[name].memory_usage(index=False, deep=False) / self.row_count
+
+    def selectivity(self, name: str, op: str, val) -> float:
+        col = self.column(name)
+        return col.selectivity(op, val) if col else DEFAULT_RANGE_SELECTIVITY
+
+
+def join_selectivity(left: ColumnStats, right: ColumnStats) -> float:
+    """
+    Fraction of the cross product of two columns' rows that satisfies
+    left = right. Values heavy on either side are matched one by one from
+    their counts; the remaining light values assume uniform frequencies, which
+    reduces to the textbook 1 / max(ndv) when neither column is skewed.
+    """
+    if left is None or right is None or not left.row_count or not right.row_count:
+        return 1.0 / max(getattr(left, "ndv", 1), getattr(right, "ndv", 1))
+    heavy_keys = set(left.heavy_hitters) | set(right.heavy_hitters)
+    heavy_rows = sum(left.frequency(k) * right.frequency(k) for k in heavy_keys)
+    # Light values left on each side once every heavy key is set aside
+    left_ndv = max(left.light_ndv - len(heavy_keys - set(left.heavy_hitters)), 0)
+    right_ndv = max(right.light_ndv - len(heavy_keys - set(right.heavy_hitters)), 0)
+    left_rows, right_rows = left.light_frequency * left_ndv, right.light_frequency * right_ndv
+    light_ndv = max(left_ndv, right_ndv)
+    light_rows = left_rows * right_rows / max(light_ndv, 1)
+    return min(1.0, (heavy_rows + light_rows) / (left.row_count * right.row_count))
@@ -0,0 +1,56 @@
+import pandas as pd
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import SimpleCQ
+from core_engine.tracing import RecordingTracer
+
+customers = pd.DataFrame({
+    "id": [1, 2, 3, 4],
+    "country": ["CA", "US", "CA", "US"],
+    "org": ["o1", "o2", "o1", "o3"],
+})
+organizations = pd.DataFrame({
+    "name": ["o1", "o2", "o3"],
+    "industry": ["IT", "IT", "Retail"],
+    "employees": [10, 5000, 300],
+})
+
+QUERIES = [
+    "SELECT customers.id FROM customers JOIN organizations ON customers.org = organizations.name "
+    "WHERE customers.country = 'CA'",
+    "SELECT organizations.industry, COUNT(*) AS n FROM customers "
+    "JOIN organizations ON customers.org = organizations.name GROUP BY organizations.industry",
+    "SELECT customers.id FROM customers JOIN organizations ON customers.org = organizations.name "
+    "WHERE organizations.employees > 100 ORDER BY customers.id",
+]
+
+
+def test_run_batch_matches_individual_runs():
+    parsed = [parse_query_from_string(q) for q in QUERIES]
+    engine = SimpleCQ(SimpleCQ.prepare_tables({"customers": customers, "organizations": organizations}))
+    expected = [engine.run_parsed(q).reset_index(drop=True) for q in parsed]
+    batch = [df.reset_index(drop=True) for df in engine.run_batch(parsed)]
+    for got, want in zip(batch, expected):
+        pd.testing.assert_frame_equal(
+            got.sort_values(list(got.columns)).reset_index(drop=True),
+            want.sort_values(list(want.columns)).reset_index(drop=True))
+
+
+def test_run_batch_evaluates_shared_join_once():
+    tracer = RecordingTracer()
+    engine = SimpleCQ(SimpleCQ.prepare_tables({"customers": customers, "organizations": organizations}),
+                      tracer=tracer)
+    engine.run_batch([parse_query_from_string(q) for q in QUERIES])
+    assert [e["op"] for e in tracer.events].count("HashJoin") == 1
+
+
+def test_star_join_applies_every_join_condition():
+    regions = pd.DataFrame({"country": ["CA", "US"], "region": ["North", "South"]})
+    engine = SimpleCQ(SimpleCQ.prepare_tables(
+        {"customers": customers, "organizations": organizations, "regions": regions}))
+    parsed = parse_query_from_string(
+        "SELECT customers.id, organizations.industry, regions.region FROM customers "
+        "JOIN organizations ON customers.org = organizations.name "
+        "JOIN regions ON customers.country = regions.country")
+    result = engine.run_parsed(parsed).sort_values("customers_id")
+    assert list(result["regions_region"]) == ["North", "South", "North", "South"]
+    assert "CrossJoin" not in [node.op for node in engine.explain(parsed).walk()]
@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+from core_engine.simple_cqc import MemoryBudgetExceeded, SimpleCQ
+from core_engine.parser import parse_query_from_string
+
+# Toy data setup
+A = pd.DataFrame({
+    "id": [1, 2, 3],
+    "x": [5, 6, 7],
+})
+B = pd.DataFrame({
+    "a_id": [1, 2, 2, 3],
+    "y": [10, 12, 13, 15],
+})
+
+
+def make_engine():
+    return SimpleCQ(SimpleCQ.prepare_tables({"A": A, "B": B}))
+
+
+def test_parser_recognizes_explain():
+    parsed = parse_query_from_string("EXPLAIN ANALYZE SELECT A.x FROM A WHERE A.x > 5")
+    assert parsed["explain"] and parsed["analyze"]
+    assert parsed["join_order"] == ["A"]
+
+    parsed = parse_query_from_string("explain SELECT A.x FROM A")
+    assert parsed["explain"] and not parsed["analyze"]
+
+    parsed = parse_query_from_string("SELECT A.x FROM A")
+    assert not parsed["explain"]
+
+
+def test_explain_returns_estimates_without_executing():
+    engine = make_engine()
+    plan = engine.explain({
+        "join_order": ["A", "B"],
+        "join_conditions": [("A", "id", "B", "a_id")],
+        "compare_conditions": [("B", "y", ">", 11, None)],
+        "limit": 2,
+    })
+    ops = [node.op for node in plan.walk()]
+    # The single-table predicate on B is pushed below the join
+    assert ops == ["Limit", "HashJoin", "Scan", "Filter", "Scan"]
+    assert all(node.estimated_rows is not None for node in plan.walk())
+    assert all(node.actual_rows is None for node in plan.walk())
+
+
+def test_explain_analyze_records_actuals():
+    engine = make_engine()
+    plan = engine.explain({
+        "join_order": ["A", "B"],
+        "join_conditions": [("A", "id", "B", "a_id")],
+        "compare_conditions": [("B", "y", ">", 11, None)],
+    }, analyze=True)
+    assert plan.actual_rows == 3
+    assert plan.op == "HashJoin"
+    assert plan.children[1].op == "Filter" and plan.children[1].actual_rows == 3
+    assert all(node.elapsed_ns is not None and node.bytes_allocated is not None for node in plan.walk())
+    assert "actual_rows=3" in plan.format()
+
+
+
+def test_profiled_runs_keep_the_annotated_plan():
+    engine = make_engine()
+    engine.profile = True
+    engine.run_parsed(parse_query_from_string("SELECT A.x FROM A JOIN B ON A.id = B.a_id WHERE B.y > 11"))
+    join = next(node for node in engine.last_plan.walk() if node.op == "HashJoin")
+    assert (join.input_rows, join.actual_rows) == (3 + 3, 3)
+    assert all(node.bytes_allocated is None for node in engine.last_plan.walk())  # profile_memory is off
+
+    # Streamed chunks add up per operator
+    chunks = list(engine.iter_parsed(parse_query_from_string("SELECT B.y FROM B WHERE B.y > 10 LIMIT 2"),
+                                     chunk_rows=1))
+    assert sum(map(len, chunks)) == 2
+    by_op = {node.op: node for node in engine.last_plan.walk()}
+    assert by_op["Limit"].actual_rows == 2 and by_op["Scan"].input_rows == 4
+    assert by_op["Filter"].input_rows == 3  # the scan stopped once the limit was met
+
+
+def test_memory_budget_refuses_estimates_and_accounts_live():
+    engine = make_engine()
+    query = parse_query_from_string("SELECT A.x, B.y FROM A JOIN B ON A.id = B.a_id")
+    plan = engine.explain(query)
+    peak = engine.estimate_memory(plan)
+    assert "est_mem=" in plan.format() and peak > 0
+    engine.memory_budget = peak - 1
+    with pytest.raises(MemoryBudgetExceeded) as refused:
+        engine.run_parsed(query)
+    assert refused.value.required == peak
+    # Once confirmed, only the actual sizes count
+    engine.refuse_over_budget = False
+    engine.memory_budget = 100
+    with pytest.raises(MemoryBudgetExceeded, match="already held, over the memory budget of 100B"):
+        engine.run_parsed(query)
+    engine.memory_budget = 1024 ** 2
+    assert len(engine.run_parsed(query)) == 4
@@ -0,0 +1,56 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from core_engine.jobs import QueryRunner
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import QueryCancelled, SimpleCQ
+
+N = 20_000
+ENGINE = SimpleCQ(SimpleCQ.prepare_tables({
+    "a": pd.DataFrame({"x": np.arange(N)}),
+    "b": pd.DataFrame({"y": np.arange(N)}),
+}))
+# No join condition: a 400M row cross join
+CROSS = {"join_order": ["a", "b"], "join_conditions": [], "compare_conditions": [],
+         "select_cols": [("a", "x", None), ("b", "y", None)]}
+
+
+def test_cancelled_engine_stops_at_next_checkpoint():
+    engine = SimpleCQ(ENGINE.tables)
+    engine.cancel_event = threading.Event()
+    engine.cancel_event.set()
+    with pytest.raises(QueryCancelled, match="cancelled"):
+        engine.run_parsed(parse_query_from_string("SELECT a.x FROM a"))
+    engine.cancel_event, engine.deadline = None, time.monotonic() - 1
+    with pytest.raises(QueryCancelled, match="timed out"):
+        next(engine.iter_parsed(CROSS))
+
+
+def test_runner_times_out_cancels_and_queues_queries():
+    runner = QueryRunner(max_workers=1)
+    runaway = runner.submit(ENGINE, CROSS, timeout=0.3)
+    small = runner.submit(ENGINE, parse_query_from_string("SELECT a.x FROM a WHERE a.x < 5"))
+    assert (runaway.status, small.status) == ("running", "queued")
+    assert runaway.wait(timeout=10)
+    assert runaway.status == "timed_out" and runaway.progress["op"] == "CrossJoin"
+    assert small.wait(timeout=10) and list(small.result()["a_x"]) == [0, 1, 2, 3, 4]
+
+    cancelled = runner.submit(ENGINE, CROSS)
+    time.sleep(0.2)
+    cancelled.cancel()
+    assert cancelled.status == "cancelled" and not runner.active_jobs
+    with pytest.raises(RuntimeError, match="cancelled"):
+        cancelled.result()
+
+
+def test_runner_refuses_and_stops_over_budget_queries():
+    runner = QueryRunner(max_workers=1, memory_budget=64 * 1024 ** 2)
+    refused = runner.submit(ENGINE, CROSS)
+    assert refused.wait(timeout=10) and refused.status == "over_budget"
+    assert refused.error.startswith("Estimated peak memory")
+    # Confirmed despite the estimate: live accounting stops the cross join before it is built
+    confirmed = runner.submit(ENGINE, CROSS, refuse_over_budget=False)
+    assert confirmed.wait(timeout=10) and confirmed.status == "over_budget"
+    assert confirmed.error.startswith("CrossJoin")
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import OPTIMIZATIONS, SimpleCQ
+
+customers = pd.DataFrame({
+    "id": range(1, 41),
+    "country": ["CA", "US", "MX", "FR", "DE", "JP", "BR", "IN", "UK", "ES"] * 4,
+    "org": ["o1", "o2", "o3", "o4"] * 10,
+})
+organizations = pd.DataFrame({
+    "name": ["o1", "o2", "o3", "o4"],
+    "employees": [10, 5000, 300, 42],
+})
+
+QUERY = ("SELECT customers.id, organizations.employees FROM customers "
+         "JOIN organizations ON customers.org = organizations.name "
+         "WHERE customers.country = 'CA' OR customers.country = 'US' "
+         "ORDER BY customers.id DESC LIMIT 3")
+
+
+def make_engine(optimizations=None):
+    tables = SimpleCQ.prepare_tables({"customers": customers, "organizations": organizations})
+    return SimpleCQ(tables, optimizations=optimizations)
+
+
+def operators(node):
+    return [node.op] + [op for child in node.children for op in operators(child)]
+
+
+def test_results_do_not_depend_on_optimizations():
+    parsed = parse_query_from_string(QUERY)
+    expected = make_engine(optimizations=()).run_parsed(parsed).reset_index(drop=True)
+    for name in OPTIMIZATIONS:
+        for enabled in ({name}, set(OPTIMIZATIONS) - {name}):
+            result = make_engine(optimizations=enabled).run_parsed(parsed).reset_index(drop=True)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert list(expected.iloc[:, 0]) == [32, 31, 22]
+
+
+def test_physical_operators_follow_switches():
+    parsed = parse_query_from_string(
+        "SELECT customers.id FROM customers WHERE customers.country = 'CA' ORDER BY customers.id LIMIT 2")
+    ops = operators(make_engine(optimizations=OPTIMIZATIONS).explain(parsed))
+    assert "IndexScan" in ops and "TopK" in ops
+    ops = operators(make_engine(optimizations=()).explain(parsed))
+    assert "IndexScan" not in ops and "TopK" not in ops and "Sort" in ops
+
+
+def test_unknown_optimization_is_rejected():
+    with pytest.raises(ValueError):
+        make_engine(optimizations={"vectorize_everything"})
+
+
+def test_iter_parsed_streams_scans_and_matches_run_parsed():
+    engine = make_engine()
+    streamed = ("SELECT customers.id FROM customers WHERE customers.org = 'o2' OR customers.id > 30 "
+                "LIMIT 6 OFFSET 4")
+    for sql in (streamed, QUERY, "SELECT customers.id FROM customers WHERE customers.id > 100"):
+        parsed = parse_query_from_string(sql)
+        chunks = list(engine.iter_parsed(parsed, chunk_rows=5))
+        assert all(0 < len(chunk) <= 5 for chunk in chunks)
+        expected = engine.run_parsed(parsed)
+        if chunks:
+            pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+        else:
+            assert expected.empty
+    # The scan is read lazily: a LIMIT satisfied by the first chunk stops there
+    first = next(engine.iter_parsed(parse_query_from_string("SELECT customers.id FROM customers LIMIT 2"),
+                                    chunk_rows=5))
+    assert list(first["customers_id"]) == [1, 2]
+
+
+def test_index_scan_ignores_repeated_in_values():
+    tables = SimpleCQ.prepare_tables({"t": pd.DataFrame({"id": range(10_000), "v": range(10_000)})})
+    parsed = parse_query_from_string("SELECT t.v FROM t WHERE t.id IN (1, 1, 2)")
+    assert "IndexScan" in operators(SimpleCQ(tables).explain(parsed))
+    assert list(SimpleCQ(tables).run_parsed(parsed)["t_v"]) == [1, 2]
+    assert list(SimpleCQ(tables, optimizations=()).run_parsed(parsed)["t_v"]) == [1, 2]
+
+
+def test_unknown_columns_are_rejected_whatever_the_optimizations():
+    for sql in ("SELECT customers.nope FROM customers",
+                "SELECT customers.id FROM customers ORDER BY customers.nope",
+                "SELECT customers.country, COUNT(*) FROM customers GROUP BY customers.nope"):
+        for enabled in (OPTIMIZATIONS, ()):
+            with pytest.raises(ValueError, match="nope"):
+                make_engine(optimizations=enabled).run_parsed(parse_query_from_string(sql))
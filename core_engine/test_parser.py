@@ -0,0 +1,88 @@
+import pandas as pd
+from core_engine.expressions import And, ColumnRef, Comparison, Or, conditions_to_expression, to_cnf
+from core_engine.parser import parse_expression, parse_query_from_string, split_sql_statements
+from core_engine.simple_cqc import SimpleCQ
+
+A = pd.DataFrame({
+    "id": [1, 2, 3, 4],
+    "x": [5, 6, 7, 8],
+    "name": ["alpha", "beta", "gamma", None],
+})
+B = pd.DataFrame({
+    "a_id": [1, 2, 2, 3],
+    "y": [10, 6, 13, 5],
+})
+
+
+def make_engine():
+    return SimpleCQ(SimpleCQ.prepare_tables({"A": A, "B": B}))
+
+
+def test_and_binds_tighter_than_or():
+    expr = parse_expression("A.x = 5 OR A.x = 6 AND A.id = 3")
+    assert isinstance(expr, Or)
+    assert expr.children[0] == Comparison("A", "x", "=", 5)
+    assert isinstance(expr.children[1], And)
+
+
+def test_parentheses_and_not():
+    expr = parse_expression("NOT (A.x > 5 OR A.name LIKE 'a%')")
+    cnf = to_cnf(expr)
+    assert isinstance(cnf, And)
+    assert Comparison("A", "x", "<=", 5) in cnf.children
+
+
+def test_or_distributes_into_conjuncts():
+    cnf = to_cnf(parse_expression("(A.x = 5 AND A.id = 1) OR A.x = 8"))
+    assert isinstance(cnf, And) and len(cnf.children) == 2
+    assert all(isinstance(child, Or) for child in cnf.children)
+
+
+def test_where_precedence_end_to_end():
+    parsed = parse_query_from_string("SELECT A.id FROM A WHERE A.x = 5 OR A.x = 6 AND A.id = 3")
+    # Only x = 5 matches: x = 6 has id 2
+    assert make_engine().run_parsed(parsed)["A_id"].tolist() == [1]
+    assert parsed["compare_conditions"] == []
+
+
+def test_plain_conjunction_keeps_legacy_tuples():
+    parsed = parse_query_from_string("SELECT A.id FROM A WHERE A.x > 5 AND A.name = 'beta'")
+    assert parsed["compare_conditions"] == [("A", "x", ">", 5, "AND"), ("A", "name", "=", "beta", None)]
+
+
+def test_column_vs_column_after_join():
+    parsed = parse_query_from_string(
+        "SELECT A.id, B.y FROM A JOIN B ON A.id = B.a_id WHERE A.x < B.y AND A.name IS NOT NULL")
+    assert Comparison("A", "x", "<", ColumnRef("B", "y")) in parsed["where"].children
+    result = make_engine().run_parsed(parsed)
+    assert sorted(result["A_id"].tolist()) == [1, 2]
+
+
+def test_having_alias_and_count_star():
+    parsed = parse_query_from_string(
+        "SELECT B.a_id, COUNT(*) AS n FROM B GROUP BY B.a_id HAVING n > 1")
+    result = make_engine().run_parsed(parsed)
+    assert result["B_a_id"].tolist() == [2]
+
+
+def test_legacy_logic_joins_to_next_condition():
+    expr = conditions_to_expression([("A", "x", "=", 5, "OR"), ("A", "x", "=", 6, None)])
+    assert isinstance(expr, Or)
+
+
+def test_table_aliases_resolve_to_table_names():
+    parsed = parse_query_from_string(
+        "SELECT a.id, b.y FROM A a JOIN B AS b ON a.id = b.a_id WHERE b.y > 5 ORDER BY b.y")
+    assert parsed["join_order"] == ["A", "B"]
+    assert make_engine().run_parsed(parsed)["B_y"].tolist() == [6, 10, 13]
+
+
+def test_split_sql_statements_names_and_quotes():
+    script = """
+    -- Query 1: semicolon inside a string
+    SELECT A.id FROM A WHERE A.name = 'a;b';
+    SELECT B.y FROM B;
+    """
+    statements = split_sql_statements(script)
+    assert [name for name, _ in statements] == ["query_1", "q2"]
+    assert statements[0][1].endswith("'a;b'")
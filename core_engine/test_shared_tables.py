@@ -0,0 +1,53 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from core_engine import jobs
+from core_engine.jobs import QueryRunner
+from core_engine.parser import parse_query_from_string
+from core_engine.shared_tables import SharedTables, attach_tables, share_tables
+from core_engine.simple_cqc import SimpleCQ
+
+TABLES = {
+    "people": pd.DataFrame({
+        "id": np.arange(6),
+        "name": ["ann", "bob", None, "dan", "eve", "fay"],
+        "score": [1.5, np.nan, 3.0, 4.5, 5.0, 6.5],
+        "born": pd.to_datetime(["2000-01-01", "2001-02-03", None, "1999-12-31", "2002-06-01", "2003-07-04"]),
+        "tag": pd.Series([1, "x", None, "x", 2.5, 1], dtype=object),
+        "grade": pd.Categorical(["a", "b", "a", "c", "b", "a"]),
+        "active": [True, False, True, True, False, True],
+    }),
+    "visits": pd.DataFrame({"person": [0, 0, 3, 5, 5, 5], "cost": np.arange(6) * 10.0}),
+}
+
+
+def test_shared_tables_round_trip_and_attach_by_path(tmp_path):
+    shared = share_tables(TABLES, str(tmp_path))
+    for name, df in TABLES.items():
+        pd.testing.assert_frame_equal(shared[name], df)
+    # Pickles as a handle; in the owning process it resolves to the same object
+    assert len(pickle.dumps(shared)) < 200
+    assert pickle.loads(pickle.dumps(shared)) is shared is attach_tables(shared.path)
+    ids = shared["people"]["id"].to_numpy()
+    assert not ids.flags.writeable and np.shares_memory(ids, shared["people"]["id"].to_numpy())
+
+    people = shared["people"]
+    shared.close()
+    assert not os.listdir(tmp_path)
+    # Mapped frames outlive the files
+    pd.testing.assert_frame_equal(people, TABLES["people"])
+
+
+def test_spawned_workers_attach_to_shared_tables(monkeypatch):
+    engine = SimpleCQ(SimpleCQ.prepare_tables(TABLES))
+    query = parse_query_from_string(
+        "SELECT people.name, SUM(visits.cost) FROM people JOIN visits ON people.id = visits.person "
+        "GROUP BY people.name")
+    expected = engine.run_parsed(query)
+    monkeypatch.setattr(jobs, "START_METHOD", "spawn")
+    job = QueryRunner(max_workers=1).submit(engine, query)
+    assert job.wait(timeout=60), job.status
+    assert isinstance(engine.tables, SharedTables)
+    pd.testing.assert_frame_equal(job.result().reset_index(drop=True), expected.reset_index(drop=True))
+    assert len(pickle.dumps(engine)) < 2000
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import OPTIMIZATIONS, SimpleCQ
+from core_engine.statistics import ColumnStats, join_selectivity
+
+rng = np.random.default_rng(0)
+# Zipf-like join keys: a handful of very frequent values and a long uniform tail
+KEYS = np.concatenate([np.repeat([1, 2, 3], [3000, 2000, 1000]), rng.integers(4, 2000, 4000)])
+
+
+def test_heavy_hitters_drive_equality_and_join_estimates():
+    left = pd.Series(rng.permutation(KEYS))
+    right = pd.Series(rng.permutation(KEYS)[:5000])
+    stats = ColumnStats.from_series(left)
+    assert set(stats.heavy_hitters) == {1, 2, 3}
+    assert stats.selectivity("=", 1) == 0.3
+    assert stats.selectivity("=", 500) < 0.001
+
+    actual = left.map(right.value_counts()).fillna(0).sum()
+    estimate = join_selectivity(stats, ColumnStats.from_series(right)) * len(left) * len(right)
+    uniform = len(left) * len(right) / stats.ndv
+    assert abs(estimate - actual) / actual < 0.2
+    assert uniform < actual / 10
+
+
+def test_skewed_join_is_ordered_after_the_selective_one():
+    n = len(KEYS)
+    tables = SimpleCQ.prepare_tables({
+        "A": pd.DataFrame({"k": rng.permutation(KEYS), "x": np.arange(n)}),
+        "B": pd.DataFrame({"k": rng.permutation(KEYS), "y": rng.integers(0, 500, n)}),
+        "C": pd.DataFrame({"y": np.arange(500), "flag": np.where(np.arange(500) < 10, "rare", "common")}),
+    })
+    parsed = parse_query_from_string("SELECT A.x, C.y FROM A JOIN B ON A.k = B.k "
+                                     "JOIN C ON B.y = C.y WHERE C.flag = 'rare'")
+    engine = SimpleCQ(tables)
+    plan = engine.explain(parsed)
+    joins = [node for node in plan.walk() if node.op == "HashJoin"]
+    assert "(3 heavy keys)" in joins[0].detail and "heavy" not in joins[1].detail
+    assert [node.params["table"] for node in plan.walk() if node.op in ("Scan", "IndexScan")] == ["C", "B", "A"]
+
+    fixed = SimpleCQ(tables, optimizations=set(OPTIMIZATIONS) - {"join_reordering"})
+    expected = fixed.run_parsed(parsed).sort_values(["A_x", "C_y"]).reset_index(drop=True)
+    result = engine.run_parsed(parsed).sort_values(["A_x", "C_y"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_uniform_foreign_keys_are_not_flagged_as_heavy():
+    # 100 keys of 2000 rows each: all above sqrt(rows), none skewed
+    tables = SimpleCQ.prepare_tables({
+        "F": pd.DataFrame({"k": np.arange(200_000) % 100}),
+        "D": pd.DataFrame({"k": np.arange(100)}),
+    })
+    engine = SimpleCQ(tables)
+    assert len(engine.table_stats("F").column("F_k").heavy_hitters) == 100
+    plan = engine.explain(parse_query_from_string("SELECT F.k FROM F JOIN D ON F.k = D.k"))
+    assert "heavy" not in next(node for node in plan.walk() if node.op == "HashJoin").detail
@@ -0,0 +1,32 @@
+import io
+import json
+import pandas as pd
+from core_engine.simple_cqc import SimpleCQ
+from core_engine.tracing import RecordingTracer
+
+A = pd.DataFrame({"id": [1, 2, 3], "x": [5, 6, 7]})
+B = pd.DataFrame({"a_id": [1, 2, 2, 3], "y": [10, 12, 13, 15]})
+
+
+def test_recording_tracer_exports():
+    tracer = RecordingTracer(track_memory=True)
+    engine = SimpleCQ(SimpleCQ.prepare_tables({"A": A, "B": B}), tracer=tracer)
+    engine.run_query(["A", "B"], [("A", "id", "B", "a_id")], [])
+    assert [e["op"] for e in tracer.events] == ["Scan", "Scan", "HashJoin"]
+    assert tracer.events[-1]["rows"] == 4
+    assert tracer.events[-1]["memory_delta"] is not None
+
+    lines = io.StringIO()
+    tracer.to_json_lines(lines)
+    assert len(lines.getvalue().splitlines()) == 3
+
+    trace = io.StringIO()
+    tracer.to_chrome_trace(trace)
+    events = json.loads(trace.getvalue())["traceEvents"]
+    assert events[-1]["name"] == "HashJoin" and events[-1]["ph"] == "X"
+
+
+def test_default_tracer_is_noop():
+    engine = SimpleCQ(SimpleCQ.prepare_tables({"A": A}))
+    assert not engine.tracer.enabled
+    assert len(engine.run_query(["A"], [], [])) == 3
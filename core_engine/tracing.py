@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    """
+    Instrumentation interface called by SimpleCQ around every plan operator.
+
+    The base class is a no-op: while `enabled` is False the engine skips timing
+    entirely, so an engine without a tracer pays nothing. Subclasses override
+    on_operator_start/on_operator_end, and on_plan, which receives the plan
+    about to be executed. Set `track_memory` to have the engine
+    report traced allocation deltas (this starts tracemalloc and is not free).
+    """
+    enabled = False
+    track_memory = False
+
+    def on_plan(self, plan):
+        pass
+
+    def on_operator_start(self, node):
+        pass
+
+    def on_operator_end(self, node, rows: int, elapsed_ns: int, memory_delta):
+        pass
+
+
+NULL_TRACER = Tracer()
+
+
+class RecordingTracer(Tracer):
+    """
+    Collects one event dict per executed operator, in execution order:
+    {"op", "detail", "rows", "start_ns", "elapsed_ns", "memory_delta", "thread"}.
+    """
+    enabled = True
+
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory
+        self.events = []
+        self._starts = {}
+
+    def on_operator_start(self, node):
+        self._starts[id(node)] = time.perf_counter_ns()
+
+    def on_operator_end(self, node, rows, elapsed_ns, memory_delta):
+        self.events.append({
+            "op": node.op,
+            "detail": node.detail,
+            "rows": rows,
+            "start_ns": self._starts.pop(id(node), None),
+            "elapsed_ns": elapsed_ns,
+            "memory_delta": memory_delta,
+            "thread": threading.get_ident(),
+        })
+
+    def clear(self):
+        self.events = []
+        self._starts = {}
+
+    def stage_timings(self) -> dict:
+        """Total elapsed seconds per operator type, e.g. {"HashJoin": 0.12, ...}."""
+        totals = {}
+        for event in self.events:
+            totals[event["op"]] = totals.get(event["op"], 0.0) + event["elapsed_ns"] / 1e9
+        return totals
+
+    def to_json_lines(self, path_or_file):
+        export_json_lines(self.events, path_or_file)
+
+    def to_chrome_trace(self, path_or_file):
+        export_chrome_trace(self.events, path_or_file)
+
+
+class ProgressTracer(Tracer):
+    """
+    Reports operator progress to `callback(event)` as a query runs, with
+    event = {"event": "start" | "end", "op", "detail", "rows", "elapsed_ns",
+    "operators_done", "operators_total"}. Counts refer to the distinct nodes
+    of the plan being executed (rows and elapsed_ns are None on "start").
+    """
+    enabled = True
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.operators_total = None
+        self._done = set()
+
+    def on_plan(self, plan):
+        self.operators_total = sum(1 for _ in plan.walk())
+        self._done = set()
+
+    def _report(self, event, node, rows=None, elapsed_ns=None):
+        self.callback({
+            "event": event,
+            "op": node.op,
+            "detail": node.detail,
+            "rows": rows,
+            "elapsed_ns": elapsed_ns,
+            "operators_done": len(self._done),
+            "operators_total": self.operators_total,
+        })
+
+    def on_operator_start(self, node):
+        self._report("start", node)
+
+    def on_operator_end(self, node, rows, elapsed_ns, memory_delta):
+        self._done.add(id(node))
+        self._report("end", node, rows, elapsed_ns)
+
+
+def _open_for_write(path_or_file):
+    if hasattr(path_or_file, "write"):
+        return path_or_file, False
+    return open(path_or_file, "w"), True
+
+
+def export_json_lines(events: list, path_or_file):
+    """Writes one JSON object per operator event."""
+    fp, close = _open_for_write(path_or_file)
+    try:
+        for event in events:
+            fp.write(json.dumps(event, default=str) + "\n")
+    finally:
+        if close:
+            fp.close()
+
+
+def export_chrome_trace(events: list, path_or_file):
+    """
+    Writes events in the Chrome trace event format, viewable in
+    chrome://tracing or Perfetto. Timestamps are in microseconds.
+    """
+    trace_events = []
+    for event in events:
+        start_ns = event["start_ns"] if event["start_ns"] is not None else 0
+        trace_events.append({
+            "name": event["op"],
+            "cat": "operator",
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": event["elapsed_ns"] / 1000,
+            "pid": os.getpid(),
+            "tid": event["thread"],
+            "args": {
+                "detail": event["detail"],
+                "rows": event["rows"],
+                "memory_delta": event["memory_delta"],
+            },
+        })
+    fp, close = _open_for_write(path_or_file)
+    try:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, fp)
+    finally:
+        if close:
+            fp.close()
+
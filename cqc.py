@@ -0,0 +1,195 @@
+"""
+cqc: command-line entry point for CQC-Accelerator.
+
+    python cqc.py run queries.sql --data-dir data --output-dir results --format parquet --workers 4
+    cat queries.sql | python cqc.py run - --data-dir data
+    python cqc.py serve --data-dir data --port 8765
+    python cqc.py generate healthcare --scale-factor 0.1
+
+`run` executes every statement of a .sql script (see split_sql_statements)
+against the tables of a data directory, independent statements in parallel
+worker processes, writes each result to <output-dir>/<name>.<format> chunk
+by chunk, and prints a timing summary. `serve` and `generate` hand their
+arguments to query_server/server.py and benchmarking_suite/datagen.py.
+
+Modules are imported by the command that needs them, so plotting, GUI and
+ML libraries are never loaded here and startup stays short.
+"""
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, PROJECT_ROOT)
+
+# Statements run in worker processes share one engine, set by _init_worker
+_ENGINE = None
+
+
+def _init_worker(engine):
+    global _ENGINE
+    _ENGINE = engine
+
+
+def run_statement(engine, name: str, sql: str, output_dir: str = None, fmt: str = "csv",
+                  timeout: float = None) -> dict:
+    """
+    Runs one statement and writes its result to <output_dir>/<name>.<fmt>
+    (or only counts the rows without output_dir). Returns a summary dict
+    {"query_id", "status", "rows", "seconds", "output", "error"}; failures
+    are reported there rather than raised.
+    """
+    from core_engine.parser import parse_query_from_string
+    from core_engine.simple_cqc import MemoryBudgetExceeded, QueryCancelled
+    from gui_interface.results import write_chunks
+
+    summary = {"query_id": name, "status": "ok", "rows": 0, "seconds": 0.0, "output": None, "error": None}
+    session = engine.session()
+    started = time.perf_counter()
+    try:
+        query_parts = parse_query_from_string(sql)
+        missing = [t for t in query_parts["join_order"] if t not in engine.tables]
+        if missing:
+            raise ValueError(f"Referenced tables not found: {', '.join(missing)}")
+        if query_parts.get("explain"):
+            raise ValueError("EXPLAIN statements are not supported here; use the GUI or the query server")
+        if timeout:
+            session.deadline = time.monotonic() + timeout
+        chunks = session.iter_parsed(query_parts)
+        if output_dir:
+            summary["output"] = os.path.join(output_dir, f"{name}.{fmt}")
+            summary["rows"] = write_chunks(chunks, summary["output"], fmt)
+        else:
+            summary["rows"] = sum(len(chunk) for chunk in chunks)
+    except QueryCancelled as e:
+        summary.update(status="timed_out", error=str(e))
+    except MemoryBudgetExceeded as e:
+        summary.update(status="over_budget", error=str(e))
+    except Exception as e:
+        summary.update(status="failed", error=f"{type(e).__name__}: {e}")
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def _run_in_worker(name, sql, output_dir, fmt, timeout):
+    return run_statement(_ENGINE, name, sql, output_dir, fmt, timeout)
+
+
+def run_script(engine, statements: list, output_dir: str = None, fmt: str = "csv", workers: int = 1,
+               timeout: float = None):
+    """
+    Runs (name, sql) statements, yielding their summaries as they finish.
+    With workers > 1 statements run in that many processes, each holding
+    the engine: inherited where processes are forked, else attached to its
+    tables in shared memory (see core_engine.jobs.worker_context).
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if workers <= 1 or len(statements) <= 1:
+        for name, sql in statements:
+            yield run_statement(engine, name, sql, output_dir, fmt, timeout)
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from core_engine.jobs import worker_context
+    ctx = worker_context(engine)
+    with ProcessPoolExecutor(max_workers=min(workers, len(statements)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(engine,)) as pool:
+        futures = [pool.submit(_run_in_worker, name, sql, output_dir, fmt, timeout) for name, sql in statements]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _run_command(argv):
+    parser = argparse.ArgumentParser(prog="cqc run", description="Run the statements of a .sql file.")
+    parser.add_argument("sql_file", help="Script of ;-separated statements, or - for stdin")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_ROOT, "data"),
+                        help="Directory of CSV / Parquet tables")
+    parser.add_argument("--output-dir", help="Write each result to <output-dir>/<statement name>.<format>")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Statements run in parallel processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-statement time limit in seconds")
+    parser.add_argument("--memory-budget", default=None,
+                        help="Per-statement memory limit for intermediate results, e.g. 4GB "
+                             "(default: half of physical memory, 0 for no limit)")
+    parser.add_argument("--spill-dir", help="Directory for joins spilled over the memory budget "
+                                            "(default: the system temporary directory)")
+    parser.add_argument("--summary", help="Also write the timing summary to this .json or .csv file")
+    args = parser.parse_args(argv)
+
+    from core_engine.parser import split_sql_statements
+    from core_engine.plan import parse_bytes
+    from core_engine.simple_cqc import SimpleCQ, default_memory_budget
+    from benchmarking_suite.helpers import load_tables_from_dir
+
+    if args.sql_file == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.sql_file) as f:
+            text = f.read()
+    statements = split_sql_statements(text)
+    if not statements:
+        print("No statements to run.")
+        return 0
+
+    started = time.perf_counter()
+    tables = load_tables_from_dir(args.data_dir)
+    if not tables:
+        return 1
+    engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+    if args.memory_budget is None:
+        engine.memory_budget = default_memory_budget()
+    else:
+        engine.memory_budget = parse_bytes(args.memory_budget) or None
+    engine.spill_dir = args.spill_dir
+    load_seconds = time.perf_counter() - started
+    print(f"Loaded {len(tables)} tables in {load_seconds:.2f}s; running {len(statements)} statements")
+
+    order = {name: i for i, (name, _) in enumerate(statements)}
+    results = []
+    for summary in run_script(engine, statements, args.output_dir, args.format, args.workers, args.timeout):
+        results.append(summary)
+        detail = (summary["output"] or "") if summary["status"] == "ok" else summary["error"]
+        print(f"{summary['query_id']:>20}: {summary['status']:<11} {summary['rows']:>10,} rows "
+              f"{summary['seconds']:8.3f}s  {detail}")
+    results.sort(key=lambda r: order[r["query_id"]])
+
+    failed = sum(r["status"] != "ok" for r in results)
+    total = time.perf_counter() - started
+    print(f"{len(results) - failed}/{len(results)} statements succeeded; "
+          f"{sum(r['rows'] for r in results):,} rows in {total:.2f}s "
+          f"(sum of statement times {sum(r['seconds'] for r in results):.2f}s)")
+    if args.summary:
+        from benchmarking_suite.helpers import save_results
+        save_results(results, args.summary)
+        print(f"Summary written to {args.summary}")
+    return 1 if failed else 0
+
+
+COMMANDS = {
+    "run": "Run the statements of a .sql file against a data directory",
+    "serve": "Serve queries over HTTP (query_server/server.py)",
+    "generate": "Generate benchmark datasets (benchmarking_suite/datagen.py)",
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS:
+        print("usage: cqc {" + ",".join(COMMANDS) + "} ...\n")
+        for name, help_text in COMMANDS.items():
+            print(f"  {name:<10}{help_text}")
+        return 0 if argv and argv[0] in ("-h", "--help") else 2
+    command, rest = argv[0], argv[1:]
+    if command == "run":
+        return _run_command(rest)
+    if command == "serve":
+        from query_server.server import main as serve
+        return serve(rest)
+    from benchmarking_suite.datagen import main as generate
+    return generate(rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
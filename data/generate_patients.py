@@ -1,53 +1,15 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import random
+import os
+import sys
 
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
 
-# Number of records
-N = 1000000
+from benchmarking_suite.datagen import write_dataset
 
-# Lists for random data generation
-first_names = ['Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Sophia', 'Jackson', 'Isabella', 'Lucas', 'Mia']
-last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez']
-conditions = ['Hypertension', 'Diabetes', 'Asthma', 'Arthritis', 'Migraine', 'Allergy', 'None']
-medications = ['Lisinopril', 'Metformin', 'Albuterol', 'Ibuprofen', 'Sumatriptan', 'Cetirizine', 'Amoxicillin']
-specialties = ['Cardiology', 'Endocrinology', 'Pulmonology', 'Rheumatology', 'Neurology', 'General Practice']
-
-# Generate Patients data
-patients = pd.DataFrame({
-    'patient_id': range(1, N + 1),
-    'first_name': [random.choice(first_names) for _ in range(N)],
-    'last_name': [random.choice(last_names) for _ in range(N)],
-    'date_of_birth': [datetime(1950, 1, 1) + timedelta(days=random.randint(0, 25550)) for _ in range(N)],
-    'primary_condition': [random.choice(conditions) for _ in range(N)]
-})
-
-# Generate Appointments data
-appointments = pd.DataFrame({
-    'appointment_id': range(1, N + 1),
-    'patient_id': np.random.choice(patients['patient_id'], N),
-    'appointment_date': [datetime(2023, 1, 1) + timedelta(days=random.randint(0, 730)) for _ in range(N)],
-    'doctor_specialty': [random.choice(specialties) for _ in range(N)],
-    'visit_reason': [random.choice(['Checkup', 'Follow-up', 'Emergency', 'Consultation']) for _ in range(N)]
-})
-
-# Generate Prescriptions data
-prescriptions = pd.DataFrame({
-    'prescription_id': range(1, N + 1),
-    'appointment_id': np.random.choice(appointments['appointment_id'], N),
-    'medication_name': [random.choice(medications) for _ in range(N)],
-    'dosage': [f'{random.randint(5, 100)} mg' for _ in range(N)],
-    'duration_days': np.random.randint(7, 90, N)
-})
-
-# Save to CSV files
-patients.to_csv('data/patients.csv', index=False)
-appointments.to_csv('data/appointments.csv', index=False)
-prescriptions.to_csv('data/prescriptions.csv', index=False)
+# Patients, appointments and prescriptions at 1M rows each (scale factor 1),
+# seeded for reproducibility. For other sizes, skew or Parquet output use
+#   python benchmarking_suite/datagen.py healthcare --scale-factor 10 --workers 3
+write_dataset(os.path.join(PROJECT_ROOT, 'data'), 'healthcare', scale_factor=1.0, seed=42)
 
 # Generate SQL join queries
 join_queries = """
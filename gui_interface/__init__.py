@@ -7,8 +7,8 @@ execute them, and visualize the results.
 
 Key Components:
 - app.py: Main Streamlit application for user interaction.
+- cache.py: Memory-bounded cache of uploaded tables and prepared engines, keyed by file content.
+- results.py: Paging over streamed result chunks and chunked CSV / Parquet export.
+- profile.py: Operator tree of an executed query with rows, time and memory per node.
 - components/: UI components for query building and result display.
-
-This is a placeholder file to establish the directory structure. Actual implementation files will be
-added as development progresses.
 """
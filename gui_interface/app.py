@@ -1,22 +1,169 @@
 import streamlit as st
 import pandas as pd
-from core_engine.simple_cqc import SimpleCQ
+from core_engine.simple_cqc import SimpleCQ, default_memory_budget, query_kwargs
+from core_engine.jobs import QueryRunner
+from core_engine.plan import format_bytes
 from core_engine.parser import parse_query_from_string
 from benchmarking_suite.benchmark_cqc import benchmark_cq
 from benchmarking_suite.benchmark_sql import benchmark_sql
 from benchmarking_suite.helpers import generate_sql_equivalent_query
 from benchmarking_suite.visualize import plot_benchmark_results
+from gui_interface.cache import ByteBudgetCache, content_digest
+from gui_interface.profile import hot_nodes, profile_dot, profile_table, total_time_ns
+from gui_interface.results import DOWNLOAD_FORMATS, ResultPager, export_to_tempfile, frame_chunks
+import hashlib
+import io
 import os
 import re
+import time
 
 # --- Try to import ML Feature Extractor ---
 try:
-    from ml_feature_extractor.extractor import extract_features
+    from ml_feature_extractor.extractor import FeatureExtractor
     ML_EXTRACTOR_AVAILABLE = True
 except Exception as e:
     ML_EXTRACTOR_AVAILABLE = False
     ML_EXTRACTOR_ERROR = str(e)
 
+# Memory budget for uploaded tables and prepared engines, shared by all sessions
+CACHE_BUDGET_MB = int(os.environ.get("CQC_GUI_CACHE_MB", "2048"))
+# Results are fetched for display in chunks of this many rows
+DISPLAY_CHUNK_ROWS = 10_000
+# Queries run in worker processes, at most this many at once across sessions
+QUERY_WORKERS = int(os.environ.get("CQC_GUI_QUERY_WORKERS", "2"))
+# Default time limit of a query in seconds (0: no limit)
+QUERY_TIMEOUT_SECONDS = int(os.environ.get("CQC_GUI_QUERY_TIMEOUT", "60"))
+# Default memory budget of a query in MB (0: no limit); by default the workers
+# share half of physical memory (see default_memory_budget)
+QUERY_MEMORY_MB = int(os.environ.get("CQC_GUI_QUERY_MEMORY_MB",
+                                     (default_memory_budget() or 0) // QUERY_WORKERS // (1024 * 1024)))
+JOB_POLL_SECONDS = 0.2
+
+
+@st.cache_resource
+def shared_cache() -> ByteBudgetCache:
+    """
+    Tables and prepared engines keyed by file content, so reruns (every widget
+    click) and other sessions reuse them instead of re-reading and re-copying.
+    Cached values are shared: treat them as read-only.
+    """
+    return ByteBudgetCache(CACHE_BUDGET_MB * 1024 * 1024)
+
+
+@st.cache_resource
+def query_runner() -> QueryRunner:
+    """Worker processes for queries, shared by all sessions."""
+    return QueryRunner(max_workers=QUERY_WORKERS)
+
+
+def show_job_progress(job, status_line, progress_bar):
+    """Renders the latest operator progress of a running QueryJob."""
+    event = job.progress or {}
+    total = event.get("operators_total")
+    progress_bar.progress(min(event["operators_done"] / total, 1.0) if total else 0.0)
+    if job.status == "queued":
+        status_line.write("Waiting for a free worker...")
+        return
+    current = f"{event['op']} {event['detail']}".strip() if event else "Planning"
+    limit = f" of {job.timeout:.0f}s" if job.timeout else ""
+    status_line.write(f"**{current}** ({job.elapsed:.1f}s{limit}, {job.rows} rows received)")
+
+
+def start_query(engine, parsed_query, digests, timeout, memory_budget, profile_memory, refuse_over_budget=True):
+    """Discards this session's previous query, running or not, and submits a new one to the worker pool."""
+    previous = st.session_state.pop("query_job", None) or st.session_state.pop("query_result", None)
+    if previous is not None:
+        previous["job"].discard()
+        discard_download(f"query_result_{previous['job'].id}")
+    st.session_state["query_job"] = {
+        "job": query_runner().submit(engine, parsed_query, timeout=timeout, chunk_rows=DISPLAY_CHUNK_ROWS,
+                                     profile="memory" if profile_memory else True,
+                                     memory_budget=memory_budget, refuse_over_budget=refuse_over_budget),
+        "digests": dict(digests),
+    }
+
+
+def show_profile(plan: dict):
+    """Operator tree of an executed query with rows, time and memory per node; hot nodes in red."""
+    total_ms = total_time_ns(plan) / 1e6
+    hot = hot_nodes(plan)
+    if hot:
+        st.write(f"**{total_ms:.1f} ms in operators; hot:** "
+                 + ", ".join(f"{node['op']} {node['detail']}".strip() + f" ({node['elapsed_ns'] / 1e6:.1f} ms)"
+                             for node in hot))
+    st.graphviz_chart(profile_dot(plan))
+    table = profile_table(plan)
+    st.dataframe(table.style.apply(
+        lambda row: ["background-color: #ffd6d6" if row["hot"] else ""] * len(row), axis=1
+    ).format({"time_ms": "{:.2f}", "time_share": "{:.0%}"}, na_rep="-"))
+
+
+def load_uploaded_table(uploaded_file):
+    """Returns (content digest, DataFrame) of an uploaded CSV, parsing it once per content."""
+    digests = st.session_state.setdefault("file_digests", {})
+    file_key = (getattr(uploaded_file, "file_id", None) or uploaded_file.name, uploaded_file.size)
+    if file_key not in digests:
+        digests[file_key] = content_digest(uploaded_file.getvalue())
+    digest = digests[file_key]
+    df = shared_cache().get_or_create(("table", digest),
+                                      lambda: pd.read_csv(io.BytesIO(uploaded_file.getvalue())))
+    return digest, df
+
+
+def get_engine(tables: dict, digests: dict) -> SimpleCQ:
+    """SimpleCQ over the prepared tables, prepared once per set of table contents."""
+    key = ("engine", tuple(sorted(digests.items())))
+    return shared_cache().get_or_create(key, lambda: SimpleCQ(SimpleCQ.prepare_tables(tables)))
+
+
+def show_paged_result(key: str, pager: ResultPager, make_chunks, file_stem: str):
+    """
+    Shows one page of a result at a time, fetching only the chunks that page
+    needs. The full result is written chunk by chunk to a temporary CSV or
+    Parquet file only when a download is requested; make_chunks() returns a
+    fresh chunk iterator over the whole result for that.
+    """
+    page_size = st.selectbox("Rows per page", [25, 100, 500], index=1, key=f"{key}_page_size")
+    pager.page_size = page_size
+    page = int(st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")) - 1
+    if not pager.has_page(page):
+        st.info("No rows on this page.")
+    else:
+        st.dataframe(pager.page(page))
+    if pager.total_rows is not None:
+        st.caption(f"Page {page + 1} of {pager.page_count} ({pager.total_rows} rows)")
+    else:
+        st.caption(f"Page {page + 1} (more than {pager.rows_fetched} rows; the rest is fetched as you page)")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt = st.selectbox("Download format", DOWNLOAD_FORMATS, key=f"{key}_format")
+    with col2:
+        if st.button("Prepare download", key=f"{key}_prepare"):
+            with st.spinner(f"Writing {fmt.upper()} file..."):
+                path = export_to_tempfile(make_chunks(), fmt)
+            discard_download(key)
+            st.session_state[f"{key}_download"] = (fmt, path)
+    download = st.session_state.get(f"{key}_download")
+    if download:
+        fmt, path = download
+        with open(path, "rb") as f:
+            st.download_button(
+                label=f"Download {fmt.upper()}",
+                data=f,
+                file_name=f"{file_stem}.{fmt}",
+                mime="text/csv" if fmt == "csv" else "application/octet-stream",
+                key=f"{key}_download_button"
+            )
+
+
+def discard_download(key: str):
+    """Deletes the temporary download file prepared for a result, if any."""
+    download = st.session_state.pop(f"{key}_download", None)
+    if download and os.path.exists(download[1]):
+        os.remove(download[1])
+
+
 st.set_page_config(layout="wide")
 st.title("CQC-Accelerator")
 st.caption("Interactive Conjunctive Query Benchmarking and ML Feature Extraction")
@@ -29,6 +176,13 @@ with st.sidebar:
         type=["csv"],
         accept_multiple_files=True
     )
+    st.header("Execution")
+    query_timeout = st.number_input("Query timeout in seconds (0 for none)", min_value=0,
+                                    value=QUERY_TIMEOUT_SECONDS, step=10)
+    query_memory_mb = st.number_input("Memory budget per query in MB (0 for none)", min_value=0,
+                                      value=QUERY_MEMORY_MB, step=256)
+    memory_budget = query_memory_mb * 1024 * 1024 or None
+    profile_memory = st.checkbox("Profile memory per operator (slower)")
     st.header("Benchmarking")
     run_benchmark_option = st.checkbox("Compare SimpleCQ vs. SQLite Performance")
     st.info("If checked, a performance benchmark will run for the query and a comparison chart will be displayed.")
@@ -54,12 +208,14 @@ if not uploaded_files:
 # Load and validate tables
 tables = {}
 table_info = {}
+table_digests = {}
 
 for uploaded_file in uploaded_files:
     try:
-        df = pd.read_csv(uploaded_file)
+        digest, df = load_uploaded_table(uploaded_file)
         table_name = uploaded_file.name.split(".")[0].lower()
         tables[table_name] = df
+        table_digests[table_name] = digest
         table_info[table_name] = {
             'rows': len(df),
             'columns': list(df.columns),
@@ -147,38 +303,33 @@ if st.button("Run Query", type="primary"):
                 st.info(f"Available tables: {', '.join(tables.keys())}")
                 st.stop()
 
-            st.subheader("SimpleCQ Query Result")
-            with st.spinner("Executing SimpleCQ query..."):
-                prepared_tables = SimpleCQ.prepare_tables(tables)
-                engine = SimpleCQ(prepared_tables)
-                result_df = engine.run_query(
-                    parsed_query["join_order"],
-                    parsed_query["join_conditions"],
-                    parsed_query["compare_conditions"],
-                    select_cols=parsed_query.get("select_cols"),
-                    select_aggs=parsed_query.get("select_aggs"),
-                    distinct=parsed_query.get("distinct", False),
-                    order_by=parsed_query.get("order_by"),
-                    limit=parsed_query.get("limit"),
-                    offset=parsed_query.get("offset"),
-                    group_by=parsed_query.get("group_by"),
-                    having_conditions=parsed_query.get("having_conditions")
-                )
+            if parsed_query.get("explain"):
+                st.subheader("EXPLAIN ANALYZE" if parsed_query.get("analyze") else "EXPLAIN")
+                with st.spinner("Planning SimpleCQ query..."):
+                    engine = get_engine(tables, table_digests)
+                    plan = engine.run_parsed(parsed_query)
+                st.code(plan.format(), language="text")
+                st.stop()
 
-            st.write(f"**Query returned {len(result_df)} rows**")
-            if len(result_df) > 0:
-                st.dataframe(result_df)
-                csv = result_df.to_csv(index=False)
-                st.download_button(
-                    label="Download results as CSV",
-                    data=csv,
-                    file_name="query_results.csv",
-                    mime="text/csv"
-                )
+            # Plans estimated over the memory budget wait for confirmation (below)
+            engine = get_engine(tables, table_digests)
+            # Estimated as the worker runs it: joins may spill to disk under this budget
+            planner = engine.session()
+            planner.memory_budget = memory_budget
+            estimate = planner.estimate_memory(planner.plan_query(**query_kwargs(parsed_query)), streaming=True)
+            over_budget = memory_budget is not None and estimate > memory_budget
+            st.session_state.pop("over_budget_query", None)
+            if over_budget:
+                st.session_state["over_budget_query"] = {
+                    "query": parsed_query, "estimate": estimate, "budget": memory_budget,
+                    "digests": dict(table_digests),
+                }
             else:
-                st.info("Query returned no results.")
+                # The query runs in a worker process; its progress and result are shown below
+                start_query(engine, parsed_query, table_digests, query_timeout or None, memory_budget,
+                            profile_memory)
 
-            if run_benchmark_option:
+            if run_benchmark_option and not over_budget:
                 st.markdown("---")
                 st.subheader("Performance Benchmark Results")
                 try:
@@ -186,26 +337,38 @@ if st.button("Run Query", type="primary"):
                         sql_query = generate_sql_equivalent_query(parsed_query, parsed_query.get("select_cols"))
                         st.write("**Generated SQLite Query:**")
                         st.code(sql_query, language="sql")
-                        cq_metrics = benchmark_cq(tables, parsed_query)
-                        sql_metrics = benchmark_sql(tables, sql_query)
+                        # A private engine over the cached prepared tables: benchmark_cq
+                        # swaps its tracer, which must not leak into other sessions
+                        cq_metrics = benchmark_cq(tables, parsed_query, engine=SimpleCQ(engine.tables))
+                        dataset_version = hashlib.sha1(
+                            repr(sorted(table_digests.items())).encode()).hexdigest()[:16]
+                        sql_metrics = benchmark_sql(tables, sql_query, query_parts=parsed_query,
+                                                    dataset_version=dataset_version)
                     col1, col2 = st.columns(2)
                     with col1:
                         st.write("**SimpleCQ Results:**")
                         if cq_metrics.get("error"):
                             st.error(f"Error: {cq_metrics['error']}")
                         else:
-                            st.metric("Execution Time", f"{cq_metrics['execution_time_seconds']:.4f}s")
+                            st.metric("Execution Time (median)", f"{cq_metrics['execution_time_seconds']:.4f}s")
+                            st.metric("Execution Time (p95)", f"{cq_metrics['time_p95_seconds']:.4f}s")
                             st.metric("Memory Peak", f"{cq_metrics['memory_peak_bytes'] / 1024 / 1024:.2f} MB")
+                            st.metric("Result Rows", cq_metrics['result_rows'])
                             
                     with col2:
                         st.write("**SQLite Results:**")
                         if sql_metrics.get("error"):
                             st.error(f"Error: {sql_metrics['error']}")
                         else:
-                            st.metric("Execution Time", f"{sql_metrics['execution_time_seconds']:.4f}s")
+                            st.metric("Execution Time (median)", f"{sql_metrics['execution_time_seconds']:.4f}s")
+                            st.metric("Execution Time (p95)", f"{sql_metrics['time_p95_seconds']:.4f}s")
                             st.metric("Memory Peak", f"{sql_metrics['memory_peak_bytes'] / 1024 / 1024:.2f} MB")
+                            st.metric("Result Rows", sql_metrics['result_rows'])
                             
-                    benchmark_df = pd.DataFrame([cq_metrics, sql_metrics])
+                    if cq_metrics.get("operator_timings"):
+                        st.write("**SimpleCQ Time per Operator (seconds):**")
+                        st.bar_chart(pd.Series(cq_metrics["operator_timings"], name="seconds"))
+                    benchmark_df = pd.DataFrame([cq_metrics, sql_metrics]).drop(columns=["operator_timings"], errors="ignore")
                     benchmark_df = benchmark_df.set_index('query_expr')
                     st.write("**Detailed Comparison:**")
                     st.dataframe(benchmark_df)
@@ -225,6 +388,78 @@ if st.button("Run Query", type="primary"):
                 import traceback
                 st.code(traceback.format_exc())
 
+# --- Query estimated over the memory budget: run only once confirmed ---
+over_budget_query = st.session_state.get("over_budget_query")
+if over_budget_query is not None and over_budget_query["digests"] == table_digests:
+    st.warning(f"This query is estimated to hold {format_bytes(over_budget_query['estimate'])} of intermediate "
+               f"results, over the memory budget of {format_bytes(over_budget_query['budget'])}. Add join "
+               "conditions or filters, raise the budget in the sidebar, or run it anyway: it is still "
+               "stopped if it actually exceeds the budget.")
+    run_col, discard_col = st.columns(2)
+    if run_col.button("Run anyway"):
+        del st.session_state["over_budget_query"]
+        start_query(get_engine(tables, table_digests), over_budget_query["query"], table_digests,
+                    query_timeout or None, over_budget_query["budget"], profile_memory, refuse_over_budget=False)
+    elif discard_col.button("Discard query"):
+        del st.session_state["over_budget_query"]
+        st.rerun()
+
+# --- Running query: progress until its first rows arrive or it finishes ---
+query_job = st.session_state.get("query_job")
+if query_job is not None:
+    job = query_job["job"]
+    running_area = st.empty()
+    with running_area.container():
+        st.subheader("SimpleCQ Query Running")
+        # Clicking Cancel reruns the script, which ends the polling loop below
+        if st.button("Cancel query", key=f"cancel_query_{job.id}"):
+            job.cancel()
+        status_line = st.empty()
+        progress_bar = st.progress(0.0)
+        while job.poll() and not job.rows:
+            show_job_progress(job, status_line, progress_bar)
+            time.sleep(JOB_POLL_SECONDS)
+    running_area.empty()
+    del st.session_state["query_job"]
+    # Paged from the job's result files, pulling chunks as the pages need them
+    st.session_state["query_result"] = {
+        "job": job,
+        "digests": query_job["digests"],
+        "pager": ResultPager(job.iter_chunks()),
+    }
+
+# --- Query result, paged while the query runs (kept across reruns until the next query) ---
+query_result = st.session_state.get("query_result")
+if query_result and query_result["digests"] == table_digests:
+    job = query_result["job"]
+    running = job.poll()
+    st.subheader("SimpleCQ Query Result")
+    if job.status == "cancelled":
+        st.warning(f"Query cancelled after {job.elapsed:.1f}s.")
+    elif job.status == "timed_out":
+        st.error(f"Query timed out after {job.timeout:.0f}s. "
+                 "Raise the timeout in the sidebar or add filters / join conditions.")
+    elif job.status == "over_budget":
+        st.error(f"Query stopped at the memory budget: {job.error}")
+    elif job.status == "failed":
+        st.error(f"An error occurred: {job.error}")
+    elif query_result["pager"].has_page(0):
+        if running:
+            st.write(f"**{job.rows} rows so far after {job.elapsed:.1f}s; the query is still running**")
+            cancel_col, refresh_col = st.columns(2)
+            if cancel_col.button("Cancel query", key=f"cancel_result_{job.id}"):
+                job.cancel()
+                st.rerun()
+            refresh_col.button("Refresh", key=f"refresh_result_{job.id}")
+        else:
+            st.write(f"**Query returned {job.rows} rows in {job.elapsed:.2f}s**")
+        show_paged_result(f"query_result_{job.id}", query_result["pager"], job.iter_chunks, "query_results")
+    else:
+        st.info("Query returned no results.")
+    if job.plan is not None:
+        with st.expander("Query Profile", expanded=True):
+            show_profile(job.plan)
+
 # --- ML Feature Extractor Main Section ---
 st.header("ML Feature Extractor")
 if ML_EXTRACTOR_AVAILABLE:
@@ -237,18 +472,28 @@ if ML_EXTRACTOR_AVAILABLE:
             if st.button("Extract ML Features", key="extract_ml_features_main"):
                 try:
                     st.info("Running ML feature extraction...")
-                    features_df = extract_features(df_preview)
+                    # Only the statistics are computed here; features are
+                    # transformed chunk by chunk as pages are viewed
+                    extractor = FeatureExtractor().fit(df_preview)
+                    discard_download("features")
+                    st.session_state["features"] = {
+                        "table": selected_table,
+                        "digest": table_digests[selected_table],
+                        "extractor": extractor,
+                        "pager": ResultPager(extractor.transform_chunks(frame_chunks(df_preview, DISPLAY_CHUNK_ROWS))),
+                    }
                     st.success("Feature extraction complete!")
-                    st.dataframe(features_df.head(10))
-                    csv_features = features_df.to_csv(index=False)
-                    st.download_button(
-                        label="Download Extracted Features as CSV",
-                        data=csv_features,
-                        file_name=f"{selected_table}_ml_features.csv",
-                        mime="text/csv"
-                    )
                 except Exception as e:
                     st.error(f"Feature extraction failed: {e}")
+            features = st.session_state.get("features")
+            if features and features["table"] == selected_table and features["digest"] == table_digests[selected_table]:
+                extractor = features["extractor"]
+                show_paged_result(
+                    "features",
+                    features["pager"],
+                    lambda: extractor.transform_chunks(frame_chunks(df_preview, DISPLAY_CHUNK_ROWS)),
+                    f"{selected_table}_ml_features",
+                )
         else:
             st.warning("Table not loaded yet. Please load data first.")
     else:
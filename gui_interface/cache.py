@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+
+def content_digest(data: bytes) -> str:
+    """Key for an uploaded file: the same bytes give the same key in any session."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def cached_bytes(value) -> int:
+    """Approximate memory held by a cached DataFrame or SimpleCQ engine."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    tables = getattr(value, "tables", None)
+    if isinstance(tables, dict):
+        return sum(cached_bytes(df) for df in tables.values())
+    return 0
+
+
+class ByteBudgetCache:
+    """
+    Thread-safe LRU cache bounded by the summed size of its values rather
+    than by entry count: once `max_bytes` is exceeded, least recently used
+    entries are evicted. The newest entry is always kept, even if it alone is
+    over budget, so the current interaction never rebuilds its own inputs.
+    """
+    def __init__(self, max_bytes: int, sizeof=cached_bytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_create(self, key, build):
+        """Returns the cached value for `key`, calling build() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        # Built outside the lock so other sessions are not blocked meanwhile
+        value = build()
+        size = self.sizeof(value)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and self.total_bytes > self.max_bytes:
+                self._entries.popitem(last=False)
+            return self._entries[key][0]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
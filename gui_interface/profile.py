@@ -0,0 +1,88 @@
+import pandas as pd
+from core_engine.plan import format_bytes
+
+# Operators taking at least this share of the query's operator time are hot.
+HOT_SHARE = 0.25
+MAX_LABEL_CHARS = 40
+
+
+def _walk(node: dict, depth: int = 0):
+    yield depth, node
+    for child in node["children"]:
+        yield from _walk(child, depth + 1)
+
+
+def total_time_ns(plan: dict) -> int:
+    return sum(node["elapsed_ns"] or 0 for _, node in _walk(plan))
+
+
+def hot_nodes(plan: dict, share: float = HOT_SHARE) -> list:
+    """Nodes of an analyzed plan (PlanNode.to_dict()) whose own time is at least `share` of the total."""
+    total = total_time_ns(plan)
+    if not total:
+        return []
+    return [node for _, node in _walk(plan) if (node["elapsed_ns"] or 0) >= share * total]
+
+
+def profile_table(plan: dict) -> pd.DataFrame:
+    """One row per operator in plan order, with rows in / out, time and memory."""
+    total = total_time_ns(plan) or 1
+    hot = {id(node) for node in hot_nodes(plan)}
+    rows = []
+    for depth, node in _walk(plan):
+        elapsed = node["elapsed_ns"]
+        rows.append({
+            "operator": "  " * depth + node["op"],
+            "detail": node["detail"],
+            "input_rows": node.get("input_rows"),
+            "output_rows": node["actual_rows"],
+            "estimated_rows": None if node["estimated_rows"] is None else round(node["estimated_rows"]),
+            "time_ms": None if elapsed is None else elapsed / 1e6,
+            "time_share": None if elapsed is None else elapsed / total,
+            "memory": format_bytes(node["bytes_allocated"]),
+            "hot": id(node) in hot,
+        })
+    table = pd.DataFrame(rows)
+    for col in ("input_rows", "output_rows", "estimated_rows"):
+        table[col] = table[col].astype("Int64")
+    return table
+
+
+def _label(text: str) -> str:
+    text = text if len(text) <= MAX_LABEL_CHARS else text[:MAX_LABEL_CHARS - 3] + "..."
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def profile_dot(plan: dict) -> str:
+    """
+    Graphviz source of the operator tree, data flowing upwards: each box shows
+    rows in -> out, time and memory, shaded by its share of the total time,
+    with hot nodes outlined in red.
+    """
+    total = total_time_ns(plan) or 1
+    hot = {id(node) for node in hot_nodes(plan)}
+    lines = ["digraph profile {", "  rankdir=BT;", '  node [shape=box, style="rounded,filled", fontname="Helvetica"];']
+    ids = {}
+    for i, (_, node) in enumerate(_walk(plan)):
+        ids[id(node)] = f"n{i}"
+        elapsed = node["elapsed_ns"] or 0
+        share = elapsed / total
+        rows_in = "?" if node.get("input_rows") is None else f"{node['input_rows']:,}"
+        rows_out = "?" if node["actual_rows"] is None else f"{node['actual_rows']:,}"
+        label = [node["op"]]
+        if node["detail"]:
+            label.append(_label(node["detail"]))
+        label.append(f"rows {rows_in} -> {rows_out}")
+        label.append(f"{elapsed / 1e6:.2f} ms ({share:.0%})")
+        if node["bytes_allocated"] is not None:
+            label.append(f"mem {format_bytes(node['bytes_allocated'])}")
+        # White to red by time share
+        shade = int(255 * (1 - min(share, 1.0)))
+        style = ', color="red", penwidth=3' if id(node) in hot else ""
+        text = "\\n".join(label)
+        lines.append(f'  n{i} [label="{text}", fillcolor="#ff{shade:02x}{shade:02x}"{style}];')
+    for _, node in _walk(plan):
+        for child in node["children"]:
+            lines.append(f"  {ids[id(child)]} -> {ids[id(node)]};")
+    lines.append("}")
+    return "\n".join(lines)
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+DOWNLOAD_FORMATS = ("csv", "parquet")
+
+
+def frame_chunks(df: pd.DataFrame, chunk_rows: int):
+    """Splits a DataFrame into consecutive row slices of at most chunk_rows rows."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+class ResultPager:
+    """
+    Pages over an iterator of DataFrame chunks, pulling chunks only as far as
+    the requested page needs. Fetched chunks are kept so pages can be revisited;
+    the total row count is known once the iterator is exhausted.
+    """
+    def __init__(self, chunks, page_size: int = DEFAULT_PAGE_SIZE):
+        self.page_size = page_size
+        self._chunks = iter(chunks)
+        self._fetched = []
+        self.rows_fetched = 0
+        self.exhausted = False
+
+    def _fetch_until(self, rows: int):
+        while not self.exhausted and self.rows_fetched < rows:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.exhausted = True
+            elif len(chunk):
+                self._fetched.append(chunk)
+                self.rows_fetched += len(chunk)
+
+    @property
+    def total_rows(self):
+        """Number of result rows, or None while more chunks may follow."""
+        return self.rows_fetched if self.exhausted else None
+
+    @property
+    def page_count(self):
+        """Number of pages, or None while the total is unknown."""
+        if not self.exhausted:
+            return None
+        return max(1, -(-self.rows_fetched // self.page_size))
+
+    def has_page(self, number: int) -> bool:
+        # One row past the page tells whether another page follows
+        self._fetch_until(number * self.page_size + 1)
+        return self.rows_fetched > number * self.page_size
+
+    def page(self, number: int) -> pd.DataFrame:
+        """Rows of page `number` (0-based); empty past the end of the result."""
+        start = number * self.page_size
+        end = start + self.page_size
+        self._fetch_until(end + 1)
+        parts, offset = [], 0
+        for chunk in self._fetched:
+            if offset >= end:
+                break
+            if offset + len(chunk) > start:
+                parts.append(chunk.iloc[max(start - offset, 0):end - offset])
+            offset += len(chunk)
+        if not parts:
+            return self._fetched[0].iloc[:0] if self._fetched else pd.DataFrame()
+        return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+
+def write_chunks(chunks, path: str, fmt: str = None) -> int:
+    """
+    Writes DataFrame chunks to one CSV or Parquet file (format from `fmt` or
+    the file extension), appending chunk by chunk so the whole result is
+    never held in memory. Returns the number of rows written.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in DOWNLOAD_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+    rows = 0
+    writer = None
+    first = True
+    try:
+        for chunk in chunks:
+            if fmt == "csv":
+                chunk.to_csv(path, mode="w" if first else "a", header=first, index=False)
+            else:
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, batch.schema)
+                writer.write_table(batch.cast(writer.schema))
+            first = False
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if first and fmt == "csv":
+        open(path, "w").close()  # no rows: an empty file
+    elif first:
+        pd.DataFrame().to_parquet(path)
+    return rows
+
+
+def export_to_tempfile(chunks, fmt: str) -> str:
+    """Writes chunks to a new temporary file of the given format and returns its path."""
+    fd, path = tempfile.mkstemp(prefix="cqc_result_", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        write_chunks(chunks, path, fmt)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,29 @@
+import pandas as pd
+from gui_interface.cache import ByteBudgetCache, cached_bytes, content_digest
+
+
+def test_cache_reuses_values_and_evicts_least_recently_used():
+    builds = []
+
+    def build(n):
+        builds.append(n)
+        return pd.DataFrame({"x": range(n)})
+
+    one_table = cached_bytes(build(1000))
+    cache = ByteBudgetCache(max_bytes=int(one_table * 2.5))
+    first = cache.get_or_create("a", lambda: build(1000))
+    assert cache.get_or_create("a", lambda: build(1000)) is first
+    cache.get_or_create("b", lambda: build(1000))
+    cache.get_or_create("a", lambda: build(1000))  # "a" is now the most recent
+    cache.get_or_create("c", lambda: build(1000))
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    # A value over budget on its own is still kept, alone
+    cache.get_or_create("big", lambda: build(10_000))
+    assert len(cache) == 1 and "big" in cache
+
+
+def test_content_digest_ignores_file_identity():
+    assert content_digest(b"a,b\n1,2\n") == content_digest(bytes(b"a,b\n1,2\n"))
+    assert content_digest(b"a,b\n1,2\n") != content_digest(b"a,b\n1,3\n")
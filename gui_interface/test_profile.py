@@ -0,0 +1,26 @@
+import pandas as pd
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import SimpleCQ
+from gui_interface.profile import hot_nodes, profile_dot, profile_table
+
+
+def test_profile_marks_hot_operators():
+    engine = SimpleCQ(SimpleCQ.prepare_tables({
+        "a": pd.DataFrame({"id": range(1000), "v": range(1000)}),
+        "b": pd.DataFrame({"a_id": list(range(1000)) * 3, "w": range(3000)}),
+    }))
+    plan = engine.explain(parse_query_from_string(
+        "SELECT a.v, b.w FROM a JOIN b ON a.id = b.a_id WHERE b.w > 10"), analyze=True).to_dict()
+    plan["children"][0]["elapsed_ns"] = 10 ** 9  # make one operator dominate
+    table = profile_table(plan)
+    assert list(table["hot"]) == [node is plan["children"][0] for node in _nodes(plan)]
+    assert [node["op"] for node in hot_nodes(plan)] == [plan["children"][0]["op"]]
+    assert table["time_share"].max() > 0.9 and table.loc[0, "output_rows"] == 2989
+    dot = profile_dot(plan)
+    assert dot.count("->") >= len(table) - 1 and dot.count('color="red"') == 1
+
+
+def _nodes(node):
+    yield node
+    for child in node["children"]:
+        yield from _nodes(child)
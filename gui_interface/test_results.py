@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+from core_engine.jobs import QueryRunner
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import SimpleCQ
+from gui_interface.results import ResultPager, frame_chunks, write_chunks
+
+DF = pd.DataFrame({"x": range(250), "name": [f"n{i}" for i in range(250)]})
+
+
+def test_pager_fetches_only_the_chunks_a_page_needs():
+    pulled = []
+
+    def chunks():
+        for chunk in frame_chunks(DF, 60):
+            pulled.append(len(chunk))
+            yield chunk
+
+    pager = ResultPager(chunks(), page_size=100)
+    pd.testing.assert_frame_equal(pager.page(0), DF.iloc[:100])
+    assert len(pulled) == 2 and pager.total_rows is None
+    pd.testing.assert_frame_equal(pager.page(2), DF.iloc[200:])
+    assert pager.total_rows == 250 and pager.page_count == 3
+    assert not pager.has_page(3) and pager.page(3).empty
+
+
+def test_first_page_of_a_running_job_is_shown_before_it_finishes():
+    n = 20_000
+    engine = SimpleCQ(SimpleCQ.prepare_tables({"t": pd.DataFrame({"x": np.arange(n)})}))
+    # One row per chunk: thousands of chunk files, written long after page 0 is complete
+    job = QueryRunner(max_workers=1).submit(engine, parse_query_from_string("SELECT t.x FROM t"), chunk_rows=1)
+    pager = ResultPager(job.iter_chunks(), page_size=100)
+    assert pager.has_page(0)
+    assert list(pager.page(0)["t_x"]) == list(range(100))
+    assert not job.finished and pager.total_rows is None and job.rows < n
+    job.discard()
+    assert job.status == "cancelled" and not os.path.exists(job.result_dir)
+
+
+def test_write_chunks_appends_csv_and_parquet(tmp_path):
+    for fmt in ("csv", "parquet"):
+        path = str(tmp_path / f"result.{fmt}")
+        assert write_chunks(frame_chunks(DF, 70), path) == len(DF)
+        read = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+        pd.testing.assert_frame_equal(read, DF, check_dtype=False)
@@ -5,9 +5,8 @@ This module enables the use of Conjunctive Query with Comparisons (CQC) outputs
 machine learning models. It integrates query results with ML pipelines for analytical workloads.
 
 Key Components:
-- feature_extraction.py: Converts query outputs into features for ML models.
+- extractor.py: Converts query outputs into features for ML models. FeatureExtractor keeps the
+  fitted statistics (fit / partial_fit / transform) so training and serving encode alike.
 - models.py: Implements integration with machine learning frameworks like Scikit-learn.
-
-This is a placeholder file to establish the directory structure. Actual implementation files will be
-added as development progresses.
+  StatisticsRidge fits from sufficient statistics computed in the engine over an unmaterialized join.
 """
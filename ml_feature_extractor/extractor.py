@@ -1,5 +1,247 @@
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Categorical columns with at most this many distinct values are one-hot
+# encoded; columns with more are encoded by string length.
+MAX_CATEGORIES = 10
+MISSING_CATEGORY = "Missing"
+# transform_chunks keeps at most this many chunks per worker in flight.
+CHUNKS_IN_FLIGHT_PER_JOB = 2
+
+
+def _column_kind(series: pd.Series):
+    if pd.api.types.is_bool_dtype(series):
+        return None
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series) \
+            or isinstance(series.dtype, pd.CategoricalDtype):
+        return "categorical"
+    return None
+
+
+class FeatureExtractor(BaseEstimator, TransformerMixin):
+    """
+    Stateful version of extract_features with the scikit-learn fit /
+    partial_fit / transform interface:
+    - Normalizes numeric features with the fitted mean and std (missing
+      values are imputed with the fitted mean), plus positivity indicators
+    - One-hot encodes categoricals with at most `max_categories` fitted values
+      (unseen values encode as all zeros); longer vocabularies switch the
+      column to a string length feature and stop being tracked
+    - Extracts year / month / day / weekday / is_weekend from datetimes
+
+    partial_fit folds a chunk into running statistics (Welford mean / variance
+    merged per chunk), so a result larger than memory can be fitted batch by
+    batch and then transformed chunk by chunk with the same encoding.
+
+    With sparse_output=True, transform returns a scipy.sparse CSR matrix of
+    `dtype` (float32 by default) that scikit-learn estimators accept as is;
+    get_feature_names_out maps its columns back to feature names.
+    """
+    def __init__(self, max_categories: int = MAX_CATEGORIES, sparse_output: bool = False,
+                 dtype=np.float32):
+        self.max_categories = max_categories
+        self.sparse_output = sparse_output
+        self.dtype = dtype
+
+    def fit(self, X: pd.DataFrame, y=None):
+        for attr in ("kinds_", "numeric_stats_", "vocabularies_", "n_samples_seen_"):
+            self.__dict__.pop(attr, None)
+        return self.partial_fit(X)
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        if not hasattr(self, "kinds_"):
+            # Column kinds are fixed by the first chunk
+            self.kinds_ = {col: kind for col in X.columns if (kind := _column_kind(X[col]))}
+            self.numeric_stats_ = {col: [0, 0.0, 0.0] for col, kind in self.kinds_.items() if kind == "numeric"}
+            self.vocabularies_ = {col: [] for col, kind in self.kinds_.items() if kind == "categorical"}
+            self.n_samples_seen_ = 0
+        for col, stats in self.numeric_stats_.items():
+            values = pd.to_numeric(X[col], errors="coerce").dropna().to_numpy(dtype=float)
+            if len(values):
+                stats[:] = _merge_moments(stats, len(values), values.mean(), ((values - values.mean()) ** 2).sum())
+        for col, vocab in self.vocabularies_.items():
+            if vocab is None:
+                continue
+            series = X[col]
+            seen = set(vocab)
+            seen.update(series.dropna().astype(str).unique())
+            if series.isnull().any():
+                seen.add(None)
+            if len(seen - {None}) > self.max_categories:
+                self.vocabularies_[col] = None  # too many values: encode by length
+            else:
+                # Missing values sort as "Missing", where get_dummies placed them
+                self.vocabularies_[col] = sorted(seen, key=lambda v: MISSING_CATEGORY if v is None else v)
+        self.n_samples_seen_ += len(X)
+        return self
+
+    def _check_fitted(self):
+        if not hasattr(self, "kinds_"):
+            raise ValueError("FeatureExtractor is not fitted yet; call fit or partial_fit first.")
+
+    def _stats(self, col):
+        count, mean, m2 = self.numeric_stats_[col]
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+        return mean, std
+
+    def _layout(self):
+        """(kind, feature names) of every block in output order; see _blocks."""
+        for col in self.numeric_stats_:
+            yield "dense", [f"{col}_norm"]
+            yield "dense", [f"{col}_is_positive"]
+        for col, vocab in self.vocabularies_.items():
+            if vocab is None:
+                yield "dense", [f"{col}_length"]
+            else:
+                yield "onehot", [f"{col}_{MISSING_CATEGORY if v is None else v}" for v in vocab]
+        for col, kind in self.kinds_.items():
+            if kind == "datetime":
+                for part in ("year", "month", "day", "weekday", "is_weekend"):
+                    yield "dense", [f"{col}_{part}"]
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        self._check_fitted()
+        return np.array([name for _, names in self._layout() for name in names], dtype=object)
+
+    def _blocks(self, X: pd.DataFrame):
+        """
+        Yields the features of X in output order: ("dense", name, Series) for
+        single columns and ("onehot", names, codes) for one-hot blocks, where
+        codes[i] is the position of row i's value in the block or -1.
+        """
+        for col in self.numeric_stats_:
+            mean, std = self._stats(col)
+            col_data = pd.to_numeric(X[col], errors="coerce").fillna(mean)
+            yield "dense", f"{col}_norm", (col_data - mean) / (std + 1e-6)
+            yield "dense", f"{col}_is_positive", (col_data > 0).astype(int)
+        for col, vocab in self.vocabularies_.items():
+            if vocab is None:
+                yield "dense", f"{col}_length", X[col].fillna("").astype(str).str.len()
+                continue
+            missing = X[col].isnull().to_numpy()
+            positions = np.array([i for i, v in enumerate(vocab) if v is not None] + [-1], dtype=np.int32)
+            # get_indexer gives -1 for unseen values, which picks the trailing -1
+            codes = positions[pd.Index([v for v in vocab if v is not None]).get_indexer(X[col].astype(str))]
+            codes[missing] = vocab.index(None) if None in vocab else -1
+            yield "onehot", [f"{col}_{MISSING_CATEGORY if v is None else v}" for v in vocab], codes
+        for col, kind in self.kinds_.items():
+            if kind == "datetime":
+                dates = pd.to_datetime(X[col], errors="coerce").dt
+                yield "dense", f"{col}_year", dates.year
+                yield "dense", f"{col}_month", dates.month
+                yield "dense", f"{col}_day", dates.day
+                yield "dense", f"{col}_weekday", dates.weekday
+                yield "dense", f"{col}_is_weekend", dates.weekday >= 5
+
+    def transform(self, X: pd.DataFrame):
+        """
+        Features of X as a DataFrame, or with sparse_output as a CSR matrix
+        whose columns follow get_feature_names_out.
+        """
+        self._check_fitted()
+        if self.sparse_output:
+            return self._transform_sparse(X)
+        features = {}
+        for kind, names, values in self._blocks(X):
+            if kind == "dense":
+                features[names] = values
+            else:
+                for j, name in enumerate(names):
+                    features[name] = pd.Series(values == j, index=X.index)
+        return pd.DataFrame(features, index=X.index)
+
+    def _transform_sparse(self, X: pd.DataFrame):
+        """
+        Builds the CSR matrix in one pass. Every block owns one slot per row in
+        preallocated (rows x blocks) value and column-index arrays: single
+        features write their value, one-hot blocks write 1 at the column of the
+        row's category. Blocks are in column order, so keeping the non-zero
+        slots row by row gives the CSR arrays with sorted indices directly,
+        without dense one-hot columns, intermediate DataFrames or a COO sort.
+        """
+        n = len(X)
+        n_blocks = sum(1 for _ in self._layout())
+        data = np.empty((n, n_blocks), dtype=self.dtype)
+        indices = np.empty((n, n_blocks), dtype=np.int32)
+        col = 0
+        for slot, (kind, names, values) in enumerate(self._blocks(X)):
+            if kind == "dense":
+                data[:, slot] = np.asarray(values, dtype=float)
+                indices[:, slot] = col
+            else:
+                data[:, slot] = values >= 0  # unseen values encode as zeros
+                indices[:, slot] = col + values
+            col += len(names) if kind == "onehot" else 1
+        keep = data != 0
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix((data[keep], indices[keep], indptr), shape=(n, col))
+
+    def transform_chunks(self, chunks, n_jobs: int = 1):
+        """
+        Transforms an iterable of DataFrame chunks, yielding results in order.
+        Chunks are independent given the fitted state, so with n_jobs > 1 they
+        are transformed in worker processes, reading ahead at most
+        CHUNKS_IN_FLIGHT_PER_JOB chunks per worker so memory stays bounded.
+        """
+        self._check_fitted()
+        if n_jobs <= 1:
+            for chunk in chunks:
+                yield self.transform(chunk)
+            return
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(self.transform, chunk))
+                if len(pending) >= n_jobs * CHUNKS_IN_FLIGHT_PER_JOB:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def save(self, path: str):
+        """Writes the parameters and fitted statistics to a JSON file."""
+        self._check_fitted()
+        state = {
+            "max_categories": self.max_categories,
+            "sparse_output": self.sparse_output,
+            "dtype": np.dtype(self.dtype).name,
+            "kinds": self.kinds_,
+            "numeric_stats": self.numeric_stats_,
+            "vocabularies": self.vocabularies_,
+            "n_samples_seen": self.n_samples_seen_,
+        }
+        with open(path, "w") as f:
+            json.dump(state, f, indent=2, default=float)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureExtractor":
+        with open(path) as f:
+            state = json.load(f)
+        extractor = cls(max_categories=state["max_categories"], sparse_output=state.get("sparse_output", False),
+                        dtype=np.dtype(state.get("dtype", "float32")))
+        extractor.kinds_ = state["kinds"]
+        extractor.numeric_stats_ = state["numeric_stats"]
+        extractor.vocabularies_ = state["vocabularies"]
+        extractor.n_samples_seen_ = state["n_samples_seen"]
+        return extractor
+
+
+def _merge_moments(stats, count, mean, m2):
+    """Combines running [count, mean, M2] with a chunk's (parallel Welford update)."""
+    n_a, mean_a, m2_a = stats
+    n = n_a + count
+    delta = mean - mean_a
+    return [n, mean_a + delta * count / n, m2_a + m2 + delta * delta * n_a * count / n]
+
 
 def extract_features(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -9,34 +251,8 @@ def extract_features(df: pd.DataFrame) -> pd.DataFrame:
     - Encodes low-cardinality categoricals
     - Extracts string length from high-cardinality categoricals
     - Handles missing values
+
+    Statistics come from `df` itself; use FeatureExtractor to fit them on
+    training data and reuse them at serving time.
     """
-    features = pd.DataFrame(index=df.index)
-
-    # --- Numeric Features ---
-    numeric_cols = df.select_dtypes(include=['number']).columns
-    for col in numeric_cols:
-        col_data = df[col].fillna(df[col].mean())  # Impute with mean
-        std = col_data.std()
-        features[f"{col}_norm"] = (col_data - col_data.mean()) / (std + 1e-6)
-        features[f"{col}_is_positive"] = (col_data > 0).astype(int)
-
-    # --- Categorical Features ---
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
-    for col in cat_cols:
-        nuni = df[col].nunique(dropna=True)
-        if nuni <= 10:
-            dummies = pd.get_dummies(df[col].fillna("Missing"), prefix=col)
-            features = pd.concat([features, dummies], axis=1)
-        else:
-            features[f"{col}_length"] = df[col].fillna("").astype(str).apply(len)
-
-    # --- Datetime Features ---
-    date_cols = df.select_dtypes(include=['datetime64[ns]']).columns
-    for col in date_cols:
-        features[f"{col}_year"] = df[col].dt.year
-        features[f"{col}_month"] = df[col].dt.month
-        features[f"{col}_day"] = df[col].dt.day
-        features[f"{col}_weekday"] = df[col].dt.weekday
-        features[f"{col}_is_weekend"] = df[col].dt.weekday >= 5
-
-    return features
+    return FeatureExtractor().fit(df).transform(df)
@@ -0,0 +1,46 @@
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from core_engine.factorized import SufficientStatistics
+
+
+class StatisticsRidge(BaseEstimator, RegressorMixin):
+    """
+    Ridge regression (plain least squares with alpha=0) solved from
+    sufficient statistics: count, sum(x), sum(x x^T) and sum(x y). Like
+    sklearn.linear_model.Ridge, the intercept is not penalized.
+
+    fit(X, y) works on arrays as usual; fit_statistics fits from statistics
+    computed elsewhere, e.g. SimpleCQ.sufficient_statistics over a join that is
+    never materialized, or the sum of statistics of several chunks.
+    """
+    def __init__(self, alpha: float = 1.0, fit_intercept: bool = True):
+        self.alpha = alpha
+        self.fit_intercept = fit_intercept
+
+    def fit(self, X, y):
+        return self.fit_statistics(SufficientStatistics.from_arrays(X, y, getattr(X, "columns", None)))
+
+    def fit_statistics(self, stats: SufficientStatistics):
+        if stats.count <= 0:
+            raise ValueError("Cannot fit on empty statistics")
+        xx, xy = stats.xx, stats.xy
+        if self.fit_intercept:
+            # Centre: X_c^T X_c = sum(x x^T) - n mean mean^T, X_c^T y_c likewise
+            x_mean = stats.x_sum / stats.count
+            y_mean = stats.y_sum / stats.count
+            xx = xx - stats.count * np.outer(x_mean, x_mean)
+            xy = xy - stats.count * x_mean * y_mean
+        lhs = xx + self.alpha * np.eye(len(xy))
+        if self.alpha > 0:
+            self.coef_ = np.linalg.solve(lhs, xy)
+        else:
+            self.coef_ = np.linalg.lstsq(lhs, xy, rcond=None)[0]
+        self.intercept_ = float(y_mean - x_mean @ self.coef_) if self.fit_intercept else 0.0
+        self.feature_names_in_ = np.array(stats.feature_names, dtype=object)
+        self.n_features_in_ = len(self.coef_)
+        return self
+
+    def predict(self, X):
+        if hasattr(X, "columns") and set(self.feature_names_in_) <= set(X.columns):
+            X = X[list(self.feature_names_in_)]
+        return np.asarray(X, dtype=float) @ self.coef_ + self.intercept_
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from ml_feature_extractor.extractor import CHUNKS_IN_FLIGHT_PER_JOB, FeatureExtractor, extract_features
+
+rng = np.random.default_rng(0)
+DF = pd.DataFrame({
+    "amount": rng.normal(5, 3, 1000),
+    "visits": rng.integers(-2, 10, 1000).astype(float),
+    "city": rng.choice(["Toronto", "Paris", "Lima"], 1000),
+    "email": [f"user{i}@example.com" for i in range(1000)],
+    "seen": pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, 1000), unit="D"),
+})
+DF.loc[::7, "visits"] = np.nan
+DF.loc[::11, "city"] = None
+
+
+def test_partial_fit_over_chunks_matches_fit():
+    full = FeatureExtractor().fit(DF)
+    streamed = FeatureExtractor()
+    for start in range(0, len(DF), 150):
+        streamed.partial_fit(DF.iloc[start:start + 150])
+    assert streamed.n_samples_seen_ == len(DF)
+    assert streamed.vocabularies_ == full.vocabularies_ == {"city": ["Lima", None, "Paris", "Toronto"], "email": None}
+    np.testing.assert_allclose(streamed.numeric_stats_["visits"], full.numeric_stats_["visits"])
+    assert np.isclose(full._stats("amount")[1], DF["amount"].std())
+    pd.testing.assert_frame_equal(streamed.transform(DF), full.transform(DF))
+    assert list(full.transform(DF).columns) == list(full.get_feature_names_out())
+
+    # Without missing values the stateless helper matches the original extractor
+    clean = DF.dropna()
+    legacy_norm = (clean["visits"] - clean["visits"].mean()) / (clean["visits"].std() + 1e-6)
+    np.testing.assert_allclose(extract_features(clean)["visits_norm"], legacy_norm)
+    # Missing values are one-hot encoded in sorted position, as get_dummies did
+    legacy_city = pd.get_dummies(DF["city"].fillna("Missing"), prefix="city")
+    pd.testing.assert_frame_equal(extract_features(DF).filter(like="city_"), legacy_city, check_dtype=False)
+
+
+def test_saved_extractor_transforms_new_chunks_consistently(tmp_path):
+    extractor = FeatureExtractor().fit(DF.iloc[:500])
+    extractor.save(tmp_path / "features.json")
+    loaded = FeatureExtractor.load(tmp_path / "features.json")
+
+    serving = DF.iloc[500:].copy()
+    serving.loc[serving.index[:3], "city"] = "Oslo"  # not seen during fit
+    expected = extractor.transform(serving)
+    chunks = [serving.iloc[i:i + 100] for i in range(0, len(serving), 100)]
+    pd.testing.assert_frame_equal(pd.concat(loaded.transform_chunks(chunks, n_jobs=2)), expected)
+    assert not expected.filter(like="city_").iloc[:3].any(axis=None)
+
+
+def test_parallel_transform_reads_ahead_a_bounded_number_of_chunks():
+    extractor = FeatureExtractor().fit(DF)
+    pulled = []
+
+    def chunks():
+        for start in range(0, len(DF), 50):
+            pulled.append(start)
+            yield DF.iloc[start:start + 50]
+
+    results = extractor.transform_chunks(chunks(), n_jobs=2)
+    first = next(results)
+    assert len(pulled) <= 2 * CHUNKS_IN_FLIGHT_PER_JOB
+    pd.testing.assert_frame_equal(pd.concat([first, *results]), extractor.transform(DF))
+    assert len(pulled) == 20
+
+
+def test_sparse_output_matches_dense_features():
+    dense = FeatureExtractor().fit(DF)
+    extractor = FeatureExtractor(sparse_output=True).fit(DF)
+    matrix = extractor.transform(DF)
+    assert matrix.format == "csr" and matrix.dtype == np.float32 and matrix.has_sorted_indices
+    assert matrix.shape == (len(DF), len(extractor.get_feature_names_out()))
+    np.testing.assert_allclose(matrix.toarray(), dense.transform(DF).to_numpy(dtype=float), rtol=1e-5, atol=1e-5)
+    # Each one-hot block stores at most one entry per row
+    assert matrix[:, extractor.get_feature_names_out() == "city_Lima"].nnz == (DF["city"] == "Lima").sum()
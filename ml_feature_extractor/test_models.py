@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
+from core_engine.factorized import SufficientStatistics
+from core_engine.parser import parse_query_from_string
+from core_engine.simple_cqc import SimpleCQ
+from ml_feature_extractor.models import StatisticsRidge
+
+rng = np.random.default_rng(0)
+patients = pd.DataFrame({"id": range(300), "age": rng.integers(20, 80, 300),
+                         "condition": rng.choice(["Asthma", "Diabetes", None], 300)})
+visits = pd.DataFrame({"id": range(2000), "patient_id": rng.integers(0, 320, 2000),
+                       "cost": rng.normal(100, 20, 2000), "ward": rng.integers(0, 40, 2000)})
+labs = pd.DataFrame({"ward": rng.integers(0, 40, 900), "load": rng.random(900)})
+labs.loc[::50, "load"] = np.nan
+engine = SimpleCQ(SimpleCQ.prepare_tables({"patients": patients, "visits": visits, "labs": labs}))
+QUERY = parse_query_from_string(
+    "SELECT visits.cost FROM visits JOIN patients ON visits.patient_id = patients.id "
+    "JOIN labs ON visits.ward = labs.ward WHERE patients.age > 30")
+
+
+def materialized():
+    joined = visits.merge(patients, left_on="patient_id", right_on="id").merge(labs, on="ward")
+    joined = joined[(joined["age"] > 30) & joined["load"].notna()]
+    X = pd.DataFrame({"patients.age": joined["age"], "labs.load": joined["load"]})
+    for value in ("Asthma", "Diabetes"):
+        X[f"patients.condition={value}"] = (joined["condition"] == value).astype(float)
+    return X, joined["cost"]
+
+
+def test_statistics_over_join_match_materialized_join():
+    stats = engine.sufficient_statistics(QUERY, ["patients.age", "labs.load"], "visits.cost",
+                                         categorical=["patients.condition"])
+    X, y = materialized()
+    expected = SufficientStatistics.from_arrays(X, y, X.columns)
+    assert stats.feature_names == expected.feature_names
+    assert stats.count == expected.count
+    for field in ("x_sum", "xx", "xy", "y_sum", "yy"):
+        np.testing.assert_allclose(getattr(stats, field), getattr(expected, field), rtol=1e-9)
+
+    with pytest.raises(ValueError):
+        engine.sufficient_statistics(parse_query_from_string(
+            "SELECT visits.cost FROM visits JOIN patients ON visits.patient_id = patients.id "
+            "WHERE visits.ward > patients.age"), ["patients.age"], "visits.cost")
+
+
+def test_ridge_from_statistics_matches_sklearn():
+    X, y = materialized()
+    stats = engine.sufficient_statistics(QUERY, ["patients.age", "labs.load"], "visits.cost",
+                                         categorical=["patients.condition"])
+    for alpha, reference in ((2.0, Ridge(alpha=2.0)), (0.0, LinearRegression())):
+        model = StatisticsRidge(alpha=alpha).fit_statistics(stats)
+        reference.fit(X, y)
+        np.testing.assert_allclose(model.coef_, reference.coef_, rtol=1e-6)
+        assert np.isclose(model.intercept_, reference.intercept_)
+        np.testing.assert_allclose(model.predict(X), reference.predict(X), rtol=1e-6)
+    # Statistics of row chunks add up to those of the whole
+    half = len(X) // 2
+    chunked = SufficientStatistics.from_arrays(X[:half], y[:half], X.columns) \
+        + SufficientStatistics.from_arrays(X[half:], y[half:], X.columns)
+    np.testing.assert_allclose(StatisticsRidge().fit_statistics(chunked).coef_, StatisticsRidge().fit(X, y).coef_)
@@ -0,0 +1,10 @@
+"""
+CQC-Accelerator - Query Server Module
+
+This module serves SimpleCQ queries to other processes without the GUI. Tables are loaded once and
+stay resident, with their statistics and indexes, while many clients query them concurrently.
+
+Key Components:
+- server.py: HTTP/JSON server on localhost streaming results as NDJSON or Arrow IPC, with health
+  and latency metrics endpoints. Run with `python query_server/server.py --data-dir data`.
+"""
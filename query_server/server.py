@@ -0,0 +1,327 @@
+"""
+Headless query server: loads a data directory once and answers queries from
+many clients over HTTP/JSON on localhost.
+
+Tables, statistics and hash indexes stay resident in one SimpleCQ engine;
+each request runs on its own thread with a session of that engine (see
+SimpleCQ.session), so indexes built for one client serve all of them. At
+most `max_concurrent` queries execute at once; further requests wait up to
+`queue_timeout` seconds and then get 503. Queries over the engine's memory
+budget (see SimpleCQ.memory_budget) get 507 before their first batch.
+
+Endpoints:
+    GET  /health    {"status": "ok", "tables": {name: rows}, "uptime_seconds"}
+    GET  /tables    columns and dtypes of every table
+    GET  /metrics   query counters and latency percentiles (recent queries)
+    POST /query     {"query": "SELECT ...", "format": "ndjson" | "arrow",
+                     "chunk_rows": 10000, "timeout": 30}
+
+/query streams the result as it is produced (see SimpleCQ.iter_parsed).
+With "ndjson" the first line is {"columns": [...]}, every following line is
+one row object, and the last line is {"status": "ok" | "error", "rows",
+"elapsed_seconds", "error"}. With "arrow" the body is an Arrow IPC stream
+of record batches (requires pyarrow). EXPLAIN queries return the plan as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from core_engine.parser import parse_query_from_string
+from core_engine.plan import parse_bytes
+from core_engine.simple_cqc import MemoryBudgetExceeded, QueryCancelled, SimpleCQ, default_memory_budget
+from benchmarking_suite.helpers import summarize_timings
+
+DEFAULT_PORT = 8765
+DEFAULT_CHUNK_ROWS = 10_000
+# Latency percentiles are computed over this many most recent queries
+LATENCY_WINDOW = 1000
+STREAM_FORMATS = ("ndjson", "arrow")
+
+
+class ServerMetrics:
+    """Thread-safe query counters and a window of recent latencies."""
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.queries_total = 0
+        self.queries_failed = 0
+        self.queries_rejected = 0
+        self.queries_active = 0
+        self.rows_streamed = 0
+        self._latencies = deque(maxlen=window)
+        self._first_batch = deque(maxlen=window)
+
+    def query_started(self):
+        with self._lock:
+            self.queries_total += 1
+            self.queries_active += 1
+
+    def query_finished(self, seconds: float, first_batch_seconds, rows: int, failed: bool = False):
+        with self._lock:
+            self.queries_active -= 1
+            self.rows_streamed += rows
+            if failed:
+                self.queries_failed += 1
+            else:
+                self._latencies.append(seconds)
+                if first_batch_seconds is not None:
+                    self._first_batch.append(first_batch_seconds)
+
+    def query_rejected(self):
+        with self._lock:
+            self.queries_rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "queries_total": self.queries_total,
+                "queries_failed": self.queries_failed,
+                "queries_rejected": self.queries_rejected,
+                "queries_active": self.queries_active,
+                "rows_streamed": self.rows_streamed,
+                "latency_seconds": summarize_timings(list(self._latencies)),
+                "first_batch_seconds": summarize_timings(list(self._first_batch)),
+            }
+
+
+class QueryServer(ThreadingHTTPServer):
+    """
+    HTTP server answering queries on one resident SimpleCQ engine. Use
+    port 0 to pick a free port (see server_address after construction).
+    """
+    daemon_threads = True
+
+    def __init__(self, engine: SimpleCQ, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 max_concurrent: int = None, timeout: float = None, queue_timeout: float = 30.0,
+                 quiet: bool = False):
+        super().__init__((host, port), QueryRequestHandler)
+        self.engine = engine
+        self.timeout_seconds = timeout
+        self.queue_timeout = queue_timeout
+        self.quiet = quiet
+        self.metrics = ServerMetrics()
+        self._slots = threading.BoundedSemaphore(max_concurrent or os.cpu_count() or 1)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self) -> threading.Thread:
+        """Serves from a daemon thread (stop with shutdown()); handy for tests and notebooks."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    server_version = "CQC-Accelerator"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        engine = self.server.engine
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "tables": {name: len(df) for name, df in engine.tables.items()},
+                "uptime_seconds": time.time() - self.server.metrics.started_at,
+            })
+        elif path == "/tables":
+            self._send_json(200, {name: {"rows": len(df), "columns": {c: str(t) for c, t in df.dtypes.items()}}
+                                  for name, df in engine.tables.items()})
+        elif path == "/metrics":
+            self._send_json(200, self.server.metrics.snapshot())
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/query":
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query_parts = parse_query_from_string(request["query"])
+            fmt = request.get("format", "ndjson")
+            if fmt not in STREAM_FORMATS:
+                raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(STREAM_FORMATS)})")
+            if fmt == "arrow":
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError as e:
+                    raise ImportError("Arrow output requires pyarrow (pip install pyarrow)") from e
+            missing = [t for t in query_parts.get("join_order", []) if t not in self.server.engine.tables]
+            if missing:
+                raise ValueError(f"Referenced tables not found: {', '.join(missing)}")
+            chunk_rows = int(request.get("chunk_rows", DEFAULT_CHUNK_ROWS))
+            timeout = request.get("timeout", self.server.timeout_seconds)
+        except Exception as e:
+            self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        if not self.server._slots.acquire(timeout=self.server.queue_timeout):
+            self.server.metrics.query_rejected()
+            self._send_json(503, {"error": "Server busy: too many concurrent queries"})
+            return
+        try:
+            self._run_query(query_parts, fmt, chunk_rows, timeout)
+        finally:
+            self.server._slots.release()
+
+    def _run_query(self, query_parts: dict, fmt: str, chunk_rows: int, timeout):
+        engine = self.server.engine.session()
+        if timeout:
+            engine.deadline = time.monotonic() + float(timeout)
+        metrics = self.server.metrics
+        metrics.query_started()
+        started = time.perf_counter()
+        first_batch = None
+        rows = 0
+        failed = True
+        try:
+            if query_parts.get("explain"):
+                try:
+                    # EXPLAIN ANALYZE runs the query, so it fails like one
+                    plan = engine.explain(query_parts, analyze=query_parts.get("analyze", False))
+                except Exception as e:
+                    self._send_query_error(e)
+                    return
+                self._send_json(200, plan.to_dict())
+                failed = False
+                return
+            chunks = engine.iter_parsed(query_parts, chunk_rows)
+            try:
+                # Errors before the first batch still get a proper status code
+                first = next(chunks, None)
+            except Exception as e:
+                self._send_query_error(e)
+                return
+            first_batch = time.perf_counter() - started
+            write = self._stream_arrow if fmt == "arrow" else self._stream_ndjson
+            rows, error = write(first, chunks, started)
+            failed = error is not None
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away; the generator is dropped with the remaining work
+        finally:
+            metrics.query_finished(time.perf_counter() - started, first_batch, rows, failed)
+
+    def _send_query_error(self, e: Exception):
+        """Responds to a query that failed before sending output: 504 timed out or cancelled,
+        507 over the memory budget, 400 otherwise."""
+        if isinstance(e, QueryCancelled):
+            self._send_json(504, {"error": str(e)})
+        elif isinstance(e, MemoryBudgetExceeded):
+            self._send_json(507, {"error": str(e)})
+        else:
+            self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+    def _stream_ndjson(self, first, chunks, started):
+        self._start_stream("application/x-ndjson")
+        columns = [] if first is None else list(first.columns)
+        self.wfile.write((json.dumps({"columns": columns}) + "\n").encode())
+        rows, error = 0, None
+        try:
+            chunk = first
+            while chunk is not None:
+                self.wfile.write(chunk.to_json(orient="records", lines=True, date_format="iso").rstrip("\n")
+                                 .encode() + b"\n")
+                rows += len(chunk)
+                chunk = next(chunks, None)
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        trailer = {"status": "ok" if error is None else "error", "rows": rows,
+                   "elapsed_seconds": time.perf_counter() - started, "error": error}
+        self.wfile.write((json.dumps(trailer) + "\n").encode())
+        return rows, error
+
+    def _stream_arrow(self, first, chunks, started):
+        import pyarrow as pa
+        self._start_stream("application/vnd.apache.arrow.stream")
+        rows, error, writer = 0, None, None
+        try:
+            chunk = first
+            while chunk is not None:
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = batch.schema
+                    writer = pa.ipc.new_stream(self.wfile, schema)
+                writer.write_table(batch.cast(schema))
+                rows += len(chunk)
+                chunk = next(chunks, None)
+            if writer is None:
+                writer = pa.ipc.new_stream(self.wfile, pa.schema([]))  # empty result
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        # After an error the stream is left without its end marker, so readers fail instead of
+        # mistaking a partial result for a complete one
+        if writer is not None and error is None:
+            writer.close()
+        return rows, error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve SimpleCQ queries over HTTP on resident tables.")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_ROOT, "data"),
+                        help="Directory of CSV / Parquet tables to load once at startup")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="Queries executing at once (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="Default per-query time limit in seconds")
+    parser.add_argument("--memory-budget", type=parse_bytes, default=None,
+                        help="Per-query memory limit for intermediate results, e.g. 4GB "
+                             "(default: half of physical memory, 0 for no limit)")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    args = parser.parse_args(argv)
+
+    from benchmarking_suite.helpers import load_tables_from_dir
+    tables = load_tables_from_dir(args.data_dir)
+    if not tables:
+        return 1
+    engine = SimpleCQ(SimpleCQ.prepare_tables(tables))
+    engine.memory_budget = default_memory_budget() if args.memory_budget is None else args.memory_budget or None
+    server = QueryServer(engine, args.host, args.port, max_concurrent=args.max_concurrent,
+                         timeout=args.timeout, quiet=args.quiet)
+    print(f"Serving {len(tables)} tables ({', '.join(tables)}) at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
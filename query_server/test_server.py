@@ -0,0 +1,100 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from core_engine.parser import parse_query_from_string
+from query_server.server import QueryServer
+from core_engine.simple_cqc import SimpleCQ
+
+ENGINE = SimpleCQ(SimpleCQ.prepare_tables({
+    "orders": pd.DataFrame({"id": np.arange(5000), "customer": np.arange(5000) % 50,
+                            "amount": np.arange(5000) * 0.5}),
+    "customers": pd.DataFrame({"id": np.arange(50), "country": ["CA", "US"] * 25}),
+}))
+JOIN = ("SELECT customers.country, orders.amount FROM orders JOIN customers ON orders.customer = customers.id "
+        "WHERE orders.amount > 100")
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = QueryServer(ENGINE, port=0, max_concurrent=2, quiet=True)
+    server.start_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, payload):
+    request = urllib.request.Request(server.url + "/query", data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return response.headers["Content-Type"], response.read()
+
+
+def test_streams_ndjson_from_concurrent_clients(server):
+    expected = ENGINE.run_parsed(parse_query_from_string(JOIN)).reset_index(drop=True)
+    results = [None] * 4
+
+    def client(i):
+        _, body = post(server, {"query": JOIN, "chunk_rows": 1000})
+        results[i] = body.decode().splitlines()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(results))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for lines in results:
+        header, rows, trailer = json.loads(lines[0]), lines[1:-1], json.loads(lines[-1])
+        assert header["columns"] == list(expected.columns)
+        assert trailer["status"] == "ok" and trailer["rows"] == len(expected) == len(rows)
+        got = pd.read_json(io.StringIO("\n".join(rows)), lines=True)
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+    with urllib.request.urlopen(server.url + "/metrics") as response:
+        metrics = json.load(response)
+    assert metrics["queries_total"] >= 4 and metrics["queries_active"] == 0
+    assert metrics["latency_seconds"]["p95"] is not None
+    with urllib.request.urlopen(server.url + "/health") as response:
+        assert json.load(response)["tables"] == {"orders": 5000, "customers": 50}
+
+
+def test_arrow_stream_and_errors(server):
+    pa = pytest.importorskip("pyarrow")
+    content_type, body = post(server, {"query": "SELECT orders.id FROM orders WHERE orders.id < 25",
+                                       "format": "arrow", "chunk_rows": 10})
+    assert content_type == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.num_rows == 25 and table.column(0).to_pylist() == list(range(25))
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(server, {"query": "SELECT missing.x FROM missing"})
+    assert error.value.code == 400 and "missing" in json.load(error.value)["error"]
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(server, {"query": JOIN, "timeout": 1e-9})
+    assert error.value.code == 504 and "timed out" in json.load(error.value)["error"]
+
+
+def test_explain_analyze_errors_get_status_codes(server):
+    explain = "EXPLAIN ANALYZE " + JOIN
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(server, {"query": explain, "timeout": 1e-9})
+    assert error.value.code == 504 and "timed out" in json.load(error.value)["error"]
+
+    limited = SimpleCQ(ENGINE.tables)
+    limited.memory_budget = 1024
+    budget_server = QueryServer(limited, port=0, quiet=True)
+    budget_server.start_background()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(budget_server, {"query": explain})
+        assert error.value.code == 507
+    finally:
+        budget_server.shutdown()
+        budget_server.server_close()
+    _, body = post(server, {"query": explain})
+    assert json.loads(body)["actual_rows"] is not None
@@ -0,0 +1,25 @@
+import pandas as pd
+from cqc import main
+
+SCRIPT = """
+-- q1
+SELECT a.id FROM a WHERE a.x > 5;
+-- q2
+SELECT a.id FROM a LEFT JOIN b ON a.id = b.a_id;
+"""
+
+
+def test_run_writes_results_and_reports_failures(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    pd.DataFrame({"id": [1, 2, 3], "x": [5, 6, 7]}).to_csv(data / "a.csv", index=False)
+    pd.DataFrame({"a_id": [1, 2], "y": [1, 2]}).to_csv(data / "b.csv", index=False)
+    script = tmp_path / "queries.sql"
+    script.write_text(SCRIPT)
+    out = tmp_path / "out"
+    code = main(["run", str(script), "--data-dir", str(data), "--output-dir", str(out), "--workers", "2",
+                 "--summary", str(tmp_path / "summary.csv")])
+    assert code == 1  # q2 uses an outer join
+    assert pd.read_csv(out / "q1.csv")["a_id"].tolist() == [2, 3]
+    summary = pd.read_csv(tmp_path / "summary.csv")
+    assert summary["status"].tolist() == ["ok", "failed"]